@@ -0,0 +1,550 @@
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+import odkrywanie
+import pomiary
+
+# Dotychczasowa ścieżka: pełne dekodowanie każdej serii przez ImageSeriesReader
+def process_folder_pelny(dir_name, patients, series_descriptions):
+    import itk
+
+    itk.OutputWindow.SetGlobalWarningDisplay(False)
+    ImageType = itk.Image[itk.ctype("signed short"), 3]
+
+    namesGenerator = itk.GDCMSeriesFileNames.New()
+    namesGenerator.SetUseSeriesDetails(True)
+    namesGenerator.SetDirectory(dir_name)
+
+    for series_id in namesGenerator.GetSeriesUIDs():
+        file_names = namesGenerator.GetFileNames(series_id)
+        if not file_names:
+            continue
+
+        dicomIO = itk.GDCMImageIO.New()
+        dicomIO.LoadPrivateTagsOn()
+
+        reader = itk.ImageSeriesReader[ImageType].New()
+        reader.SetImageIO(dicomIO)
+        reader.SetFileNames(file_names)
+
+        try:
+            reader.Update()
+        except Exception:
+            continue
+
+        metadata = dicomIO.GetMetaDataDictionary()
+        if metadata.HasKey("0010|0010"):
+            patient_name = metadata["0010|0010"]
+            series_desc = metadata["0008|103e"] if metadata.HasKey("0008|103e") else "Unknown Series"
+            patients.setdefault(patient_name, {}).setdefault(series_id, []).extend(file_names)
+            series_descriptions[series_id] = series_desc
+
+def zmierz(funkcja, powtorzenia):
+    czasy = []
+    for _ in range(powtorzenia):
+        start = time.perf_counter()
+        wynik = funkcja()
+        czasy.append(time.perf_counter() - start)
+    return min(czasy), wynik
+
+# Jak zmierz, ale z pełnym opisem do zapisu w JSON (min, mediana, wszystkie pomiary)
+def zmierz_etap(funkcja, powtorzenia):
+    czasy = []
+    for _ in range(powtorzenia):
+        start = time.perf_counter()
+        wynik = funkcja()
+        czasy.append(time.perf_counter() - start)
+    return {"min_s": min(czasy), "mediana_s": statistics.median(czasy), "czasy_s": czasy}, wynik
+
+# Odkrywanie serii w drzewie folder po folderze
+def odkryj(dicom_directory, process_folder):
+    patients = {}
+    series_descriptions = {}
+    for root, dirs, files in os.walk(dicom_directory):
+        process_folder(root, patients, series_descriptions)
+    return patients
+
+# Czas odkrywania serii: same nagłówki vs pełne dekodowanie
+def bench_odkrywanie(args):
+    czas_naglowki, patients = zmierz(lambda: odkryj(args.dicom_directory, odkrywanie.process_folder), args.powtorzenia)
+    liczba_serii = sum(len(serie) for serie in patients.values())
+    print(f"Pacjenci: {len(patients)}, serie: {liczba_serii}")
+    print(f"Same nagłówki:      {czas_naglowki:.3f} s")
+
+    # Katalog: pierwsze uruchomienie (pusty plik) i kolejne (bez zmian w drzewie)
+    with tempfile.TemporaryDirectory() as tmp:
+        katalog_path = os.path.join(tmp, odkrywanie.NAZWA_KATALOGU)
+        skanuj = lambda: odkrywanie.skanuj(args.dicom_directory, {}, {}, katalog_path=katalog_path)
+        czas_zimny, _ = zmierz(skanuj, 1)
+        czas_cieply, _ = zmierz(skanuj, args.powtorzenia)
+    print(f"Katalog (pierwsze): {czas_zimny:.3f} s")
+    print(f"Katalog (kolejne):  {czas_cieply:.3f} s")
+
+    # Skalowanie z liczbą procesów (bez katalogu, każdy nagłówek czytany od nowa)
+    czas_jeden = None
+    for procesy in args.procesy:
+        skanuj = lambda: odkrywanie.skanuj(args.dicom_directory, {}, {}, katalog_path=False, procesy=procesy)
+        czas, _ = zmierz(skanuj, args.powtorzenia)
+        czas_jeden = czas_jeden or czas
+        print(f"Procesy: {procesy:2d}         {czas:.3f} s ({czas_jeden / max(czas, 1e-9):.1f}x)")
+
+    if not args.bez_pelnego:
+        czas_pelny, _ = zmierz(lambda: odkryj(args.dicom_directory, process_folder_pelny), args.powtorzenia)
+        print(f"Pełne dekodowanie:  {czas_pelny:.3f} s")
+        print(f"Przyspieszenie:     {czas_pelny / max(czas_naglowki, 1e-9):.1f}x")
+
+# Dotychczasowa konwersja: jedno wywołanie VTK na woksel
+def konwersja_petla(volume):
+    import vtk
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(volume.shape[2], volume.shape[1], volume.shape[0])
+    image.AllocateScalars(vtk.VTK_SHORT, 1)
+    for z in range(volume.shape[0]):
+        for y in range(volume.shape[1]):
+            for x in range(volume.shape[2]):
+                image.SetScalarComponentFromDouble(x, y, z, 0, volume[z, y, x])
+    return image
+
+# Czas konwersji NumPy -> vtkImageData w funkcji rozmiaru wolumenu
+def bench_vtk(args):
+    import numpy as np
+    from konwersja_vtk import numpy_do_vtk
+
+    print(f"{'wolumen':>16} {'woksele':>12} {'bufor [s]':>10} {'pętla [s]':>10}")
+    for rozmiar in args.rozmiary:
+        volume = np.random.randint(-1024, 3071, size=(args.wycinki, rozmiar, rozmiar)).astype(np.int16)
+        czas_bufor, _ = zmierz(lambda: numpy_do_vtk(volume), args.powtorzenia)
+
+        czas_petla = "-"
+        if volume.size <= args.limit_petli:
+            czas, _ = zmierz(lambda: konwersja_petla(volume), 1)
+            czas_petla = f"{czas:.3f}"
+        print(f"{f'{args.wycinki}x{rozmiar}x{rozmiar}':>16} {volume.size:>12} {czas_bufor:>10.5f} {czas_petla:>10}")
+
+# Wolumen testowy: tło + kula o zadanej intensywności w środku
+def fantom_kuli(wycinki, rozmiar, promien=None, tlo=100, wartosc=1500):
+    import numpy as np
+
+    volume = np.full((wycinki, rozmiar, rozmiar), tlo, dtype=np.int16)
+    promien = promien or min(wycinki, rozmiar) // 6
+    zz, yy, xx = np.ogrid[:wycinki, :rozmiar, :rozmiar]
+    kula = (zz - wycinki // 2) ** 2 + (yy - rozmiar // 2) ** 2 + (xx - rozmiar // 2) ** 2 < promien ** 2
+    volume[kula] = wartosc
+    return volume
+
+# Opóźnienie kliknięcie -> maska dla rozrostu 3D na wolumenie w pamięci
+def bench_segmentacja3d(args):
+    from segmentacja import Segmentacja3D
+
+    volume = fantom_kuli(args.wycinki, args.rozmiar)
+    silnik = Segmentacja3D(volume)
+    seed = (args.rozmiar // 2, args.rozmiar // 2, args.wycinki // 2)
+
+    for klikniecie in range(1, args.klikniecia + 1):
+        mask_3d = silnik.segmentuj(seed)
+        razem = silnik.ostatnie_czasy["razem"]
+        print(f"Kliknięcie {klikniecie}: {silnik.opis_czasow()} ({int(mask_3d.sum())} wokseli)"
+              f"{'' if razem < 1.0 else ' - POWYŻEJ 1 s'}")
+
+# Rozrost dynamiczny wycinek po wycinku: kolejno vs wątki vs procesy. Wolumen w pliku
+# mapowanym w pamięci jak WolumenSerii - procesy czytają wycinki z pliku
+def bench_dynamiczny(args):
+    import numpy as np
+    from concurrent.futures import wait
+    from segmentacja import rozrost_dynamiczny, rozgrzej_procesy
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sciezka = os.path.join(tmp, "wolumen.npy")
+        np.save(sciezka, fantom_kuli(args.wycinki, args.rozmiar))
+        volume = np.load(sciezka, mmap_mode="r")
+        seed = (args.rozmiar // 2, args.rozmiar // 2)
+        # Rozgrzewka - pierwsze użycie filtra ITK ładuje moduły (kilka sekund), także w każdym
+        # procesie puli
+        rozrost_dynamiczny(volume[args.wycinki // 2:args.wycinki // 2 + 1], seed, tryb=None)
+        wait(rozgrzej_procesy(args.workers))
+
+        czas_kolejno, wzorzec = zmierz(lambda: rozrost_dynamiczny(volume, seed, tryb=None), args.powtorzenia)
+        print(f"Kolejno:             {czas_kolejno:.3f} s")
+        for tryb in ("watki", "procesy"):
+            czas, wyniki = zmierz(lambda: rozrost_dynamiczny(volume, seed, tryb=tryb, workers=args.workers), args.powtorzenia)
+            zgodne = np.array_equal(wyniki[0].wolumen(), wzorzec[0].wolumen())
+            print(f"{tryb:8} ({args.workers:2d}):      {czas:.3f} s ({czas_kolejno / max(czas, 1e-9):.1f}x, "
+                  f"maski {'zgodne' if zgodne else 'RÓŻNE'})")
+        del volume
+
+def rozmiar_na_dysku(sciezka):
+    if os.path.isfile(sciezka):
+        return os.path.getsize(sciezka)
+    return sum(os.path.getsize(os.path.join(sciezka, f)) for f in os.listdir(sciezka))
+
+# Zapis masek: katalog PNG vs jeden plik NPZ / NRRD
+def bench_maski(args):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from zapis_masek import zapisz_maski_npz, zapisz_maski_nrrd, wczytaj_maski_npz
+
+    volume = fantom_kuli(args.wycinki, args.rozmiar)
+    maski = [wycinek > 1000 for wycinek in volume]
+
+    def zapisz_png(katalog):
+        os.makedirs(katalog, exist_ok=True)
+        for i, mask in enumerate(maski):
+            plt.imsave(os.path.join(katalog, f"mask_{i+1}.png"), mask.view(np.uint8), cmap="gray")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        formaty = [
+            ("png", os.path.join(tmp, "png"), zapisz_png),
+            ("npz", os.path.join(tmp, "maski.npz"), lambda p: zapisz_maski_npz(p, maski)),
+            ("nrrd", os.path.join(tmp, "maski.nrrd"), lambda p: zapisz_maski_nrrd(p, maski)),
+        ]
+        for nazwa, sciezka, zapisz in formaty:
+            czas, _ = zmierz(lambda: zapisz(sciezka), args.powtorzenia)
+            print(f"{nazwa:5} {czas:8.3f} s {rozmiar_na_dysku(sciezka) / 1024:10.1f} KiB")
+
+        odczytana, _, _ = wczytaj_maski_npz(os.path.join(tmp, "maski.npz"))
+        assert np.array_equal(odczytana, np.stack(maski) > 0)
+
+# Syntetyczna seria DICOM (pydicom, CT int16 z rescale -1024): ciało (walec eliptyczny) z szumem
+# i kuliste guzy w losowych miejscach wewnątrz ciała. Zwraca (pliki, wolumen HU, środki guzów (z, y, x))
+def zapisz_fantom_dicom(katalog, wycinki, rozmiar, guzy=1, promien=None, pacjent="Fantom^Benchmark", opis="Fantom",
+                        spacing_xy=0.7, grubosc=2.0, ziarno=0):
+    import numpy as np
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import generate_uid, ExplicitVRLittleEndian, CTImageStorage
+
+    rng = np.random.default_rng(ziarno)
+    promien = promien or max(2, min(wycinki, rozmiar) // 8)
+
+    yy, xx = np.ogrid[:rozmiar, :rozmiar]
+    cialo = ((yy - rozmiar / 2) / (0.35 * rozmiar)) ** 2 + ((xx - rozmiar / 2) / (0.45 * rozmiar)) ** 2 < 1
+    volume = np.where(cialo, 40, -1000).astype(np.int16)[None].repeat(wycinki, axis=0)
+    volume += rng.normal(0, 20, volume.shape).astype(np.int16)
+
+    # Środki guzów w środkowej części ciała, każdy guz z własną intensywnością
+    srodki = []
+    zz, yy, xx = np.ogrid[:wycinki, :rozmiar, :rozmiar]
+    for _ in range(guzy):
+        z = int(rng.integers(min(promien, wycinki // 2), max(wycinki - promien, wycinki // 2 + 1)))
+        y = int(rozmiar / 2 + rng.uniform(-0.5, 0.5) * (0.35 * rozmiar - promien))
+        x = int(rozmiar / 2 + rng.uniform(-0.5, 0.5) * (0.45 * rozmiar - promien))
+        kula = (zz - z) ** 2 + (yy - y) ** 2 + (xx - x) ** 2 < promien ** 2
+        volume[kula] = int(rng.integers(1300, 1700)) + rng.normal(0, 20, int(kula.sum())).astype(np.int16)
+        srodki.append((z, y, x))
+
+    os.makedirs(katalog, exist_ok=True)
+    study_uid, series_uid = generate_uid(), generate_uid()
+    pliki = []
+    for z in range(wycinki):
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = CTImageStorage
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+        ds = Dataset()
+        ds.file_meta = meta
+        ds.SOPClassUID = CTImageStorage
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.Modality = "CT"
+        ds.PatientName = pacjent
+        ds.PatientID = pacjent
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = series_uid
+        ds.SeriesDescription = opis
+        ds.InstanceNumber = z + 1
+        ds.ImagePositionPatient = [0.0, 0.0, z * grubosc]
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing = [spacing_xy, spacing_xy]
+        ds.SliceThickness = grubosc
+        ds.Rows = rozmiar
+        ds.Columns = rozmiar
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.BitsAllocated = 16
+        ds.BitsStored = 16
+        ds.HighBit = 15
+        ds.PixelRepresentation = 1
+        ds.RescaleSlope = 1
+        ds.RescaleIntercept = -1024
+        ds.PixelData = (volume[z] + 1024).astype(np.int16).tobytes()
+
+        sciezka = os.path.join(katalog, f"IM{z + 1:05d}.dcm")
+        ds.save_as(sciezka, enforce_file_format=True)
+        pliki.append(sciezka)
+    return pliki, volume, srodki
+
+# Wersja kodu i środowisko - wyniki z różnych wersji dają się porównać
+def opis_srodowiska():
+    import numpy as np
+    import pydicom
+    import itk
+    import vtk
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platforma": platform.platform(),
+        "procesory": os.cpu_count(),
+        "numpy": np.__version__,
+        "pydicom": pydicom.__version__,
+        "itk": itk.Version.GetITKVersion(),
+        "vtk": vtk.vtkVersion.GetVTKVersion(),
+    }
+
+# Wszystkie etapy na syntetycznych seriach DICOM, wynik w JSON
+def bench_etapy(args):
+    import numpy as np
+    import vtk
+    from wolumen import WolumenSerii, dekoduj_wycinek, geometria
+    from segmentacja import Segmentacja3D, segmentuj_wycinek, rozrost_dynamiczny
+    from rozrost import SesjaRozrostu, RozrostPlastrami
+    from konwersja_vtk import numpy_do_vtk, maski_do_vtk
+    from siatka import siatka_z_maski, izopowierzchnia_plastrami
+
+    if args.slad:
+        pomiary.wlacz(args.slad)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dane = args.dane or tmp
+        start = time.perf_counter()
+        serie = []
+        for i in range(args.serie):
+            serie.append(zapisz_fantom_dicom(os.path.join(dane, f"seria_{i + 1}"), args.wycinki, args.rozmiar, args.guzy,
+                                             args.promien, opis=f"Fantom {i + 1}", ziarno=args.ziarno + i))
+        print(f"Fantom: {args.serie} x {args.wycinki}x{args.rozmiar}x{args.rozmiar}, "
+              f"{time.perf_counter() - start:.2f} s (dane w {dane})")
+        pliki, wzorzec, srodki = serie[0]
+        z, y, x = srodki[0]
+        etapy = {}
+
+        def etap(nazwa, funkcja, powtorzenia=args.powtorzenia, **opis):
+            etapy[nazwa], wynik = zmierz_etap(funkcja, powtorzenia)
+            etapy[nazwa].update(opis)
+            print(f"{nazwa:24} {etapy[nazwa]['min_s'] * 1000:10.1f} ms (mediana "
+                  f"{etapy[nazwa]['mediana_s'] * 1000:.1f} ms)")
+            return wynik
+
+        patients = etap("odkrywanie", lambda: odkryj(dane, odkrywanie.process_folder), pliki=args.serie * args.wycinki)
+        liczba_serii = sum(len(s) for s in patients.values())
+        assert liczba_serii == args.serie, f"Odkryto {liczba_serii} serii zamiast {args.serie}"
+
+        # Rozgrzewka - pierwsze użycie typów ITK ładuje moduły (kilka sekund), nie wchodzi do pomiarów
+        start = time.perf_counter()
+        segmentuj_wycinek(np.asarray(dekoduj_wycinek(pliki[z])), (x, y))
+        Segmentacja3D(wzorzec[:2]).segmentuj((0, 0, 0))
+        print(f"Rozgrzewka ITK: {time.perf_counter() - start:.2f} s")
+
+        shape, spacing, origin = geometria(pliki)
+        volume = etap("dekodowanie", lambda: np.stack([dekoduj_wycinek(p) for p in pliki]), wycinki=len(pliki))
+        etapy["dekodowanie"]["na_wycinek_s"] = etapy["dekodowanie"]["min_s"] / len(pliki)
+        assert volume.shape == shape and np.array_equal(volume, wzorzec), "Zdekodowany wolumen różni się od fantomu"
+
+        # Wczytywanie strumieniowe do pustej pamięci wolumenu: czas do pierwszego wycinka
+        # (nie powinien zależeć od liczby wycinków) i do wypełnienia całej serii
+        def wczytaj_strumieniowo(do_konca):
+            with tempfile.TemporaryDirectory() as pamiec:
+                wolumen = WolumenSerii(f"benchmark_{time.perf_counter_ns()}", pliki, katalog=pamiec)
+                wolumen.wczytuj_w_tle()
+                wolumen.wycinek(0)
+                if do_konca:
+                    wolumen.wolumen()
+                wolumen.zatrzymaj_wczytywanie()
+        etap("pierwszy_wycinek", lambda: wczytaj_strumieniowo(False))
+        etap("wczytanie_strumieniowe", lambda: wczytaj_strumieniowo(True), wycinki=len(pliki))
+
+        maska_2d, _ = etap("rozrost_2d_itk", lambda: segmentuj_wycinek(volume[z], (x, y)))
+        etapy["rozrost_2d_itk"]["woksele"] = int(np.count_nonzero(maska_2d))
+
+        silnik = Segmentacja3D(volume, spacing, origin)
+        seed = (x, y, z)
+        mask_3d = etap("rozrost_3d_itk", lambda: silnik.segmentuj(seed))
+        etapy["rozrost_3d_itk"]["woksele"] = int(np.count_nonzero(mask_3d))
+
+        _, lower, upper = silnik.progi(seed)
+        def sesja():
+            nowa = SesjaRozrostu(volume, seed)
+            nowa.ustaw_progi(lower, upper)
+            return nowa
+        sesja_rozrostu = etap("rozrost_3d_numpy", sesja)
+        assert np.array_equal(sesja_rozrostu.maska(), mask_3d), "Rozrost numpy różni się od ITK"
+
+        # Przetwarzanie plastrami z budżetem 1/8 wolumenu (co najmniej 8 plastrów)
+        budzet = volume.nbytes // 8
+        def rozrost_plastrami():
+            nowy = RozrostPlastrami(volume, seed, budzet=budzet)
+            nowy.ustaw_progi(lower, upper)
+            return nowy
+        rozrost = etap("rozrost_3d_plastry", rozrost_plastrami, budzet=budzet)
+        assert np.array_equal(rozrost.maska(), mask_3d), "Rozrost plastrami różni się od ITK"
+
+        maski, _ = etap("rozrost_dynamiczny", lambda: rozrost_dynamiczny(volume, (x, y), tryb=None), wycinki=len(volume))
+        etapy["rozrost_dynamiczny"]["bajty_masek"] = maski.nbytes
+
+        etap("numpy_do_vtk", lambda: numpy_do_vtk(volume, spacing, origin))
+        etap("maski_do_vtk", lambda: maski_do_vtk(maski, spacing, origin))
+        etap("maski_do_vtk_ramka", lambda: maski_do_vtk(maski, spacing, origin, przytnij=True))
+
+        surface = etap("powierzchnia_maski", lambda: siatka_z_maski(mask_3d, spacing, origin))
+        etapy["powierzchnia_maski"]["trojkaty"] = surface.GetNumberOfPolys()
+
+        def powierzchnia_wolumenu():
+            surface_extractor = vtk.vtkMarchingCubes()
+            surface_extractor.SetInputData(numpy_do_vtk(volume, spacing, origin))
+            surface_extractor.SetValue(0, args.iso)
+            surface_extractor.Update()
+            return surface_extractor.GetOutput()
+        surface = etap("marching_cubes_wolumen", powierzchnia_wolumenu, iso=args.iso)
+        etapy["marching_cubes_wolumen"]["trojkaty"] = surface.GetNumberOfPolys()
+
+        surface = etap("powierzchnia_plastrami", lambda: izopowierzchnia_plastrami(volume, args.iso, spacing, origin, budzet),
+                       iso=args.iso, budzet=budzet)
+        etapy["powierzchnia_plastrami"]["trojkaty"] = surface.GetNumberOfPolys()
+
+    parametry = {k: v for k, v in vars(args).items() if k != "funkcja"}
+    wynik = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "srodowisko": opis_srodowiska(),
+        "parametry": parametry,
+        "etapy": etapy,
+    }
+    with open(args.wynik, "w", encoding="utf-8") as f:
+        json.dump(wynik, f, indent=2, ensure_ascii=False)
+    print(f"Wyniki zapisane w {args.wynik}")
+
+    if args.porownaj:
+        porownaj_wyniki(args.porownaj, wynik)
+
+# Porównanie z wcześniejszym plikiem wyników (min czasu każdego etapu)
+def porownaj_wyniki(sciezka, wynik, prog=1.2):
+    with open(sciezka, encoding="utf-8") as f:
+        poprzedni = json.load(f)
+    print(f"Porównanie z {sciezka} (commit {poprzedni['srodowisko'].get('commit')}):")
+    # Inny fantom lub liczba powtórzeń - czasy nie są porównywalne
+    pomijane = ("wynik", "porownaj", "dane")
+    rozne = [k for k, v in wynik["parametry"].items() if k not in pomijane and poprzedni["parametry"].get(k) != v]
+    if rozne:
+        print(f"Uwaga: inne parametry ({', '.join(rozne)}) - porównanie orientacyjne")
+    for nazwa, pomiar in wynik["etapy"].items():
+        if nazwa not in poprzedni["etapy"]:
+            continue
+        stosunek = pomiar["min_s"] / max(poprzedni["etapy"][nazwa]["min_s"], 1e-9)
+        uwaga = " - WOLNIEJ" if stosunek > prog else ""
+        print(f"{nazwa:24} {stosunek:6.2f}x{uwaga}")
+
+# Zimny start narzędzia: nowy proces aż do pojawienia się w wyjściu wiersza znacznik
+# (bez wejścia - input() kończy proces po liście pacjentów)
+def czas_startu(polecenie, znacznik):
+    start = time.perf_counter()
+    proces = subprocess.Popen(polecenie, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        for wiersz in proces.stdout:
+            if znacznik in wiersz:
+                return time.perf_counter() - start
+        return None
+    finally:
+        proces.kill()
+        proces.wait()
+
+# Czas od uruchomienia do --help i do listy pacjentów (katalog serii już zapisany)
+def bench_start(args):
+    wejscie = [sys.executable, "pomwjo.py", args.narzedzie]
+    katalog = ["--katalog", args.katalog] if args.katalog else []
+    # Pierwsze uruchomienie zapisuje katalog serii - nie wchodzi do pomiaru
+    czas_startu(wejscie + [args.dicom_directory] + katalog, "Dostępni pacjenci:")
+
+    wyniki = {
+        "pomoc": [czas_startu(wejscie + ["--help"], "usage:") for _ in range(args.powtorzenia)],
+        "lista_pacjentow": [czas_startu(wejscie + [args.dicom_directory] + katalog, "Dostępni pacjenci:")
+                            for _ in range(args.powtorzenia)],
+    }
+    przekroczone = False
+    for nazwa, czasy in wyniki.items():
+        if None in czasy:
+            print(f"{nazwa:16} brak znacznika w wyjściu")
+            przekroczone = True
+            continue
+        najkrotszy = min(czasy) * 1000
+        uwaga = "" if najkrotszy <= args.budzet_ms else f" - PRZEKROCZONY BUDŻET {args.budzet_ms:.0f} ms"
+        przekroczone = przekroczone or bool(uwaga)
+        print(f"{nazwa:16} {najkrotszy:8.0f} ms (mediana {statistics.median(czasy) * 1000:.0f} ms){uwaga}")
+    return 1 if przekroczone else 0
+
+parser = argparse.ArgumentParser(description="Benchmarks of the DICOM processing stages.")
+subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+parser_odkrywanie = subparsers.add_parser("odkrywanie", help="Series discovery time (headers only vs full decode).")
+parser_odkrywanie.add_argument("dicom_directory")
+parser_odkrywanie.add_argument("--powtorzenia", type=int, default=3)
+parser_odkrywanie.add_argument("--procesy", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+parser_odkrywanie.add_argument("--bez-pelnego", action="store_true", help="Skip the full-decode reference path.")
+parser_odkrywanie.set_defaults(funkcja=bench_odkrywanie)
+
+parser_vtk = subparsers.add_parser("vtk", help="NumPy to vtkImageData conversion time vs volume size.")
+parser_vtk.add_argument("--rozmiary", type=int, nargs="+", default=[64, 128, 256, 512])
+parser_vtk.add_argument("--wycinki", type=int, default=300)
+parser_vtk.add_argument("--powtorzenia", type=int, default=3)
+parser_vtk.add_argument("--limit-petli", type=int, default=2_000_000, help="Largest volume (voxels) timed with the per-voxel loop.")
+parser_vtk.set_defaults(funkcja=bench_vtk)
+
+parser_segmentacja3d = subparsers.add_parser("segmentacja3d", help="Click-to-mask latency of 3D region growing.")
+parser_segmentacja3d.add_argument("--rozmiar", type=int, default=512)
+parser_segmentacja3d.add_argument("--wycinki", type=int, default=300)
+parser_segmentacja3d.add_argument("--klikniecia", type=int, default=5)
+parser_segmentacja3d.set_defaults(funkcja=bench_segmentacja3d)
+
+parser_dynamiczny = subparsers.add_parser("dynamiczny", help="Per-slice region growing: sequential vs parallel.")
+parser_dynamiczny.add_argument("--rozmiar", type=int, default=512)
+parser_dynamiczny.add_argument("--wycinki", type=int, default=300)
+parser_dynamiczny.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+parser_dynamiczny.add_argument("--powtorzenia", type=int, default=3)
+parser_dynamiczny.set_defaults(funkcja=bench_dynamiczny)
+
+parser_maski = subparsers.add_parser("maski", help="Mask write time and disk use: PNG directory vs NPZ / NRRD.")
+parser_maski.add_argument("--rozmiar", type=int, default=512)
+parser_maski.add_argument("--wycinki", type=int, default=300)
+parser_maski.add_argument("--powtorzenia", type=int, default=1)
+parser_maski.set_defaults(funkcja=bench_maski)
+
+parser_etapy = subparsers.add_parser("etapy", help="All processing stages on synthetic DICOM phantoms, results as JSON.")
+parser_etapy.add_argument("--rozmiar", type=int, default=256, help="Rows and columns of each slice.")
+parser_etapy.add_argument("--wycinki", type=int, default=100, help="Slices per series.")
+parser_etapy.add_argument("--serie", type=int, default=2, help="Number of generated series.")
+parser_etapy.add_argument("--guzy", type=int, default=3, help="Spherical tumours per series.")
+parser_etapy.add_argument("--promien", type=int, default=None, help="Tumour radius in voxels (default: 1/8 of the smallest dimension).")
+parser_etapy.add_argument("--ziarno", type=int, default=0, help="Random seed of the phantom.")
+parser_etapy.add_argument("--iso", type=float, default=500, help="Iso-value of the whole-volume marching cubes.")
+parser_etapy.add_argument("--powtorzenia", type=int, default=3)
+parser_etapy.add_argument("--dane", default=None, help="Directory for the generated DICOM files (default: temporary).")
+parser_etapy.add_argument("--wynik", default="benchmark.json", help="Output JSON file.")
+parser_etapy.add_argument("--porownaj", default=None, help="Earlier JSON result to compare stage times against.")
+parser_etapy.add_argument("--slad", default=None, help="Also write a Chrome/Perfetto trace of all stages to this file.")
+parser_etapy.set_defaults(funkcja=bench_etapy)
+
+parser_start = subparsers.add_parser("start", help="Cold-start time of a tool: --help and the patient list (warm catalog).")
+parser_start.add_argument("dicom_directory")
+parser_start.add_argument("--narzedzie", default="rekonstrukcja-vtk", help="Tool name as accepted by pomwjo.py.")
+parser_start.add_argument("--katalog", default=None, help="Path of the series catalog (SQLite).")
+parser_start.add_argument("--powtorzenia", type=int, default=5)
+parser_start.add_argument("--budzet-ms", type=float, default=300, help="Budget for each measurement; exit code 1 if exceeded.")
+parser_start.set_defaults(funkcja=bench_start)
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    return args.funkcja(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
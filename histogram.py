@@ -0,0 +1,81 @@
+import numpy as np
+
+# Histogram intensywności całej serii: jeden kosz na każdą wartość 16-bitową,
+# liczony w jednym przejściu wycinek po wycinku; zapytania o zakres w O(1)
+class HistogramSerii:
+    def __init__(self, dtype=np.int16):
+        self.przesuniecie = int(np.iinfo(dtype).min)
+        self.liczby = np.zeros(65536, dtype=np.int64)
+        self.skumulowany = None
+
+    def dodaj(self, wycinek):
+        indeksy = np.asarray(wycinek, dtype=np.int32).ravel() - self.przesuniecie
+        self.liczby += np.bincount(indeksy, minlength=65536)
+        self.skumulowany = None
+
+    def zakoncz(self):
+        self.skumulowany = np.cumsum(self.liczby)
+        return self
+
+    # Zapis jako jedna tablica int64: [przesuniecie, liczby...]
+    def zapisz(self, sciezka):
+        np.save(sciezka, np.concatenate(([self.przesuniecie], self.liczby)).astype(np.int64))
+
+    @classmethod
+    def wczytaj(cls, sciezka):
+        dane = np.load(sciezka, allow_pickle=False)
+        histogram = cls()
+        histogram.przesuniecie = int(dane[0])
+        histogram.liczby = dane[1:].astype(np.int64)
+        return histogram.zakoncz()
+
+    @classmethod
+    def z_wycinkow(cls, wycinki, dtype=np.int16):
+        histogram = cls(dtype)
+        for wycinek in wycinki:
+            histogram.dodaj(wycinek)
+        return histogram.zakoncz()
+
+    @property
+    def liczba_wokseli(self):
+        return int(self.skumulowany[-1])
+
+    @property
+    def minimum(self):
+        return int(np.flatnonzero(self.liczby)[0]) + self.przesuniecie
+
+    @property
+    def maksimum(self):
+        return int(np.flatnonzero(self.liczby)[-1]) + self.przesuniecie
+
+    # Liczba wokseli o intensywności w [lower, upper]
+    def liczba_w_zakresie(self, lower, upper):
+        lower = max(int(lower) - self.przesuniecie, 0)
+        upper = min(int(upper) - self.przesuniecie, 65535)
+        if upper < lower:
+            return 0
+        return int(self.skumulowany[upper] - (self.skumulowany[lower - 1] if lower > 0 else 0))
+
+    # Intensywność, poniżej której leży p% wokseli
+    def percentyl(self, p):
+        cel = max(p / 100.0 * self.liczba_wokseli, 1)
+        indeks = int(np.searchsorted(self.skumulowany, cel, side="left"))
+        return min(indeks, 65535) + self.przesuniecie
+
+    # Pozycja intensywności w rozkładzie (0..1), środek kosza
+    def ranga(self, intensity):
+        indeks = min(max(int(intensity) - self.przesuniecie, 0), 65535)
+        ponizej = self.skumulowany[indeks - 1] if indeks > 0 else 0
+        return (ponizej + self.skumulowany[indeks]) / 2.0 / self.liczba_wokseli
+
+    # Okno progów wokół intensywności punktu startowego: wartości obejmujące udzial wokseli
+    # po obu stronach jego pozycji w rozkładzie, ograniczone do intensity +/- maks_odchylenie
+    def proponuj_okno(self, intensity, udzial=0.05, maks_odchylenie=None):
+        intensity = int(intensity)
+        ranga = self.ranga(intensity)
+        lower = min(self.percentyl(100.0 * max(0.0, ranga - udzial)), intensity)
+        upper = max(self.percentyl(100.0 * min(1.0, ranga + udzial)), intensity)
+        if maks_odchylenie is not None:
+            lower = max(lower, intensity - maks_odchylenie)
+            upper = min(upper, intensity + maks_odchylenie)
+        return lower, upper
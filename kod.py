@@ -1,34 +1,76 @@
-import matplotlib.pyplot as plt
-import pydicom as dicom
 import os
+import sys
+import argparse
+import numpy as np
+from pamiec_wycinkow import PamiecWycinkow
+from wyswietlanie import WidokWycinka
 
 folder_path = 'X:/Piotrek/Studia Magisterka/SEMESTR 2/Przetwarzanie Obrazow Medycznych w Jezykach Obiektowych/BT/BT/KARY1/A/A/A/D'
-dicom_files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-dicom_files.sort()
 
+parser = argparse.ArgumentParser(description="Browse the DICOM files of one folder.")
+parser.add_argument("folder", nargs="?", default=folder_path, help="Folder with the DICOM files of one series.")
+
+# Stan przeglądarki ustawiany w main()
+dicom_files = []
+pamiec = None
+widok = None
 current_index = 0
+kierunek = 1
+
+# Wycinek jako int16 po rescale slope/intercept (ta sama reprezentacja co wolumen serii);
+# rescale liczony dopiero dla dekodowanego wycinka
+def dekoduj(index):
+    import pydicom as dicom
 
-def show_image(index):
     file_path = os.path.join(folder_path, dicom_files[index])
-    dicom_image = dicom.dcmread(file_path)
-    image_data = dicom_image.pixel_array
+    ds = dicom.dcmread(file_path)
+    slope = float(ds.get("RescaleSlope", 1) or 1)
+    intercept = float(ds.get("RescaleIntercept", 0) or 0)
+    # Rescale w int32 (całkowite współczynniki) lub float, potem obcięcie do zakresu int16 -
+    # bez przepełnienia przy dużych wartościach pikseli
+    wycinek = ds.pixel_array
+    if slope == 1 and intercept.is_integer():
+        wycinek = wycinek.astype(np.int32) + int(intercept)
+    else:
+        wycinek = np.rint(wycinek * slope + intercept)
+    return np.clip(wycinek, -32768, 32767).astype(np.int16)
+
+def show_image(index):
+    image_data = pamiec.wycinek(index, kierunek)
 
-    plt.imshow(image_data, cmap="gray")
-    plt.axis("off")
-    plt.title(f"Obraz {index + 1}/{len(dicom_files)}")
-    plt.draw()
+    widok.pokaz(image_data, f"Obraz {index + 1}/{len(dicom_files)}")
 
 def on_key(event):
-    global current_index
+    global current_index, kierunek
     if event.key == 'right':
+        kierunek = 1
         current_index = (current_index + 1) % len(dicom_files)
     elif event.key == 'left':
+        kierunek = -1
         current_index = (current_index - 1) % len(dicom_files)
 
-    plt.clf()
     show_image(current_index)
 
-fig, ax = plt.subplots()
-show_image(current_index)
-fig.canvas.mpl_connect('key_press_event', on_key)
-plt.show()
\ No newline at end of file
+# matplotlib i pydicom ładowane dopiero w main() / przy dekodowaniu
+def main(argv=None):
+    global folder_path, dicom_files, pamiec, widok
+    folder_path = parser.parse_args(argv).folder
+    dicom_files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
+    dicom_files.sort()
+
+    # Zdekodowane wycinki w pamięci LRU, sąsiednie dekodowane w tle
+    pamiec = PamiecWycinkow(dekoduj, len(dicom_files))
+
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    widok = WidokWycinka(ax)
+    show_image(current_index)
+    fig.canvas.mpl_connect('key_press_event', on_key)
+    fig.canvas.mpl_connect('close_event', lambda event: print(pamiec.statystyki() + "\n" + widok.statystyki()))
+    plt.show()
+    pamiec.zamknij()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,87 @@
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+import pomiary
+
+# Tablica NumPy (Z, Y, X) jako vtkImageData - VTK czyta bufor NumPy bezpośrednio.
+# Kopia powstaje tylko wtedy, gdy tablica nie jest ciągła w pamięci (C-order)
+# albo jej typ nie ma odpowiednika w VTK (bool jest podawany jako widok uint8).
+def numpy_do_vtk(tablica, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    if tablica.dtype == np.bool_:
+        tablica = tablica.view(np.uint8)
+    # bajty - rozmiar kopii (0, gdy VTK dostaje bufor NumPy bez kopiowania)
+    with pomiary.etap("numpy_do_vtk", woksele=tablica.size,
+                      bajty=0 if tablica.flags.c_contiguous else tablica.nbytes):
+        tablica = np.ascontiguousarray(tablica)
+
+    image = vtk.vtkImageData()
+    # Kolejność C (Z, Y, X) odpowiada VTK (X najszybciej zmienny)
+    image.SetDimensions(tablica.shape[2], tablica.shape[1], tablica.shape[0])
+    image.SetSpacing(spacing)
+    image.SetOrigin(origin)
+
+    scalars = numpy_support.numpy_to_vtk(tablica.reshape(-1), deep=False)
+    image.GetPointData().SetScalars(scalars)
+    # VTK nie przejmuje bufora - referencja musi żyć tak długo jak obraz
+    image.tablica_numpy = tablica
+    return image
+
+# Ramka maski (z0, z1, y0, y1, x0, x1), zakresy połówkowo otwarte; None dla pustej maski
+def ramka_maski(mask):
+    z = np.flatnonzero(mask.any(axis=(1, 2)))
+    if z.size == 0:
+        return None
+    czesc = mask[z[0]:z[-1] + 1]
+    y = np.flatnonzero(czesc.any(axis=(0, 2)))
+    x = np.flatnonzero(czesc.any(axis=(0, 1)))
+    return (int(z[0]), int(z[-1]) + 1, int(y[0]), int(y[-1]) + 1, int(x[0]), int(x[-1]) + 1)
+
+# Ramka powiększona o margines (izopowierzchnia domyka się na brzegu), ograniczona do wolumenu
+def powieksz_ramke(ramka, shape, margines=1):
+    z0, z1, y0, y1, x0, x1 = ramka
+    return (max(z0 - margines, 0), min(z1 + margines, shape[0]),
+            max(y0 - margines, 0), min(y1 + margines, shape[1]),
+            max(x0 - margines, 0), min(x1 + margines, shape[2]))
+
+# Origin rogu ramki - siatka z przyciętego obrazu leży w tym samym miejscu w układzie
+# pacjenta co z całego wolumenu
+def origin_ramki(ramka, spacing, origin):
+    z0, _, y0, _, x0, _ = ramka
+    return (origin[0] + x0 * spacing[0], origin[1] + y0 * spacing[1], origin[2] + z0 * spacing[2])
+
+# Fragment tablicy w ramce jako vtkImageData
+def przytnij_do_vtk(tablica, ramka, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    z0, z1, y0, y1, x0, x1 = ramka
+    return numpy_do_vtk(tablica[z0:z1, y0:y1, x0:x1], spacing, origin_ramki(ramka, spacing, origin))
+
+# Lista masek 2D (po jednej na wycinek) jako obraz 0/1 uint8. przytnij=True - ramka maski
+# liczona w tym samym przejściu po wycinkach, obraz obejmuje tylko ramkę (+ margines)
+@pomiary.mierzony("maski_do_vtk")
+def maski_do_vtk(maski, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0), przytnij=False, margines=1):
+    # Maski spakowane (MaskiWycinkow) znają swoją ramkę - rozpakowana jest tylko ramka
+    if przytnij and hasattr(maski, "ramka"):
+        ramka = powieksz_ramke(maski.ramka() or (0, 1, 0, 1, 0, 1), maski.shape, margines)
+        return numpy_do_vtk(maski.wolumen(ramka), spacing, origin_ramki(ramka, spacing, origin))
+    wolumen = np.empty((len(maski),) + maski[0].shape, dtype=np.bool_)
+    ramka = None
+    for z, maska in enumerate(maski):
+        np.greater(maska, 0, out=wolumen[z])
+        if not przytnij:
+            continue
+        wiersze = np.flatnonzero(wolumen[z].any(axis=1))
+        if wiersze.size == 0:
+            continue
+        kolumny = np.flatnonzero(wolumen[z, wiersze[0]:wiersze[-1] + 1].any(axis=0))
+        y0, y1, x0, x1 = int(wiersze[0]), int(wiersze[-1]) + 1, int(kolumny[0]), int(kolumny[-1]) + 1
+        if ramka is None:
+            ramka = [z, z + 1, y0, y1, x0, x1]
+        else:
+            ramka[1] = z + 1
+            ramka[2], ramka[3] = min(ramka[2], y0), max(ramka[3], y1)
+            ramka[4], ramka[5] = min(ramka[4], x0), max(ramka[5], x1)
+
+    if not przytnij:
+        return numpy_do_vtk(wolumen, spacing, origin)
+    # Pusta maska - najmniejszy obraz, z którego nie powstanie żadna powierzchnia
+    ramka = powieksz_ramke(ramka or (0, 1, 0, 1, 0, 1), wolumen.shape, margines)
+    return przytnij_do_vtk(wolumen, ramka, spacing, origin)
@@ -0,0 +1,31 @@
+import threading
+
+# ITK ładowane przy pierwszym użyciu: sam import trwa ~1 s, pierwsze użycie typów kolejne
+# sekundy - odkrywanie serii, lista pacjentów i wyświetlanie z pamięci wolumenu go nie potrzebują
+_itk = None
+_no_output = None
+_blokada = threading.Lock()
+
+def itk():
+    global _itk, _no_output
+    if _itk is not None:
+        return _itk
+    with _blokada:
+        if _itk is None:
+            import itk as modul
+
+            # Komunikaty ITK (np. ostrzeżenia GDCM) wyciszone raz dla całego programu
+            class NoOutput(modul.OutputWindow):
+                def DisplayText(self, text):
+                    pass
+
+            modul.OutputWindow.SetGlobalWarningDisplay(False)
+            _no_output = NoOutput.New()
+            modul.OutputWindow.SetInstance(_no_output)
+            _itk = modul
+    return _itk
+
+# Typ obrazu ITK z pikselami signed short (jak dekodowane serie)
+def typ_obrazu(wymiar):
+    itk_ = itk()
+    return itk_.Image[itk_.ctype("signed short"), wymiar]
@@ -0,0 +1,77 @@
+import numpy as np
+
+# Wpis maski jednego wycinka: None dla pustej maski, inaczej ramka (y0, y1, x0, x1), bity
+# ramki spakowane wzdłuż X (1 bit na woksel) i liczba wokseli maski
+def spakuj(maska):
+    maska = np.asarray(maska)
+    if maska.dtype != np.bool_:
+        maska = maska > 0
+    wiersze = np.flatnonzero(maska.any(axis=1))
+    if wiersze.size == 0:
+        return None
+    y0, y1 = int(wiersze[0]), int(wiersze[-1]) + 1
+    kolumny = np.flatnonzero(maska[y0:y1].any(axis=0))
+    x0, x1 = int(kolumny[0]), int(kolumny[-1]) + 1
+    ramka = maska[y0:y1, x0:x1]
+    return y0, y1, x0, x1, np.packbits(ramka, axis=-1), int(np.count_nonzero(ramka))
+
+# Maski wycinków (Z, Y, X) bez pełnego wolumenu: pusty wycinek nic nie kosztuje, niepusty
+# to bity jego ramki. Dostęp jak do listy masek 2D - maski[z] rozpakowuje tylko ten wycinek
+# (pusty - wspólna tablica tylko do odczytu), maski[z0:z1] daje listę wycinków
+class MaskiWycinkow:
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.wpisy = [None] * self.shape[0]
+        self._pusty = np.zeros(self.shape[1:], dtype=np.bool_)
+        self._pusty.flags.writeable = False
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, z):
+        if isinstance(z, slice):
+            return [self[i] for i in range(*z.indices(len(self)))]
+        wpis = self.wpisy[z]
+        if wpis is None:
+            return self._pusty
+        y0, y1, x0, x1, bity, _ = wpis
+        maska = np.zeros(self.shape[1:], dtype=np.bool_)
+        maska[y0:y1, x0:x1] = np.unpackbits(bity, axis=-1, count=x1 - x0).view(np.bool_)
+        return maska
+
+    def __setitem__(self, z, maska):
+        self.wpisy[z] = None if maska is None else spakuj(maska)
+
+    def liczba_wokseli(self):
+        return sum(wpis[5] for wpis in self.wpisy if wpis is not None)
+
+    # Rozmiar spakowanych bitów (bez pustych wycinków)
+    @property
+    def nbytes(self):
+        return sum(wpis[4].nbytes for wpis in self.wpisy if wpis is not None)
+
+    # Ramka (z0, z1, y0, y1, x0, x1) z ramek wycinków, bez rozpakowywania; None dla pustych masek
+    def ramka(self):
+        niepuste = [(z, wpis) for z, wpis in enumerate(self.wpisy) if wpis is not None]
+        if not niepuste:
+            return None
+        return (niepuste[0][0], niepuste[-1][0] + 1,
+                min(wpis[0] for _, wpis in niepuste), max(wpis[1] for _, wpis in niepuste),
+                min(wpis[2] for _, wpis in niepuste), max(wpis[3] for _, wpis in niepuste))
+
+    # Maska bool (Z, Y, X) tylko w ramce (domyślnie cały wolumen)
+    def wolumen(self, ramka=None):
+        z0, z1, y0, y1, x0, x1 = ramka or (0, self.shape[0], 0, self.shape[1], 0, self.shape[2])
+        wynik = np.zeros((z1 - z0, y1 - y0, x1 - x0), dtype=np.bool_)
+        for z in range(z0, z1):
+            wpis = self.wpisy[z]
+            if wpis is None:
+                continue
+            wy0, wy1, wx0, wx1, bity, _ = wpis
+            # Część wspólna ramki wycinka i ramki wyniku
+            ay0, ay1, ax0, ax1 = max(wy0, y0), min(wy1, y1), max(wx0, x0), min(wx1, x1)
+            if ay0 >= ay1 or ax0 >= ax1:
+                continue
+            rozpakowane = np.unpackbits(bity, axis=-1, count=wx1 - wx0).view(np.bool_)
+            wynik[z - z0, ay0 - y0:ay1 - y0, ax0 - x0:ax1 - x0] = rozpakowane[ay0 - wy0:ay1 - wy0, ax0 - wx0:ax1 - wx0]
+        return wynik
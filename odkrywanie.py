@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pomiary
+
+NAZWA_KATALOGU = ".katalog_serii.sqlite"
+
+# Tagi odczytywane z nagłówka - dane pikseli nie są wczytywane
+TAGI_NAGLOWKA = [
+    "PatientName",
+    "SeriesInstanceUID",
+    "SeriesDescription",
+    "InstanceNumber",
+    "ImagePositionPatient",
+    "SeriesNumber",
+    "Rows",
+    "Columns",
+    "ImageOrientationPatient",
+]
+
+# Wersja zawartości katalogu serii - starsze katalogi są budowane od nowa
+WERSJA_KATALOGU = 1
+
+# Klucz serii jak w GDCM z SetUseSeriesDetails(True): UID serii uzupełniony o numer serii,
+# rozmiar obrazu i orientację - obrazy innego rozmiaru (np. lokalizatory) albo kolejne
+# wolumeny pod jednym UID tworzą osobne serie
+def klucz_serii(ds, series_id):
+    orientacja = ds.get("ImageOrientationPatient")
+    szczegoly = [
+        ds.get("SeriesNumber"),
+        f"{ds.get('Rows')}x{ds.get('Columns')}",
+        "_".join(f"{float(v):.3f}" for v in orientacja) if orientacja else None,
+    ]
+    return "|".join([str(series_id)] + ["" if s is None else str(s) for s in szczegoly])
+
+# UID serii z klucza serii
+def uid_serii(klucz):
+    return klucz.split("|", 1)[0]
+
+# Odczyt samego nagłówka DICOM (zatrzymanie przed 7FE0,0010). pydicom importowany dopiero
+# tutaj - przy aktualnym katalogu serii lista pacjentów powstaje bez niego
+def odczytaj_naglowek(file_name):
+    import pydicom
+
+    try:
+        ds = pydicom.dcmread(file_name, stop_before_pixels=True, specific_tags=TAGI_NAGLOWKA)
+    except Exception:
+        return None
+
+    series_id = ds.get("SeriesInstanceUID")
+    if not series_id:
+        return None
+
+    patient_name = ds.get("PatientName")
+    position = ds.get("ImagePositionPatient")
+    instance = ds.get("InstanceNumber")
+
+    return {
+        "file_name": file_name,
+        "patient_name": str(patient_name) if patient_name is not None else None,
+        "series_id": klucz_serii(ds, series_id),
+        "series_desc": str(ds.get("SeriesDescription", "Unknown Series")),
+        "instance": int(instance) if instance is not None else None,
+        "position": float(position[2]) if position else None,
+    }
+
+def klucz_wycinka(naglowek):
+    instance = naglowek["instance"]
+    position = naglowek["position"]
+    return (
+        instance is None,
+        instance if instance is not None else 0,
+        position is None,
+        position if position is not None else 0.0,
+        naglowek["file_name"],
+    )
+
+# Nagłówki wszystkich plików DICOM w jednym folderze (bez podfolderów)
+def skanuj_folder(dir_name):
+    naglowki = []
+    try:
+        entries = sorted(os.scandir(dir_name), key=lambda e: e.name)
+    except OSError:
+        return naglowki
+
+    for entry in entries:
+        if not entry.is_file():
+            continue
+        naglowek = odczytaj_naglowek(entry.path)
+        if naglowek is not None:
+            naglowki.append(naglowek)
+
+    naglowki.sort(key=klucz_wycinka)
+    return naglowki
+
+# Dopisanie nagłówków do struktur patients / series_descriptions
+def dodaj_naglowki(naglowki, patients, series_descriptions, domyslny_pacjent=None):
+    for naglowek in naglowki:
+        patient_name = naglowek["patient_name"] or domyslny_pacjent
+        if patient_name is None:
+            continue
+        series_id = naglowek["series_id"]
+
+        if patient_name not in patients:
+            patients[patient_name] = {}
+        if series_id not in patients[patient_name]:
+            patients[patient_name][series_id] = []
+        patients[patient_name][series_id].append(naglowek["file_name"])
+
+        series_descriptions[series_id] = naglowek["series_desc"]
+
+def process_folder(dir_name, patients, series_descriptions, domyslny_pacjent=None):
+    with pomiary.etap("process_folder", folder=dir_name) as pomiar:
+        naglowki = skanuj_folder(dir_name)
+        pomiar.dodaj(pliki=len(naglowki))
+        dodaj_naglowki(naglowki, patients, series_descriptions, domyslny_pacjent)
+
+# Trwały katalog nagłówków: plik jest czytany ponownie tylko po zmianie rozmiaru lub mtime
+class KatalogSerii:
+    def __init__(self, sciezka):
+        self.sciezka = sciezka
+        self.polaczenie = sqlite3.connect(sciezka)
+        # Katalog z wcześniejszej wersji (np. klucze serii bez szczegółów) - od nowa
+        if self.polaczenie.execute("PRAGMA user_version").fetchone()[0] < WERSJA_KATALOGU:
+            with self.polaczenie:
+                self.polaczenie.execute("DROP TABLE IF EXISTS pliki")
+                self.polaczenie.execute(f"PRAGMA user_version = {WERSJA_KATALOGU}")
+        self.polaczenie.execute(
+            "CREATE TABLE IF NOT EXISTS pliki ("
+            "file_name TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+            "patient_name TEXT, series_id TEXT, series_desc TEXT, "
+            "instance INTEGER, position REAL)"
+        )
+
+    def wczytaj(self):
+        wiersze = self.polaczenie.execute(
+            "SELECT file_name, size, mtime, patient_name, series_id, series_desc, instance, position FROM pliki"
+        )
+        return {wiersz[0]: wiersz for wiersz in wiersze}
+
+    def zapisz(self, zmienione, usuniete):
+        with self.polaczenie:
+            self.polaczenie.executemany("DELETE FROM pliki WHERE file_name = ?", ((f,) for f in usuniete))
+            self.polaczenie.executemany("INSERT OR REPLACE INTO pliki VALUES (?, ?, ?, ?, ?, ?, ?, ?)", zmienione)
+
+    def zamknij(self):
+        self.polaczenie.close()
+
+def domyslna_sciezka_katalogu(main_dir):
+    if os.access(main_dir, os.W_OK):
+        return os.path.join(main_dir, NAZWA_KATALOGU)
+    # Dane tylko do odczytu - katalog w pamięci podręcznej użytkownika
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "pomwjo")
+    os.makedirs(cache_dir, exist_ok=True)
+    nazwa = os.path.abspath(main_dir).replace(os.sep, "_").replace(":", "_")
+    return os.path.join(cache_dir, nazwa + ".sqlite")
+
+# Pliki kolejnych folderów (posortowane) wraz z rozmiarem i czasem modyfikacji
+def pliki_folderow(main_dir):
+    stos = [main_dir]
+    while stos:
+        dir_name = stos.pop()
+        pliki = []
+        podfoldery = []
+        try:
+            with os.scandir(dir_name) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            podfoldery.append(entry.path)
+                        elif entry.is_file() and not entry.name.startswith(NAZWA_KATALOGU):
+                            stat = entry.stat()
+                            pliki.append((entry.path, stat.st_size, stat.st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        pliki.sort()
+        yield dir_name, pliki
+        podfoldery.sort(reverse=True)
+        stos.extend(podfoldery)
+
+# Maksymalna liczba plików w jednym zadaniu puli (duże foldery są dzielone)
+ROZMIAR_ZADANIA = 256
+
+def czytaj_naglowki(file_names):
+    return [odczytaj_naglowek(file_name) for file_name in file_names]
+
+def domyslna_liczba_procesow():
+    return os.cpu_count() or 1
+
+# fork, gdzie jest dostępny (szybki start procesów); inaczej (Windows) spawn - procesy
+# robocze importują tylko ten moduł, skrypty mają main() pod "if __name__ == '__main__'"
+def kontekst_procesow():
+    metody = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in metody else "spawn")
+
+def wypisz_postep(zrobione, wszystkie):
+    print(f"\rOdkrywanie serii: {zrobione}/{wszystkie} plików", end="" if zrobione < wszystkie else "\n", flush=True)
+
+# Odczyt nagłówków listy folderów; wynik w tej samej kolejności co wejście
+def czytaj_foldery(foldery, procesy=None, postep=None):
+    wyniki = [[None] * len(file_names) for file_names in foldery]
+    zadania = [
+        (i, start, file_names[start:start + ROZMIAR_ZADANIA])
+        for i, file_names in enumerate(foldery)
+        for start in range(0, len(file_names), ROZMIAR_ZADANIA)
+    ]
+    wszystkie = sum(len(file_names) for file_names in foldery)
+    zrobione = 0
+    if procesy is None:
+        procesy = domyslna_liczba_procesow()
+
+    if procesy <= 1 or len(zadania) <= 1:
+        for i, start, file_names in zadania:
+            wyniki[i][start:start + len(file_names)] = czytaj_naglowki(file_names)
+            zrobione += len(file_names)
+            if postep:
+                postep(zrobione, wszystkie)
+        return wyniki
+
+    with ProcessPoolExecutor(max_workers=min(procesy, len(zadania)), mp_context=kontekst_procesow()) as executor:
+        futures = {executor.submit(czytaj_naglowki, file_names): (i, start) for i, start, file_names in zadania}
+        for future in as_completed(futures):
+            i, start = futures[future]
+            naglowki = future.result()
+            wyniki[i][start:start + len(naglowki)] = naglowki
+            zrobione += len(naglowki)
+            if postep:
+                postep(zrobione, wszystkie)
+    return wyniki
+
+# Odkrywanie serii w całym drzewie (katalog_path=False - bez katalogu, procesy=1 - jeden proces)
+@pomiary.mierzony("skanuj")
+def skanuj(main_dir, patients, series_descriptions, katalog_path=None, domyslny_pacjent=None, procesy=None, postep=None):
+    main_dir = os.path.abspath(main_dir)
+    katalog = None
+    zapisane = {}
+    if katalog_path is not False:
+        katalog = KatalogSerii(katalog_path or domyslna_sciezka_katalogu(main_dir))
+        zapisane = katalog.wczytaj()
+
+    # Nagłówki z katalogu oraz pliki do odczytu, folder po folderze
+    foldery = []
+    for dir_name, pliki in pliki_folderow(main_dir):
+        naglowki = []
+        do_odczytu = []
+        for file_name, size, mtime in pliki:
+            wiersz = zapisane.pop(file_name, None)
+            if wiersz is not None and wiersz[1] == size and wiersz[2] == mtime:
+                if wiersz[4] is not None:
+                    naglowki.append({
+                        "file_name": file_name,
+                        "patient_name": wiersz[3],
+                        "series_id": wiersz[4],
+                        "series_desc": wiersz[5],
+                        "instance": wiersz[6],
+                        "position": wiersz[7],
+                    })
+                continue
+            do_odczytu.append((file_name, size, mtime))
+        foldery.append((naglowki, do_odczytu))
+
+    nazwy = [[p[0] for p in do_odczytu] for _, do_odczytu in foldery]
+    with pomiary.etap("odczyt_naglowkow", pliki=sum(len(f) for f in nazwy),
+                      z_katalogu=sum(len(naglowki) for naglowki, _ in foldery)):
+        odczytane = czytaj_foldery(nazwy, procesy, postep)
+
+    # Scalanie w kolejności folderów - wynik nie zależy od kolejności pracy procesów
+    zmienione = []
+    for (naglowki, do_odczytu), wyniki in zip(foldery, odczytane):
+        for (file_name, size, mtime), naglowek in zip(do_odczytu, wyniki):
+            if naglowek is None:
+                zmienione.append((file_name, size, mtime, None, None, None, None, None))
+                continue
+            naglowki.append(naglowek)
+            zmienione.append((
+                file_name, size, mtime,
+                naglowek["patient_name"], naglowek["series_id"], naglowek["series_desc"],
+                naglowek["instance"], naglowek["position"],
+            ))
+
+        naglowki.sort(key=klucz_wycinka)
+        dodaj_naglowki(naglowki, patients, series_descriptions, domyslny_pacjent)
+
+    if katalog is not None:
+        # Pozostałe wpisy dotyczą plików, których już nie ma
+        katalog.zapisz(zmienione, zapisane.keys())
+        katalog.zamknij()
@@ -0,0 +1,102 @@
+import odkrywanie
+import pomiary
+
+# Opcje wspólne dla przeglądarek serii; budzet_pamieci - też --budzet-pamieci (rozrost 3D
+# i powierzchnie plastrami)
+def dodaj_opcje(parser, dane_obrazowe, budzet_pamieci=False):
+    parser.add_argument(
+        "dicom_directory",
+        nargs="?",
+        default=dane_obrazowe,
+        help="If DicomDirectory is not specified, the current directory is used.",
+    )
+    parser.add_argument(
+        "--katalog",
+        default=None,
+        help="Path of the series catalog (SQLite). Defaults to a file next to the data.",
+    )
+    parser.add_argument(
+        "--procesy",
+        type=int,
+        default=None,
+        help="Number of worker processes for series discovery (1 = single process).",
+    )
+    parser.add_argument(
+        "--okno-adaptacyjne",
+        type=float,
+        default=None,
+        help="Adaptive seed window: fraction of series voxels taken on each side of the seed intensity "
+             "(from the precomputed series histogram, capped by the fixed window).",
+    )
+    if budzet_pamieci:
+        parser.add_argument(
+            "--budzet-pamieci",
+            type=float,
+            default=1024,
+            help="Memory budget in MiB for 3D region growing and surface extraction; larger series are "
+                 "processed in slabs of slices streamed from the on-disk volume.",
+        )
+    parser.add_argument(
+        "--slad",
+        default=None,
+        help="Record per-stage timings (time, bytes, voxels) and write a Chrome/Perfetto trace JSON "
+             "to this file on exit.",
+    )
+
+def list_patients(patients):
+    print("Dostępni pacjenci:")
+    for i, patient in enumerate(patients.keys(), start=1):
+        print(f"{i}. {patient}")
+
+def select_patient(patients):
+    while True:
+        try:
+            choice = int(input("\nWybierz numer pacjenta: "))
+            if 1 <= choice <= len(patients):
+                return list(patients.keys())[choice - 1]
+            else:
+                print("Błąd. Wybierz poprawny numer.")
+        except ValueError:
+            print("Błąd wejścia. Proszę wpisz numer.")
+
+def list_series(patients, series_descriptions, patient):
+    print(f"\nSerie pacjenta: '{patient}':")
+    for i, series_id in enumerate(patients[patient].keys(), start=1):
+        series_desc = series_descriptions.get(series_id, "Unknown Series")
+        print(f"{i}. {series_desc}")
+
+def select_series(patients, patient):
+    while True:
+        try:
+            choice = int(input("\nWybierz serię do wyświetlania: "))
+            if 1 <= choice <= len(patients[patient]):
+                return list(patients[patient].keys())[choice - 1]
+            else:
+                print("Błąd. Wybierz poprawny numer.")
+        except ValueError:
+            print("Błąd wejścia. Proszę wpisz numer.")
+
+# Początek main() przeglądarek: pomiary (--slad), odkrywanie serii w args.dicom_directory
+# i wybór pacjenta oraz serii z konsoli. Wynik: (klucz serii, pliki w kolejności wycinków)
+# albo None, gdy nie znaleziono pacjentów
+def wybierz_serie(args, domyslny_pacjent=None):
+    # Pomiary etapów tylko na życzenie - wyłączone nic nie kosztują
+    if args.slad:
+        pomiary.wlacz(args.slad)
+
+    # Odkrywanie serii (nagłówki DICOM, katalog z mtime/rozmiarem plików)
+    patients = {}
+    series_descriptions = {}
+    odkrywanie.skanuj(args.dicom_directory, patients, series_descriptions, katalog_path=args.katalog,
+           domyslny_pacjent=domyslny_pacjent, procesy=args.procesy, postep=odkrywanie.wypisz_postep)
+
+    if not patients:
+        print("Nie znaleziono pacjentów.")
+        return None
+
+    list_patients(patients)
+    selected_patient = select_patient(patients)
+    list_series(patients, series_descriptions, selected_patient)
+    selected_series_uid = select_series(patients, selected_patient)
+    # Kolejność z klucz_wycinka (numer instancji, pozycja), nie nazw plików (IM1, IM10, IM2)
+    return selected_series_uid, list(dict.fromkeys(patients[selected_patient][selected_series_uid]))
@@ -0,0 +1,109 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Ograniczona (MB) pamięć LRU zdekodowanych wycinków z wątkiem dekodującym z wyprzedzeniem
+# kolejne wycinki w kierunku przewijania; dekoduj(z) zwraca tablicę wycinka z
+class PamiecWycinkow:
+    def __init__(self, dekoduj, liczba, limit_mb=256, wyprzedzenie=4, watki=1):
+        self.dekoduj = dekoduj
+        self.liczba = liczba
+        self.limit = int(limit_mb * 1024 * 1024)
+        self.wyprzedzenie = wyprzedzenie
+
+        self.wycinki = OrderedDict()
+        self.rozmiar = 0
+        self.w_toku = {}
+        self.blokada = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=watki, thread_name_prefix="wyprzedzanie")
+        self.zamknieta = False
+
+        self.trafienia = 0
+        self.chybienia = 0
+        self.liczba_dekodowan = 0
+        self.czas_dekodowania = 0.0
+
+    def _dekoduj(self, z):
+        start = time.perf_counter()
+        try:
+            wycinek = np.asarray(self.dekoduj(z))
+        except BaseException:
+            # Błąd dekodowania nie blokuje wycinka - kolejne żądanie spróbuje ponownie
+            with self.blokada:
+                self.w_toku.pop(z, None)
+            raise
+        czas = time.perf_counter() - start
+
+        with self.blokada:
+            self.liczba_dekodowan += 1
+            self.czas_dekodowania += czas
+            self.w_toku.pop(z, None)
+            if z not in self.wycinki:
+                self.wycinki[z] = wycinek
+                self.rozmiar += wycinek.nbytes
+                # Usuwanie najdawniej używanych, ale zawsze zostaje bieżący wycinek
+                while self.rozmiar > self.limit and len(self.wycinki) > 1:
+                    _, usuniety = self.wycinki.popitem(last=False)
+                    self.rozmiar -= usuniety.nbytes
+            return self.wycinki[z]
+
+    # Wycinek z; kierunek (+1 / -1) wyznacza, które sąsiednie wycinki są dekodowane w tle
+    def wycinek(self, z, kierunek=1):
+        with self.blokada:
+            wycinek = self.wycinki.get(z)
+            if wycinek is not None:
+                self.wycinki.move_to_end(z)
+                self.trafienia += 1
+            else:
+                self.chybienia += 1
+                future = self.w_toku.get(z)
+
+        if wycinek is None:
+            # Wycinek dekodowany właśnie w tle - czekamy na niego zamiast dekodować drugi raz
+            wycinek = future.result() if future is not None else self._dekoduj(z)
+
+        self.wyprzedzaj(z, kierunek)
+        return wycinek
+
+    # Wycinek z dla przejścia po całej serii w tle (np. histogram): z pamięci albo dekodowany
+    # raz i zapamiętany - bez wyprzedzania (nie anuluje okna przeglądania) i bez statystyk trafień
+    def wczytaj(self, z):
+        with self.blokada:
+            wycinek = self.wycinki.get(z)
+            future = self.w_toku.get(z)
+        if wycinek is not None:
+            return wycinek
+        return future.result() if future is not None else self._dekoduj(z)
+
+    def wyprzedzaj(self, z, kierunek):
+        if self.zamknieta:
+            return
+        do_przodu = [(z + kierunek * k) % self.liczba for k in range(1, self.wyprzedzenie + 1)]
+        do_tylu = [(z - kierunek * k) % self.liczba for k in range(1, max(1, self.wyprzedzenie // 4) + 1)]
+        okno = set(do_przodu + do_tylu)
+
+        with self.blokada:
+            # Zadania spoza nowego okna (szybkie przewijanie) są anulowane, jeśli jeszcze nie ruszyły
+            for indeks, future in list(self.w_toku.items()):
+                if indeks not in okno and future.cancel():
+                    del self.w_toku[indeks]
+            for indeks in do_przodu + do_tylu:
+                if indeks not in self.wycinki and indeks not in self.w_toku:
+                    self.w_toku[indeks] = self.executor.submit(self._dekoduj, indeks)
+
+    @property
+    def procent_trafien(self):
+        wszystkie = self.trafienia + self.chybienia
+        return 100.0 * self.trafienia / wszystkie if wszystkie else 0.0
+
+    def statystyki(self):
+        sredni = 1000.0 * self.czas_dekodowania / self.liczba_dekodowan if self.liczba_dekodowan else 0.0
+        return (f"Pamięć wycinków: trafienia {self.trafienia}, chybienia {self.chybienia} "
+                f"({self.procent_trafien:.0f}%), dekodowania {self.liczba_dekodowan}, "
+                f"średni czas dekodowania {sredni:.1f} ms, zajęte {self.rozmiar / 2**20:.1f} MB")
+
+    def zamknij(self):
+        self.zamknieta = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,32 @@
+import tempfile
+import numpy as np
+
+# Serie większe niż pamięć: wolumen (Z, Y, X) przetwarzany plastrami kolejnych wycinków.
+# Dane czyta się z pliku mapowanego w pamięci (WolumenSerii), w pamięci programu jest
+# tylko bieżący plaster z zakładką (halo) - budżet ogranicza rozmiar plastra
+BUDZET_PAMIECI = 1024 * 2 ** 20
+
+def bajty_wycinka(shape, bajty_na_woksel):
+    return int(np.prod(shape[1:])) * bajty_na_woksel
+
+def miesci_sie(shape, bajty_na_woksel, budzet=BUDZET_PAMIECI):
+    return shape[0] * bajty_wycinka(shape, bajty_na_woksel) <= budzet
+
+# Plastry (z0, z1, h0, h1): wycinki z0..z1-1 i zakres z halo wycinków z każdej strony
+# (ograniczony do wolumenu); plaster z halo mieści się w budżecie, ale ma co najmniej
+# jeden wycinek. wielokrotnosc - grubość plastra podzielna przez nią (np. krok zmniejszenia)
+def plastry(shape, bajty_na_woksel, budzet=BUDZET_PAMIECI, halo=0, wielokrotnosc=1):
+    grubosc = budzet // bajty_wycinka(shape, bajty_na_woksel) - 2 * halo
+    grubosc = max(wielokrotnosc, grubosc // wielokrotnosc * wielokrotnosc)
+    for z0 in range(0, shape[0], grubosc):
+        z1 = min(z0 + grubosc, shape[0])
+        yield z0, z1, max(z0 - halo, 0), min(z1 + halo, shape[0])
+
+# Maska bool w pliku tymczasowym mapowanym w pamięci (usuwany po zamknięciu pliku) -
+# strony maski zwalnia system, a nie budżet programu
+def maska_na_dysku(shape, katalog=None):
+    plik = tempfile.TemporaryFile(dir=katalog)
+    maska = np.memmap(plik, dtype=np.bool_, mode="w+", shape=tuple(shape))
+    # Plik żyje tak długo jak maska
+    maska.plik = plik
+    return maska
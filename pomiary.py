@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+from collections import defaultdict
+
+# Pomiary etapów (czas, bajty, woksele) z zapisem śladu Chrome / Perfetto. Domyślnie
+# wyłączone - etap() zwraca wtedy jeden wspólny pusty kontekst, koszt to samo wywołanie.
+# Włączenie: wlacz(sciezka) albo zmienna środowiskowa POMWJO_SLAD=<plik.json>
+_wlaczone = False
+_zdarzenia = []
+_blokada = threading.Lock()
+_poczatek = time.perf_counter_ns()
+
+class _BezPomiaru:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def dodaj(self, **dane):
+        pass
+
+_BEZ_POMIARU = _BezPomiaru()
+
+class _Pomiar:
+    __slots__ = ("nazwa", "dane", "start")
+
+    def __init__(self, nazwa, dane):
+        self.nazwa = nazwa
+        self.dane = dane
+
+    # Wartości znane dopiero w trakcie etapu (np. liczba wokseli wyniku)
+    def dodaj(self, **dane):
+        self.dane.update(dane)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, typ, wartosc, slad):
+        czas = time.perf_counter_ns() - self.start
+        if typ is not None:
+            self.dane["blad"] = typ.__name__
+        watek = threading.current_thread()
+        with _blokada:
+            _zdarzenia.append((self.nazwa, self.start, czas, watek.ident, watek.name, self.dane))
+        return False
+
+def wlaczone():
+    return _wlaczone
+
+# sciezka - plik śladu zapisywany (razem z podsumowaniem na konsoli) przy wyjściu z programu
+def wlacz(sciezka=None):
+    global _wlaczone
+    _wlaczone = True
+    if sciezka:
+        atexit.register(_zakoncz, sciezka)
+
+def wylacz():
+    global _wlaczone
+    _wlaczone = False
+
+def wyczysc():
+    with _blokada:
+        _zdarzenia.clear()
+
+# with etap("nazwa", bajty=...) as p: ...; p.dodaj(woksele=...)
+def etap(nazwa, **dane):
+    if not _wlaczone:
+        return _BEZ_POMIARU
+    return _Pomiar(nazwa, dane)
+
+# Dekorator: całe wywołanie funkcji jako jeden etap
+def mierzony(nazwa):
+    def dekorator(funkcja):
+        @functools.wraps(funkcja)
+        def opakowana(*args, **kwargs):
+            if not _wlaczone:
+                return funkcja(*args, **kwargs)
+            with _Pomiar(nazwa, {}):
+                return funkcja(*args, **kwargs)
+        return opakowana
+    return dekorator
+
+# Suma czasu i liczników na etap, od najdłuższego
+def podsumowanie():
+    with _blokada:
+        zdarzenia = list(_zdarzenia)
+    etapy = defaultdict(lambda: {"liczba": 0, "czas": 0, "maks": 0, "bajty": 0, "woksele": 0})
+    for nazwa, _, czas, _, _, dane in zdarzenia:
+        e = etapy[nazwa]
+        e["liczba"] += 1
+        e["czas"] += czas
+        e["maks"] = max(e["maks"], czas)
+        e["bajty"] += int(dane.get("bajty", 0) or 0)
+        e["woksele"] += int(dane.get("woksele", 0) or 0)
+
+    wiersze = [f"{'etap':28} {'liczba':>7} {'razem [ms]':>11} {'maks [ms]':>10} {'MiB':>9} {'woksele':>12}"]
+    for nazwa, e in sorted(etapy.items(), key=lambda p: -p[1]["czas"]):
+        wiersze.append(f"{nazwa:28} {e['liczba']:7d} {e['czas'] / 1e6:11.1f} {e['maks'] / 1e6:10.1f} "
+                       f"{e['bajty'] / 2 ** 20:9.1f} {e['woksele']:12d}")
+    return "\n".join(wiersze)
+
+# Ślad w formacie Chrome Trace Event (chrome://tracing, ui.perfetto.dev): zdarzenia "X"
+# z czasem w mikrosekundach od importu modułu, jeden wiersz na wątek
+def zapisz_slad(sciezka):
+    with _blokada:
+        zdarzenia = list(_zdarzenia)
+    pid = os.getpid()
+    wpisy = []
+    watki = {}
+    for nazwa, start, czas, tid, nazwa_watku, dane in zdarzenia:
+        watki[tid] = nazwa_watku
+        wpisy.append({
+            "name": nazwa,
+            "ph": "X",
+            "ts": (start - _poczatek) / 1000.0,
+            "dur": czas / 1000.0,
+            "pid": pid,
+            "tid": tid,
+            "args": {k: v if isinstance(v, (int, float, str, bool)) or v is None else str(v) for k, v in dane.items()},
+        })
+    for tid, nazwa_watku in watki.items():
+        wpisy.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": nazwa_watku}})
+
+    with open(sciezka, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": wpisy, "displayTimeUnit": "ms"}, f)
+    return len(zdarzenia)
+
+def _zakoncz(sciezka):
+    if not _zdarzenia:
+        return
+    print(podsumowanie())
+    print(f"Ślad ({zapisz_slad(sciezka)} zdarzeń) zapisany w {sciezka}")
+
+if os.environ.get("POMWJO_SLAD"):
+    wlacz(os.environ["POMWJO_SLAD"])
@@ -0,0 +1,32 @@
+import sys
+import argparse
+import importlib
+
+# Jedno wejście do wszystkich narzędzi: python pomwjo.py <narzędzie> [argumenty narzędzia].
+# Moduł narzędzia jest importowany dopiero po wyborze - ITK, VTK i matplotlib ładują się
+# tylko wtedy, gdy narzędzie ich potrzebuje
+NARZEDZIA = {
+    "przegladarka": ("przegladarka_serii", "Series viewer with 2D region growing."),
+    "rekonstrukcja3d": ("rekonstrukcja3D", "3D region growing with threshold sliders and mask mesh."),
+    "rekonstrukcja-vtk": ("rekonstrukcjaVTK", "Per-slice / multi-label growing, mask saving and VTK view."),
+    "binaryzacja": ("przegladarka_itk", "Threshold the files of one folder with ITK."),
+    "podglad": ("kod", "Browse the DICOM files of one folder."),
+    "wsadowo": ("wsadowo", "Headless batch 3D segmentation from a CSV of seeds."),
+    "benchmark": ("benchmark", "Benchmarks of the processing stages."),
+}
+
+parser = argparse.ArgumentParser(
+    description="POMwJO tools.",
+    epilog="\n".join(f"  {nazwa:18} {opis}" for nazwa, (_, opis) in NARZEDZIA.items()),
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+)
+parser.add_argument("narzedzie", choices=NARZEDZIA, metavar="narzedzie", help="Tool to run (listed below).")
+parser.add_argument("argumenty", nargs=argparse.REMAINDER, help="Arguments passed to the tool.")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    modul = importlib.import_module(NARZEDZIA[args.narzedzie][0])
+    return modul.main(args.argumenty)
+
+if __name__ == "__main__":
+    sys.exit(main())
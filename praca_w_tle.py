@@ -0,0 +1,117 @@
+import time
+import queue
+import threading
+
+# Zadanie zastąpione nowszym - zgłaszane przy najbliższym raporcie postępu
+class Anulowano(Exception):
+    pass
+
+# Raport postępu przekazywany do zadania; wywołanie w nieaktualnym zadaniu przerywa je
+class Postep:
+    def __init__(self, zadania, numer, nazwa):
+        self.zadania = zadania
+        self.numer = numer
+        self.nazwa = nazwa
+
+    def aktualne(self):
+        return self.numer == self.zadania.numer
+
+    # wszystkie=None - postęp bez znanego końca (np. liczba wokseli regionu)
+    def __call__(self, zrobione, wszystkie=None):
+        if not self.aktualne():
+            raise Anulowano()
+        if wszystkie:
+            tekst = f"{self.nazwa}: {100.0 * zrobione / wszystkie:.0f}%"
+        else:
+            tekst = f"{self.nazwa}: {zrobione}"
+        self.zadania.tekst_postepu = tekst
+
+# Segmentacja w jednym wątku w tle: nowe zlecenie zastępuje czekające, a bieżące zadanie
+# przerywa się przy następnym raporcie postępu. Wyniki i postęp odbiera timer matplotlib,
+# więc funkcje gotowe(wynik) i pokaz_postep(tekst) działają w wątku interfejsu
+class ZadaniaWTle:
+    def __init__(self, canvas, pokaz_postep=None, interwal_ms=50):
+        self.pokaz_postep = pokaz_postep
+        self.warunek = threading.Condition()
+        self.czekajace = None
+        self.numer = 0
+        self.wyniki = queue.Queue()
+        self.tekst_postepu = ""
+        self.pokazany_postep = ""
+        self.zamkniete = False
+
+        self.ukonczone = 0
+        self.anulowane = 0
+
+        self.watek = threading.Thread(target=self._petla, name="segmentacja", daemon=True)
+        self.watek.start()
+
+        self.timer = canvas.new_timer(interval=interwal_ms)
+        self.timer.add_callback(self._odbierz)
+        self.timer.start()
+
+    # funkcja(*args, postep=...) wykonywana w tle; gotowe(wynik) w wątku interfejsu
+    def zlec(self, nazwa, funkcja, *args, gotowe=None):
+        with self.warunek:
+            self.numer += 1
+            if self.czekajace is not None:
+                self.anulowane += 1
+            self.czekajace = (self.numer, nazwa, funkcja, args, gotowe)
+            self.tekst_postepu = f"{nazwa}: w kolejce"
+            self.warunek.notify()
+            return self.numer
+
+    def _petla(self):
+        while True:
+            with self.warunek:
+                while self.czekajace is None and not self.zamkniete:
+                    self.warunek.wait()
+                if self.zamkniete:
+                    return
+                numer, nazwa, funkcja, args, gotowe = self.czekajace
+                self.czekajace = None
+
+            postep = Postep(self, numer, nazwa)
+            start = time.perf_counter()
+            try:
+                wynik = funkcja(*args, postep=postep)
+            except Anulowano:
+                self.anulowane += 1
+                continue
+            except Exception as e:
+                self.wyniki.put((numer, nazwa, None, e, time.perf_counter() - start))
+                continue
+            self.wyniki.put((numer, nazwa, gotowe, wynik, time.perf_counter() - start))
+
+    def _odbierz(self):
+        while True:
+            try:
+                numer, nazwa, gotowe, wynik, czas = self.wyniki.get_nowait()
+            except queue.Empty:
+                break
+            # Wynik zadania, które zdążyło się skończyć, zanim przyszło nowsze zlecenie
+            if numer != self.numer:
+                self.anulowane += 1
+                continue
+            self.tekst_postepu = ""
+            if isinstance(wynik, Exception):
+                print(f"{nazwa}: błąd - {wynik}")
+                continue
+            self.ukonczone += 1
+            print(f"{nazwa}: {czas * 1000:.0f} ms")
+            if gotowe is not None:
+                gotowe(wynik)
+
+        if self.pokaz_postep is not None and self.tekst_postepu != self.pokazany_postep:
+            self.pokazany_postep = self.tekst_postepu
+            self.pokaz_postep(self.pokazany_postep)
+
+    def statystyki(self):
+        return f"Zadania w tle: ukończone {self.ukonczone}, anulowane {self.anulowane}"
+
+    def zamknij(self):
+        self.timer.stop()
+        with self.warunek:
+            self.numer += 1
+            self.zamkniete = True
+            self.warunek.notify()
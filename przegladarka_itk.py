@@ -1,56 +1,136 @@
-import itk
-import itk.itkBinaryThresholdImageFilterPython
-import matplotlib.pyplot as plt
+import numpy as np
 import os
+import sys
+import argparse
+from pamiec_wycinkow import PamiecWycinkow
+from histogram import HistogramSerii
+from praca_w_tle import ZadaniaWTle
+from wyswietlanie import WidokWycinka
 
 folder_path = "X:/Piotrek/Studia Magisterka/SEMESTR 2/Przetwarzanie Obrazow Medycznych w Jezykach Obiektowych/BT/BT/KARY1/A/A/A/D"
 
-dicom_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-
-dicom_files.sort()
+parser = argparse.ArgumentParser(description="Threshold the DICOM files of one folder with ITK.")
+parser.add_argument("folder", nargs="?", default=folder_path, help="Folder with the DICOM files of one series.")
 
+# Stan przeglądarki ustawiany w main()
+dicom_files = []
+pamiec = None
+histogram = None
+widok = None
+zadania = None
+slider_lower = None
+slider_upper = None
 current_index = 0
+kierunek = 1
 
 lower_threshold = 1100
 upper_threshold = 1979
 outside_value = 0       
 inside_value = 1
 
-PixelType = itk.US
-Dimension = 2
+# Ten sam czytnik co wolumen serii: int16 po rescale slope/intercept
+def dekoduj(index):
+    from wolumen import dekoduj_wycinek
+
+    return dekoduj_wycinek(dicom_files[index])
 
-ImageType = itk.Image[PixelType, Dimension]
+# Binaryzacja wektorowa już zdekodowanego wycinka (lub całego wolumenu)
+def binaryzuj(image_data):
+    inside = (image_data >= lower_threshold) & (image_data <= upper_threshold)
+    return np.where(inside, inside_value, outside_value).astype(np.uint8)
 
 def show_image(index):
-    reader = itk.ImageFileReader[ImageType].New()
-    reader.SetFileName(dicom_files[index])
+    binary_image_data = binaryzuj(pamiec.wycinek(index, kierunek))
+
+    # Liczba wokseli w zakresie dopiero po policzeniu histogramu w tle
+    if histogram is None:
+        opis = "histogram w trakcie liczenia"
+    else:
+        liczba = histogram.liczba_w_zakresie(lower_threshold, upper_threshold)
+        opis = f"{liczba} wokseli ({100.0 * liczba / histogram.liczba_wokseli:.1f}%)"
+    widok.pokaz(binary_image_data,
+                f"Obraz {index + 1}/{len(dicom_files)} - Binarizacja [{lower_threshold}, {upper_threshold}]: {opis}",
+                clim=(min(outside_value, inside_value), max(outside_value, inside_value)))
+
+# Histogram serii w tle: wycinki z pamięci LRU albo dekodowane raz i w niej zostawiane,
+# więc przeglądanie nie dekoduje ich ponownie
+def licz_histogram(postep):
+    wynik = HistogramSerii(np.int16)
+    for z in range(len(dicom_files)):
+        postep(z, len(dicom_files))
+        wynik.dodaj(pamiec.wczytaj(z))
+    return wynik.zakoncz()
 
-    thresholdFilter = itk.BinaryThresholdImageFilter[ImageType, ImageType].New()
-    thresholdFilter.SetInput(reader.GetOutput())
-    thresholdFilter.SetLowerThreshold(lower_threshold)
-    thresholdFilter.SetUpperThreshold(upper_threshold)
-    thresholdFilter.SetOutsideValue(outside_value)
-    thresholdFilter.SetInsideValue(inside_value)
-    thresholdFilter.Update()
+# Suwak progu na osiach ax w zakresie [minimum, maksimum]
+def suwak(ax, nazwa, minimum, maksimum, wartosc):
+    from matplotlib.widgets import Slider
 
-    binary_image_data = itk.GetArrayFromImage(thresholdFilter.GetOutput())
+    slider = Slider(ax, nazwa, minimum, maksimum, valinit=int(np.clip(wartosc, minimum, maksimum)), valstep=1)
+    slider.on_changed(on_threshold)
+    return slider
 
-    plt.imshow(binary_image_data, cmap="gray")
-    plt.axis("off")
-    plt.title(f"Obraz {index + 1}/{len(dicom_files)} - Binarizacja")
-    plt.draw()
+# Suwaki budowane od nowa (na tych samych osiach) w zakresie intensywności serii, gdy
+# histogram jest gotowy - zakresu istniejącego Slider nie zmienia publiczne API matplotlib
+def histogram_gotowy(wynik):
+    global histogram, slider_lower, slider_upper
+    histogram = wynik
+    for slider in (slider_lower, slider_upper):
+        slider.disconnect_events()
+        slider.ax.clear()
+    slider_lower = suwak(slider_lower.ax, "Dolny", histogram.minimum, histogram.maksimum, lower_threshold)
+    slider_upper = suwak(slider_upper.ax, "Górny", histogram.minimum, histogram.maksimum, upper_threshold)
+    on_threshold(None)
+    slider_lower.ax.figure.canvas.draw_idle()
+
+def on_threshold(value):
+    global lower_threshold, upper_threshold
+    lower_threshold = int(slider_lower.val)
+    upper_threshold = int(slider_upper.val)
+    show_image(current_index)
 
 def on_key(event):
-    global current_index
+    global current_index, kierunek
     if event.key == 'right':
+        kierunek = 1
         current_index = (current_index + 1) % len(dicom_files)
     elif event.key == 'left':
+        kierunek = -1
         current_index = (current_index - 1) % len(dicom_files)
 
-    plt.clf()  
     show_image(current_index)
 
-fig, ax = plt.subplots()
-show_image(current_index)
-fig.canvas.mpl_connect('key_press_event', on_key)
-plt.show()
\ No newline at end of file
+# ITK i matplotlib ładowane dopiero w main() / przy dekodowaniu
+def main(argv=None):
+    global folder_path, dicom_files, pamiec, widok, zadania, slider_lower, slider_upper
+    folder_path = parser.parse_args(argv).folder
+    dicom_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
+    dicom_files.sort()
+
+    # Zdekodowane wycinki w pamięci LRU, sąsiednie dekodowane w tle
+    pamiec = PamiecWycinkow(dekoduj, len(dicom_files))
+
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    fig.subplots_adjust(bottom=0.2)
+    widok = WidokWycinka(ax)
+
+    # Suwaki progów: zakres CT do czasu policzenia histogramu, potem zakres intensywności serii
+    ax_lower = fig.add_axes([0.2, 0.08, 0.6, 0.03])
+    ax_upper = fig.add_axes([0.2, 0.03, 0.6, 0.03])
+    slider_lower = suwak(ax_lower, "Dolny", -1024, 3071, lower_threshold)
+    slider_upper = suwak(ax_upper, "Górny", -1024, 3071, upper_threshold)
+
+    # Histogram całej serii liczony raz w tle - suwaki pokazują liczbę wokseli bez odczytu z dysku
+    zadania = ZadaniaWTle(fig.canvas, widok.ustaw_status)
+    zadania.zlec("Histogram serii", licz_histogram, gotowe=histogram_gotowy)
+
+    show_image(current_index)
+    fig.canvas.mpl_connect('key_press_event', on_key)
+    fig.canvas.mpl_connect('close_event', lambda event: print(pamiec.statystyki() + "\n" + widok.statystyki()))
+    plt.show()
+    zadania.zamknij()
+    pamiec.zamknij()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
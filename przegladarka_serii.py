@@ -1,202 +1,140 @@
-import os
 import sys
-import itk
-import matplotlib.pyplot as plt
+import time
 import argparse
 import numpy as np
-
-class NoOutput(itk.OutputWindow):
-    def DisplayText(self, text):
-        pass
-
-itk.OutputWindow.SetGlobalWarningDisplay(False)
-no_output = NoOutput.New()
-itk.OutputWindow.SetInstance(no_output)
+import opcje
+import pomiary
+from pamiec_wycinkow import PamiecWycinkow
+from wyswietlanie import WidokWycinka
+from rozrost import SesjaRozrostu
 
 #dane_obrazowe = "X:/Piotrek/Studia Magisterka/SEMESTR 2/Przetwarzanie Obrazow Medycznych w Jezykach Obiektowych/BT/BT"
 dane_obrazowe = "G:/Edukacja/2020 Studia/Semestr 9/POMwJO/Projekt/BT"
 
 parser = argparse.ArgumentParser(description="Read DICOM tags and visualize selected series.")
-parser.add_argument(
-    "dicom_directory",
-    nargs="?",
-    default=dane_obrazowe,
-    help="If DicomDirectory is not specified, the current directory is used.",
-)
-args = parser.parse_args()
-
-main_dir = args.dicom_directory
-
-PixelType = itk.ctype("signed short")
-Dimension = 3
-ImageType = itk.Image[PixelType, Dimension]
-
-patients = {}
-series_descriptions = {}
-
-def process_folder(dir_name):
-    namesGenerator = itk.GDCMSeriesFileNames.New()
-    namesGenerator.SetUseSeriesDetails(True)
-    namesGenerator.SetDirectory(dir_name)
-
-    series_ids = namesGenerator.GetSeriesUIDs()
-
-    for series_id in series_ids:
-        file_names = namesGenerator.GetFileNames(series_id)
-        if not file_names:
-            continue
-
-        dicomIO = itk.GDCMImageIO.New()
-        dicomIO.LoadPrivateTagsOn()
-
-        reader = itk.ImageSeriesReader[ImageType].New()
-        reader.SetImageIO(dicomIO)
-        reader.SetFileNames(file_names)
-
-        try:
-            reader.Update()
-        except Exception:
-            continue
-
-        metadata = dicomIO.GetMetaDataDictionary()
-
-        patient_name_tag = "0010|0010"
-        series_desc_tag = "0008|103e"
-
-        if metadata.HasKey(patient_name_tag):
-            patient_name = metadata[patient_name_tag]
-            series_desc = metadata[series_desc_tag] if metadata.HasKey(series_desc_tag) else "Unknown Series"
-
-            if patient_name not in patients:
-                patients[patient_name] = {}
-            if series_id not in patients[patient_name]:
-                patients[patient_name][series_id] = []
-            patients[patient_name][series_id].extend(file_names)
-
-            series_descriptions[series_id] = series_desc
-
-for root, dirs, files in os.walk(main_dir):
-    process_folder(root)
-
-def list_patients():
-    print("Dostępni pacjenci:")
-    for i, patient in enumerate(patients.keys(), start=1):
-        print(f"{i}. {patient}")
-
-if not patients:
-    print("Nie znaleziono pacjentów.")
-    sys.exit(1)
-
-list_patients()
-
-def select_patient():
-    while True:
-        try:
-            choice = int(input("\nWybierz numer pacjenta: "))
-            if 1 <= choice <= len(patients):
-                return list(patients.keys())[choice - 1]
-            else:
-                print("Błąd. Wybierz poprawny numer.")
-        except ValueError:
-            print("Błąd wejścia. Proszę wpisz numer.")
-
-selected_patient = select_patient()
-
-def list_series(patient):
-    print(f"\nSerie pacjenta: '{patient}':")
-    for i, series_id in enumerate(patients[patient].keys(), start=1):
-        series_desc = series_descriptions.get(series_id, "Unknown Series")
-        print(f"{i}. {series_desc}")
-
-list_series(selected_patient)
-
-def select_series(patient):
-    while True:
-        try:
-            choice = int(input("\nWybierz serię do wyświetlania: "))
-            if 1 <= choice <= len(patients[patient]):
-                selected_series_uid = list(patients[patient].keys())[choice - 1]
-                return patients[patient][selected_series_uid]
-            else:
-                print("Błąd. Wybierz poprawny numer.")
-        except ValueError:
-            print("Błąd wejścia. Proszę wpisz numer.")
-
-selected_files = select_series(selected_patient)
-
-selected_files = sorted(set(selected_files))
-
-PixelType2D = itk.US
-Dimension2D = 2
-ImageType2D = itk.Image[PixelType2D, Dimension2D]
-
+opcje.dodaj_opcje(parser, dane_obrazowe)
+
+# Stan przeglądarki ustawiany w main()
+args = None
+selected_files = []
+wolumen = None
+pamiec = None
+widok = None
 current_index = 0
+kierunek = 1
 
 # Rozrost regionu (Region Growing)
-def region_growing(image_file, seed):
-    reader = itk.ImageFileReader[ImageType2D].New()
-    reader.SetFileName(image_file)
-    reader.Update()
+def region_growing(index, seed):
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider
 
-    image = reader.GetOutput()
-    image_array = itk.GetArrayFromImage(image)
+    image_array = wolumen.wycinek(index)
 
     intensity_threshold = 500
 
     intensity = image_array[seed[1], seed[0]]  # Wartość intensywności w punkcie startowym
-    lower_threshold = np.uint16(max(0, intensity - intensity_threshold))
-    upper_threshold = np.uint16(min(65535, intensity + intensity_threshold))
+    if args.okno_adaptacyjne is not None:
+        # Okno z histogramu serii (liczonego raz i zapisanego obok wolumenu)
+        lower, upper = wolumen.histogram().proponuj_okno(intensity, args.okno_adaptacyjne, intensity_threshold)
+        lower_threshold, upper_threshold = np.int16(lower), np.int16(upper)
+    else:
+        lower_threshold = np.int16(max(-32768, int(intensity) - intensity_threshold))
+        upper_threshold = np.int16(min(32767, int(intensity) + intensity_threshold))
 
     print(f"Rozrost regionu z punktu: {seed}, Intensywność: {intensity}, Zakres: [{lower_threshold}, {upper_threshold}]")
 
-    region_grow = itk.ConnectedThresholdImageFilter[ImageType2D, ImageType2D].New()
-    region_grow.SetInput(image)
-    region_grow.SetSeed(seed)  # Współrzędne początkowe rozrostu
-    region_grow.SetLower(int(lower_threshold))
-    region_grow.SetUpper(int(upper_threshold))
-
-    region_grow.Update()
-
-    output_image = region_grow.GetOutput()
-    result = itk.GetArrayFromImage(output_image)
+    # Sesja przyrostowa: zmiana progów suwakami rośnie od granicy poprzedniego regionu
+    # Pomiar bez okna wyniku - plt.show() poniżej blokuje do jego zamknięcia
+    with pomiary.etap("region_growing", woksele=image_array.size):
+        sesja = SesjaRozrostu(image_array, seed)
+        result = sesja.ustaw_progi(lower_threshold, upper_threshold)
 
     fig_seg, ax_seg = plt.subplots()
-    ax_seg.imshow(result, cmap="gray")
+    fig_seg.subplots_adjust(bottom=0.2)
+    obraz_seg = ax_seg.imshow(result, cmap="gray", vmin=0, vmax=1)
     ax_seg.axis("off")
-    ax_seg.set_title("Wynik segmentacji")
+    ax_seg.set_title(f"Wynik segmentacji: {sesja.liczba_wokseli()} pikseli")
+
+    def on_threshold(value):
+        result = sesja.ustaw_progi(slider_lower.val, slider_upper.val)
+        obraz_seg.set_data(result)
+        ax_seg.set_title(f"Wynik segmentacji: {sesja.liczba_wokseli()} pikseli "
+                         f"(zmienione {sesja.ostatnio_zmienione}, {sesja.ostatni_czas * 1000:.1f} ms)")
+        fig_seg.canvas.draw_idle()
+
+    minimum, maksimum = int(image_array.min()), int(image_array.max())
+    slider_lower = Slider(fig_seg.add_axes([0.2, 0.08, 0.6, 0.03]), "Dolny", minimum, maksimum,
+                          valinit=min(max(int(lower_threshold), minimum), maksimum), valstep=1)
+    slider_upper = Slider(fig_seg.add_axes([0.2, 0.03, 0.6, 0.03]), "Górny", minimum, maksimum,
+                          valinit=min(max(int(upper_threshold), minimum), maksimum), valstep=1)
+    slider_lower.on_changed(on_threshold)
+    slider_upper.on_changed(on_threshold)
+    # Suwaki muszą żyć tak długo jak okno
+    fig_seg.suwaki = (slider_lower, slider_upper)
+
     fig_seg.canvas.draw()
     plt.show()
 
+@pomiary.mierzony("show_image")
 def show_image(index):
-    reader = itk.ImageFileReader[ImageType2D].New()
-    reader.SetFileName(selected_files[index])
-    reader.Update()
-
-    image_data = itk.GetArrayFromImage(reader.GetOutput())
+    image_data = pamiec.wycinek(index, kierunek)
 
-    ax.clear()
-    ax.imshow(image_data, cmap="gray")
-    ax.axis("off")
-    ax.set_title(f"Image {index + 1}/{len(selected_files)}")
-    fig.canvas.draw()
+    tytul = f"Image {index + 1}/{len(selected_files)}"
+    if wolumen.wczytywanie is not None:
+        tytul += f" (wczytano {wolumen.wczytane()}/{len(wolumen)})"
+    widok.pokaz(image_data, tytul)
 
 def on_click(event):
     if event.xdata is not None and event.ydata is not None:
         x, y = int(event.xdata), int(event.ydata)
         print(f"Wybrano punkt: ({x}, {y})")
-        region_growing(selected_files[current_index], seed=(x, y))
+        region_growing(current_index, seed=(x, y))
 
 def on_key(event):
-    global current_index
+    global current_index, kierunek
     if event.key == 'right':
+        kierunek = 1
         current_index = (current_index + 1) % len(selected_files)
     elif event.key == 'left':
+        kierunek = -1
         current_index = (current_index - 1) % len(selected_files)
     #ax.clf()
     show_image(current_index)
 
-fig, ax = plt.subplots()
-show_image(current_index)
-fig.canvas.mpl_connect('key_press_event', on_key)
-fig.canvas.mpl_connect('button_press_event', on_click)
-plt.show()
\ No newline at end of file
+# matplotlib i ITK (przez wolumen) ładowane dopiero po wyborze serii - --help i lista
+# pacjentów nie czekają na ich import
+def main(argv=None):
+    global args, selected_files, wolumen, pamiec, widok
+    args = parser.parse_args(argv)
+    wybor = opcje.wybierz_serie(args)
+    if wybor is None:
+        return 1
+    selected_series_uid, selected_files = wybor
+
+    import matplotlib.pyplot as plt
+    from wolumen import WolumenSerii
+
+    # Seria dekodowana raz, kolejne odczyty z pliku mapowanego w pamięci. Wycinki dekodowane
+    # w tle w kolejności wyświetlania - okno otwiera się od razu, operacje 3D czekają tylko
+    # na potrzebne wycinki
+    start_wczytywania = time.perf_counter()
+    wolumen = WolumenSerii(selected_series_uid, selected_files)
+    wolumen.wczytuj_w_tle()
+
+    # Wycinki do wyświetlania w pamięci LRU, sąsiednie dekodowane w tle
+    pamiec = PamiecWycinkow(wolumen.wycinek, len(wolumen))
+
+    fig, ax = plt.subplots()
+    widok = WidokWycinka(ax)
+    show_image(current_index)
+    print(f"Pierwszy obraz po {(time.perf_counter() - start_wczytywania) * 1000:.0f} ms")
+    fig.canvas.mpl_connect('key_press_event', on_key)
+    fig.canvas.mpl_connect('button_press_event', on_click)
+    fig.canvas.mpl_connect('close_event', lambda event: print(pamiec.statystyki() + "\n" + widok.statystyki()))
+    plt.show()
+    pamiec.zamknij()
+    wolumen.zatrzymaj_wczytywanie()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
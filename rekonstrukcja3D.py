@@ -1,143 +1,146 @@
 import os
 import sys
-import itk
-import matplotlib.pyplot as plt
+import time
 import argparse
 import numpy as np
-from mpl_toolkits.mplot3d import Axes3D
-
-class NoOutput(itk.OutputWindow):
-    def DisplayText(self, text):
-        pass
-
-itk.OutputWindow.SetGlobalWarningDisplay(False)
-no_output = NoOutput.New()
-itk.OutputWindow.SetInstance(no_output)
+import opcje
+import pomiary
+from wyswietlanie import WidokWycinka
+from rozrost import nowa_sesja, RozrostPlastrami
+from praca_w_tle import ZadaniaWTle
 
 #dane_obrazowe = "X:/Piotrek/Studia Magisterka/SEMESTR 2/Przetwarzanie Obrazow Medycznych w Jezykach Obiektowych/BT/BT"
 dane_obrazowe = "G:/Edukacja/2020 Studia/Semestr 9/POMwJO/Projekt/BT"
 
 parser = argparse.ArgumentParser(description="Read DICOM tags and visualize selected series.")
+opcje.dodaj_opcje(parser, dane_obrazowe, budzet_pamieci=True)
 parser.add_argument(
-    "dicom_directory",
-    nargs="?",
-    default=dane_obrazowe,
-    help="If DicomDirectory is not specified, the current directory is used.",
+    "--decymacja",
+    type=float,
+    default=0.0,
+    help="Fraction of mesh triangles removed by decimation (0 = none).",
 )
-args = parser.parse_args()
-
-main_dir = args.dicom_directory
-
-PixelType = itk.ctype("signed short")
-Dimension = 3
-ImageType = itk.Image[PixelType, Dimension]
-
-patients = {}
-series_descriptions = {}
-
-# Przetwarzanie folderów
-for root, dirs, files in os.walk(main_dir):
-    namesGenerator = itk.GDCMSeriesFileNames.New()
-    namesGenerator.SetUseSeriesDetails(True)
-    namesGenerator.SetDirectory(root)
-
-    series_ids = namesGenerator.GetSeriesUIDs()
-
-    for series_id in series_ids:
-        file_names = namesGenerator.GetFileNames(series_id)
-        if not file_names:
-            continue
-
-        dicomIO = itk.GDCMImageIO.New()
-        dicomIO.LoadPrivateTagsOn()
-
-        reader = itk.ImageSeriesReader[ImageType].New()
-        reader.SetImageIO(dicomIO)
-        reader.SetFileNames(file_names)
-
-        try:
-            reader.Update()
-        except Exception:
-            continue
-
-        metadata = dicomIO.GetMetaDataDictionary()
-        patient_name_tag = "0010|0010"
-        series_desc_tag = "0008|103e"
-
-        patient_name = metadata[patient_name_tag] if metadata.HasKey(patient_name_tag) else "Unknown Patient"
-        series_desc = metadata[series_desc_tag] if metadata.HasKey(series_desc_tag) else "Unknown Series"
-
-        if patient_name not in patients:
-            patients[patient_name] = {}
-        patients[patient_name][series_id] = file_names
-        series_descriptions[series_id] = series_desc
-
-if not patients:
-    print("Nie znaleziono pacjentów.")
-    sys.exit(1)
-
-print("Dostępni pacjenci:")
-for i, patient in enumerate(patients.keys(), start=1):
-    print(f"{i}. {patient}")
-
-selected_patient = list(patients.keys())[int(input("Wybierz numer pacjenta: ")) - 1]
-
-print(f"\nSerie pacjenta: '{selected_patient}':")
-for i, (series_id, desc) in enumerate(patients[selected_patient].items(), start=1):
-    print(f"{i}. {series_descriptions.get(series_id, 'Unknown Series')}")
-
-selected_series_uid = list(patients[selected_patient].keys())[int(input("Wybierz serię do wyświetlania: ")) - 1]
-selected_files = sorted(patients[selected_patient][selected_series_uid])
-
-PixelType2D = itk.US
-Dimension2D = 2
-ImageType2D = itk.Image[PixelType2D, Dimension2D]
-
-# Rozrost regionu dla całej objętości 3D
-def region_growing_3d(image_files, seed):
-    intensity_threshold = 500
-    
-    # Wczytaj całą serię jako obraz 3D
-    reader = itk.ImageSeriesReader[ImageType].New()
-    reader.SetFileNames(image_files)
-    reader.Update()
-
-    image_3d = reader.GetOutput()
-    image_array = itk.GetArrayFromImage(image_3d)
-
-    intensity = image_array[seed[2], seed[1], seed[0]]
-    lower_threshold = np.int16(max(-1024, intensity - intensity_threshold))
-    upper_threshold = np.int16(min(3071, intensity + intensity_threshold))
-
-    region_grow = itk.ConnectedThresholdImageFilter[ImageType, ImageType].New()
-    region_grow.SetInput(image_3d)
-    region_grow.SetSeed(seed)
-    region_grow.SetLower(int(lower_threshold))
-    region_grow.SetUpper(int(upper_threshold))
-    region_grow.Update()
-
-    mask_3d = itk.GetArrayFromImage(region_grow.GetOutput()) > 0
-
-    fig = plt.figure()
-    ax = fig.add_subplot(111, projection='3d')
-    ax.voxels(mask_3d, edgecolor='k')
-    plt.title("Segmentacja 3D")
-    plt.show()
 
+# Stan programu ustawiany w main()
+args = None
+selected_files = []
+wolumen = None
+widok = None
+zadania = None
+ax = None
+slider_lower = None
+slider_upper = None
 current_index = 0
 
-fig, ax = plt.subplots()
-reader = itk.ImageFileReader[ImageType2D].New()
-reader.SetFileName(selected_files[current_index])
-reader.Update()
-image_data = itk.GetArrayFromImage(reader.GetOutput())
-ax.imshow(image_data, cmap="gray")
-ax.axis("off")
+# Sesja przyrostowa dla ostatniego punktu startowego (strojenie progów suwakami)
+sesja = None
+ustawianie_suwakow = False
+
+# Siatka powierzchni maski zamiast wokseli matplotlib (liczona w ramce maski)
+@pomiary.mierzony("zbuduj_siatke")
+def zbuduj_siatke(mask_3d, ramka=None):
+    from siatka import siatka_z_maski
+
+    surface = siatka_z_maski(mask_3d, wolumen.spacing, wolumen.origin, decymacja=args.decymacja, ramka=ramka,
+                             budzet=budzet())
+    print(f"Siatka: {surface.GetNumberOfPolys()} trójkątów")
+    return surface
+
+def pokaz_siatke_maski(surface):
+    from siatka import pokaz_siatke
+
+    if surface is None or surface.GetNumberOfPolys() == 0:
+        print("Pusta maska - brak powierzchni do wyświetlenia.")
+        return
+    pokaz_siatke(surface, "Segmentacja 3D")
+
+def budzet():
+    return int(args.budzet_pamieci * 2 ** 20)
+
+# Zakres progów wokół intensywności w punkcie startowym (+/- intensity_threshold), z
+# --okno-adaptacyjne z histogramu serii. Czytany jest tylko wycinek punktu
+def progi_punktu(seed, intensity_threshold=500):
+    intensity = int(wolumen.wycinek(seed[2])[seed[1], seed[0]])
+    if args.okno_adaptacyjne is not None:
+        lower, upper = wolumen.histogram().proponuj_okno(intensity, args.okno_adaptacyjne, intensity_threshold)
+    else:
+        lower, upper = intensity - intensity_threshold, intensity + intensity_threshold
+    return intensity, max(-1024, lower), min(3071, upper)
+
+# Rozrost regionu dla całej objętości 3D - zadanie w tle (nowe kliknięcie anuluje poprzednie).
+# Rozrost numpy sesji przyrostowej zwalnia GIL, więc przewijanie działa w trakcie
+@pomiary.mierzony("region_growing_3d")
+def region_growing_3d(wolumen, seed, postep=None):
+    intensity, lower_threshold, upper_threshold = progi_punktu(seed)
+    print(f"Rozrost 3D z punktu: {seed}, Intensywność: {intensity}, Zakres: [{lower_threshold}, {upper_threshold}]")
+    if args.okno_adaptacyjne is not None:
+        print(f"Woksele serii w zakresie: {wolumen.histogram().liczba_w_zakresie(lower_threshold, upper_threshold)}")
+
+    # Nowa sesja - od razu gotowa do strojenia progów suwakami. Seria większa niż budżet
+    # pamięci: rozrost plastrami z maską w pliku mapowanym w pamięci
+    sesja_punktu = nowa_sesja(wolumen, seed, budzet(), postep=postep, katalog=os.path.dirname(wolumen.baza))
+    sesja_punktu.ustaw_progi(lower_threshold, upper_threshold)
+    sesja_punktu.postep = None
+    print(f"Region: {sesja_punktu.liczba_wokseli()} wokseli, {sesja_punktu.ostatni_czas * 1000:.0f} ms")
+
+    surface = zbuduj_siatke(sesja_punktu.maska(), sesja_punktu.ramka()) if sesja_punktu.liczba_wokseli() else None
+    return sesja_punktu, surface
+
+# Wynik zadania w wątku interfejsu: suwaki ustawione na progi punktu bez przeliczania
+def on_segmentation_ready(wynik):
+    global sesja, ustawianie_suwakow
+    sesja, surface = wynik
+    ustawianie_suwakow = True
+    slider_lower.set_val(sesja.lower)
+    slider_upper.set_val(sesja.upper)
+    ustawianie_suwakow = False
+    show_image(current_index)
+    pokaz_siatke_maski(surface)
+
+# Wycinek z maską bieżącej sesji zaznaczoną najjaśniejszą wartością
+@pomiary.mierzony("show_image")
+def show_image(index):
+    image_data = wolumen.wycinek(index)
+    tytul = f"Image {index + 1}/{len(selected_files)}"
+    if wolumen.wczytywanie is not None:
+        tytul += f" (wczytano {wolumen.wczytane()}/{len(wolumen)})"
+    if sesja is not None:
+        image_data = np.where(sesja.maska()[index], image_data.max(), image_data)
+        tytul += f" - region [{sesja.lower}, {sesja.upper}]: {sesja.liczba_wokseli()} wokseli"
+    widok.pokaz(image_data, tytul)
+
+def wypisz_progi(sesja_punktu):
+    print(f"Zakres [{sesja_punktu.lower}, {sesja_punktu.upper}]: {sesja_punktu.liczba_wokseli()} wokseli, "
+          f"zmienione {sesja_punktu.ostatnio_zmienione}, {sesja_punktu.ostatni_czas * 1000:.0f} ms")
+    show_image(current_index)
+
+# Progi sesji plastrami w tle: region liczony od nowa z plastrów na dysku. Przerwanie przy
+# raporcie postępu zostawia region w ramce sesji, więc kolejne zlecenie czyści go poprawnie
+def progi_plastrami(sesja_punktu, lower, upper, postep=None):
+    sesja_punktu.postep = postep
+    try:
+        sesja_punktu.ustaw_progi(lower, upper)
+    finally:
+        sesja_punktu.postep = None
+    return sesja_punktu
+
+# Zmiana progów: rozrost przyrostowy od granicy poprzedniego regionu zamiast pełnego filtra.
+# Sesja plastrami liczy całość od nowa - w tle, kolejne ruchy suwaka zastępują czekające
+# zlecenie i przerywają bieżące
+def on_threshold(value):
+    if sesja is None or ustawianie_suwakow:
+        return
+    if isinstance(sesja, RozrostPlastrami):
+        zadania.zlec("Progi (plastry)", progi_plastrami, sesja, slider_lower.val, slider_upper.val, gotowe=wypisz_progi)
+        return
+    sesja.ustaw_progi(slider_lower.val, slider_upper.val)
+    wypisz_progi(sesja)
 
 def on_click(event):
-    if event.xdata and event.ydata:
+    if event.inaxes is ax and event.xdata and event.ydata:
         x, y = int(event.xdata), int(event.ydata)
-        region_growing_3d(selected_files, seed=(x, y, current_index))
+        zadania.zlec("Rozrost 3D (woksele)", region_growing_3d, wolumen, (x, y, current_index),
+                     gotowe=on_segmentation_ready)
 
 def on_key(event):
     global current_index
@@ -145,11 +148,53 @@ def on_key(event):
         current_index = (current_index + 1) % len(selected_files)
     elif event.key == 'left':
         current_index = (current_index - 1) % len(selected_files)
-    reader.SetFileName(selected_files[current_index])
-    reader.Update()
-    ax.imshow(itk.GetArrayFromImage(reader.GetOutput()), cmap="gray")
-    fig.canvas.draw()
-
-fig.canvas.mpl_connect('key_press_event', on_key)
-fig.canvas.mpl_connect('button_press_event', on_click)
-plt.show()
\ No newline at end of file
+    elif event.key == 'enter' and sesja is not None:
+        # Siatka z maski po strojeniu progów
+        pokaz_siatke_maski(zbuduj_siatke(sesja.maska(), sesja.ramka()))
+    # Ten sam obiekt obrazu, bez nakładania kolejnych imshow
+    show_image(current_index)
+
+# matplotlib, ITK i VTK ładowane dopiero tam, gdzie są potrzebne - --help i lista pacjentów
+# nie czekają na ich import
+def main(argv=None):
+    global args, selected_files, wolumen, widok, zadania, ax, slider_lower, slider_upper
+    args = parser.parse_args(argv)
+    wybor = opcje.wybierz_serie(args, domyslny_pacjent="Unknown Patient")
+    if wybor is None:
+        return 1
+    selected_series_uid, selected_files = wybor
+
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider
+    from wolumen import WolumenSerii
+
+    # Seria dekodowana raz, kolejne odczyty z pliku mapowanego w pamięci. Wycinki dekodowane
+    # w tle w kolejności wyświetlania - okno otwiera się od razu, operacje 3D czekają tylko
+    # na potrzebne wycinki
+    start_wczytywania = time.perf_counter()
+    wolumen = WolumenSerii(selected_series_uid, selected_files)
+    wolumen.wczytuj_w_tle()
+
+    fig, ax = plt.subplots()
+    fig.subplots_adjust(bottom=0.2)
+    widok = WidokWycinka(ax)
+    # Segmentacja w tle, postęp w wierszu stanu widoku
+    zadania = ZadaniaWTle(fig.canvas, widok.ustaw_status)
+    show_image(current_index)
+    print(f"Pierwszy obraz po {(time.perf_counter() - start_wczytywania) * 1000:.0f} ms")
+
+    slider_lower = Slider(fig.add_axes([0.2, 0.08, 0.6, 0.03]), "Dolny", -1024, 3071, valinit=-1024, valstep=1)
+    slider_upper = Slider(fig.add_axes([0.2, 0.03, 0.6, 0.03]), "Górny", -1024, 3071, valinit=3071, valstep=1)
+    slider_lower.on_changed(on_threshold)
+    slider_upper.on_changed(on_threshold)
+
+    fig.canvas.mpl_connect('key_press_event', on_key)
+    fig.canvas.mpl_connect('button_press_event', on_click)
+    fig.canvas.mpl_connect('close_event', lambda event: print(widok.statystyki() + "\n" + zadania.statystyki()))
+    plt.show()
+    zadania.zamknij()
+    wolumen.zatrzymaj_wczytywanie()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
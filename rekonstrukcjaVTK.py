@@ -1,256 +1,224 @@
 import os
 import sys
-import itk
-import vtk
-import matplotlib.pyplot as plt
+import time
 import argparse
 import numpy as np
-
-class NoOutput(itk.OutputWindow):
-    def DisplayText(self, text):
-        pass
-
-itk.OutputWindow.SetGlobalWarningDisplay(False)
-no_output = NoOutput.New()
-itk.OutputWindow.SetInstance(no_output)
+import opcje
+import pomiary
+from pamiec_wycinkow import PamiecWycinkow
+from wyswietlanie import WidokWycinka
+from rozrost import rozrost_etykiet
+from praca_w_tle import ZadaniaWTle
+from zapis_masek import zapisz_maski, zapisz_etykiety
 
 dane_obrazowe = "G:/Edukacja/2020 Studia/Semestr 9/POMwJO/Projekt/BT"
 
 parser = argparse.ArgumentParser(description="Read DICOM tags and visualize selected series.")
+opcje.dodaj_opcje(parser, dane_obrazowe, budzet_pamieci=True)
 parser.add_argument(
-    "dicom_directory",
-    nargs="?",
-    default=dane_obrazowe,
-    help="If DicomDirectory is not specified, the current directory is used.",
+    "--tryb",
+    choices=["procesy", "watki"],
+    default="procesy",
+    help="Parallel mode of per-slice region growing (ITK holds the GIL, so only processes run in parallel).",
+)
+parser.add_argument(
+    "--watki",
+    type=int,
+    default=None,
+    help="Number of workers for per-slice region growing (1 = sequential).",
+)
+parser.add_argument(
+    "--format-masek",
+    choices=["npz", "nrrd", "png"],
+    default="npz",
+    help="Mask output format: bit-packed NPZ, gzip NRRD or one PNG per slice.",
+)
+parser.add_argument(
+    "--decymacja-ciala",
+    type=float,
+    default=0.9,
+    help="Fraction of body-surface triangles removed before caching the mesh (0 = none).",
+)
+parser.add_argument(
+    "--wygladzanie-ciala",
+    type=int,
+    default=15,
+    help="Smoothing iterations for the cached body surface (0 = none).",
+)
+parser.add_argument(
+    "--etykiety",
+    action="store_true",
+    help="Multi-label mode: each click adds a 3D seed with its own label; all seeds are grown "
+         "together in one pass into a single label volume (Backspace removes the last seed).",
 )
-args = parser.parse_args()
-
-main_dir = args.dicom_directory
-
-PixelType = itk.ctype("signed short")
-Dimension = 3
-ImageType = itk.Image[PixelType, Dimension]
-
-patients = {}
-series_descriptions = {}
-
-def process_folder(dir_name):
-    namesGenerator = itk.GDCMSeriesFileNames.New()
-    namesGenerator.SetUseSeriesDetails(True)
-    namesGenerator.SetDirectory(dir_name)
-
-    series_ids = namesGenerator.GetSeriesUIDs()
-
-    for series_id in series_ids:
-        file_names = namesGenerator.GetFileNames(series_id)
-        if not file_names:
-            continue
-
-        dicomIO = itk.GDCMImageIO.New()
-        dicomIO.LoadPrivateTagsOn()
-
-        reader = itk.ImageSeriesReader[ImageType].New()
-        reader.SetImageIO(dicomIO)
-        reader.SetFileNames(file_names)
-
-        try:
-            reader.Update()
-        except Exception:
-            continue
-
-        metadata = dicomIO.GetMetaDataDictionary()
-
-        patient_name_tag = "0010|0010"
-        series_desc_tag = "0008|103e"
-
-        if metadata.HasKey(patient_name_tag):
-            patient_name = metadata[patient_name_tag]
-            series_desc = metadata[series_desc_tag] if metadata.HasKey(series_desc_tag) else "Unknown Series"
-
-            if patient_name not in patients:
-                patients[patient_name] = {}
-            if series_id not in patients[patient_name]:
-                patients[patient_name][series_id] = []
-            patients[patient_name][series_id].extend(file_names)
-
-            series_descriptions[series_id] = series_desc
-
-for root, dirs, files in os.walk(main_dir):
-    process_folder(root)
-
-def list_patients():
-    print("Dostępni pacjenci:")
-    for i, patient in enumerate(patients.keys(), start=1):
-        print(f"{i}. {patient}")
-
-if not patients:
-    print("Nie znaleziono pacjentów.")
-    sys.exit(1)
-
-list_patients()
-
-def select_patient():
-    while True:
-        try:
-            choice = int(input("\nWybierz numer pacjenta: "))
-            if 1 <= choice <= len(patients):
-                return list(patients.keys())[choice - 1]
-            else:
-                print("Błąd. Wybierz poprawny numer.")
-        except ValueError:
-            print("Błąd wejścia. Proszę wpisz numer.")
-
-selected_patient = select_patient()
-
-def list_series(patient):
-    print(f"\nSerie pacjenta: '{patient}':")
-    for i, series_id in enumerate(patients[patient].keys(), start=1):
-        series_desc = series_descriptions.get(series_id, "Unknown Series")
-        print(f"{i}. {series_desc}")
-
-list_series(selected_patient)
-
-def select_series(patient):
-    while True:
-        try:
-            choice = int(input("\nWybierz serię do wyświetlania: "))
-            if 1 <= choice <= len(patients[patient]):
-                selected_series_uid = list(patients[patient].keys())[choice - 1]
-                return patients[patient][selected_series_uid]
-            else:
-                print("Błąd. Wybierz poprawny numer.")
-        except ValueError:
-            print("Błąd wejścia. Proszę wpisz numer.")
-
-selected_files = select_series(selected_patient)
-
-selected_files = sorted(set(selected_files))
 
-PixelType2D = itk.US
-Dimension2D = 2
-ImageType2D = itk.Image[PixelType2D, Dimension2D]
+# Stan programu ustawiany w main()
+args = None
+selected_files = []
+wolumen = None
+pamiec = None
+widok = None
+zadania = None
 
 current_index = 0
+kierunek = 1
 
 masks = []
 
-# Rozrost regionu dynamiczny
-def dynamic_region_growing(seed, image_files, dynamic_threshold=300):
+# Tryb wielu etykiet: punkty startowe (seed, lower, upper) i wspólny wolumen etykiet
+punkty = []
+etykiety = None
+
+# Rozrost regionu dynamiczny (wycinki równolegle); maski spakowane, puste wycinki bez pamięci
+@pomiary.mierzony("dynamic_region_growing")
+def dynamic_region_growing(seed, wolumen, dynamic_threshold=300, postep=None):
+    from segmentacja import rozrost_dynamiczny
+
+    # Okno adaptacyjne z histogramu serii (liczony raz, zapisany obok wolumenu)
+    histogram = wolumen.histogram() if args.okno_adaptacyjne is not None else None
+    wynik, komunikaty = rozrost_dynamiczny(wolumen, seed, dynamic_threshold, tryb=args.tryb, workers=args.watki,
+                                           histogram=histogram, udzial=args.okno_adaptacyjne, postep=postep)
+    for komunikat in komunikaty:
+        print(komunikat)
+    print(f"Maski: {wynik.liczba_wokseli()} wokseli, {wynik.nbytes / 2 ** 20:.2f} MiB w pamięci")
+    return wynik
+
+# Nowy punkt startowy z oknem wokół jego intensywności (tryb wielu etykiet)
+def add_seed(seed, wolumen, dynamic_threshold=300):
+    intensity = int(wolumen.wycinek(seed[2])[seed[1], seed[0]])
+    if args.okno_adaptacyjne is not None:
+        lower, upper = wolumen.histogram().proponuj_okno(intensity, args.okno_adaptacyjne, dynamic_threshold)
+    else:
+        lower, upper = intensity - dynamic_threshold, intensity + dynamic_threshold
+    punkty.append((seed, lower, upper))
+    print(f"Etykieta {len(punkty)}: punkt {seed}, Intensywność: {intensity}, Zakres: [{lower}, {upper}]")
+
+# Rozrost wszystkich punktów naraz (jedno przejście)
+@pomiary.mierzony("multi_label_growing")
+def multi_label_growing(punkty, wolumen, postep=None):
+    wynik = rozrost_etykiet(wolumen.wolumen(), punkty, postep=postep)
+    liczby = np.bincount(wynik.ravel(), minlength=len(punkty) + 1)
+    print("Woksele etykiet: " + ", ".join(f"{etykieta}: {liczby[etykieta]}" for etykieta in range(1, len(punkty) + 1)))
+    return wynik
+
+# Zadania w tle: rozrost i zapis poza wątkiem interfejsu, wynik przez gotowe() w wątku interfejsu
+def segment_in_background(seed, postep):
+    wynik = dynamic_region_growing(seed, wolumen, postep=postep)
+    save_masks(maski=wynik)
+    return wynik
+
+def labels_in_background(punkty, postep):
+    wynik = multi_label_growing(punkty, wolumen, postep=postep)
+    save_masks(maski=wynik)
+    return wynik
+
+def on_masks_ready(wynik):
     global masks
-    masks = []
-
-    for file in image_files:
-        reader = itk.ImageFileReader[ImageType2D].New()
-        reader.SetFileName(file)
-        reader.Update()
-
-        image = reader.GetOutput()
-        image_array = itk.GetArrayFromImage(image)
+    masks = wynik
+    # Wywołanie wizualizacji 3D (spacing z pamięci wolumenów) - VTK w wątku interfejsu
+    #visualize_3d_vtk(wolumen, masks)
+
+def on_labels_ready(wynik):
+    global etykiety
+    etykiety = wynik
+    #visualize_3d_vtk(wolumen, None, etykiety)
+
+def start_labels():
+    global etykiety
+    if not punkty:
+        etykiety = None
+        return
+    # Kopia listy - kolejne kliknięcia nie zmieniają punktów zadania w toku
+    zadania.zlec(f"Rozrost {len(punkty)} etykiet", labels_in_background, list(punkty), gotowe=on_labels_ready)
+
+# Zapis masek (jeden plik NPZ/NRRD ze spacing i origin; "png" - plik na wycinek)
+# maski=None - bieżące maski (w trybie wielu etykiet: wolumen etykiet)
+@pomiary.mierzony("save_masks")
+def save_masks(output_dir="output_masks", format=None, maski=None):
+    format = format or args.format_masek
+    if args.etykiety:
+        maski = etykiety if maski is None else maski
+        # Wolumen etykiet zawsze jako jeden plik (PNG nie przenosi etykiet)
+        output_path = zapisz_etykiety(output_dir, maski, wolumen.spacing, wolumen.origin,
+                                      "nrrd" if format == "nrrd" else "npz")
+        print(f"Etykiety zapisane: {output_path}")
+        return
+    maski = masks if maski is None else maski
+    if format != "png":
+        output_path = zapisz_maski(output_dir, maski, wolumen.spacing, wolumen.origin, format)
+        print(f"Maski zapisane: {output_path}")
+        return
+
+    import matplotlib.pyplot as plt
 
-        # Intensywność w punkcie początkowym (seed)
-        intensity = image_array[seed[1], seed[0]]
-
-        # Zakres globalny
-        global_lower_threshold = 1000
-        global_upper_threshold = 2000
-
-        # Sprawdzamy, czy intensywność mieści się w zakresie globalnym
-        if intensity < global_lower_threshold or intensity > global_upper_threshold:
-            print(f"Intensywność {intensity} poza globalnym zakresem {global_lower_threshold}-{global_upper_threshold}. Rozrost pominięty.")
-            masks.append(np.zeros_like(image_array))  # Dodajemy pustą maskę dla tego obrazu
-            continue
-
-        # Zakres dynamiczny
-        dynamic_lower_threshold = max(0, intensity - dynamic_threshold)
-        dynamic_upper_threshold = intensity + dynamic_threshold
-
-        # Rozrost regionu w zakresie dynamicznym
-        region_grow = itk.ConnectedThresholdImageFilter[ImageType2D, ImageType2D].New()
-        region_grow.SetInput(image)
-        region_grow.SetSeed(seed)
-        region_grow.SetLower(int(dynamic_lower_threshold))
-        region_grow.SetUpper(int(dynamic_upper_threshold))
-        region_grow.Update()
-
-        # Uzyskanie maski
-        output_image = region_grow.GetOutput()
-        output_array = itk.GetArrayFromImage(output_image)
-
-        masks.append(output_array)  # Dodanie maski do wyników
-
-# Zapis masek
-def save_masks(output_dir="output_masks"):
     os.makedirs(output_dir, exist_ok=True)
-    for i, mask in enumerate(masks):
+    for i, mask in enumerate(maski):
         output_path = os.path.join(output_dir, f"mask_{i+1}.png")
-        plt.imsave(output_path, mask, cmap="gray")
-
-def get_voxel_spacing(dicom_file):
-    dicomIO = itk.GDCMImageIO.New()
-    reader = itk.ImageFileReader[ImageType2D].New()
-    reader.SetFileName(dicom_file)
-    reader.SetImageIO(dicomIO)
-    reader.Update()
-
-    # Pobranie spacing dla każdego wymiaru (0: X, 1: Y, 2: Z)
-    spacing = tuple(dicomIO.GetSpacing(i) for i in range(3))
-
-    return spacing
+        plt.imsave(output_path, mask.view(np.uint8), cmap="gray")
 
 # Wizualizacja 3D VTK
-def visualize_3d_vtk(selected_files, tumor_masks, voxel_spacing):
-    # Wczytanie danych DICOM do vtkImageData
-    dicom_reader = vtk.vtkImageData()
-    dicom_reader.SetDimensions(len(selected_files), tumor_masks[0].shape[0], tumor_masks[0].shape[1])  # Z, Y, X order
-    dicom_reader.SetSpacing(voxel_spacing)
-    dicom_reader.AllocateScalars(vtk.VTK_UNSIGNED_SHORT, 1)
-
-    for z, dicom_file in enumerate(selected_files):
-        reader = itk.ImageFileReader[ImageType2D].New()
-        reader.SetFileName(dicom_file)
-        reader.Update()
-        image_slice = itk.GetArrayFromImage(reader.GetOutput())
-
-        # Przenoszenie danych pikseli do vtkImageData
-        for y in range(image_slice.shape[0]):
-            for x in range(image_slice.shape[1]):
-                dicom_reader.SetScalarComponentFromDouble(x, y, z, 0, image_slice[y, x])
-
-    # Wczytanie masek do vtkImageData
-    tumor_image = vtk.vtkImageData()
-    tumor_image.SetDimensions(dicom_reader.GetDimensions())
-    tumor_image.SetSpacing(voxel_spacing)
-    tumor_image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)  # Binary mask
-
-    for z, mask in enumerate(tumor_masks):
-        for y in range(mask.shape[0]):
-            for x in range(mask.shape[1]):
-                value = 255 if mask[y, x] > 0 else 0
-                tumor_image.SetScalarComponentFromDouble(x, y, z, 0, value)
-
-    # Ekstrakcja powierzchni guza
-    tumor_surface_extractor = vtk.vtkMarchingCubes()
-    tumor_surface_extractor.SetInputData(tumor_image)
-    tumor_surface_extractor.SetValue(0, 127)  # Prog dla binarnej maski
-    tumor_surface_extractor.Update()
-
-    tumor_mapper = vtk.vtkPolyDataMapper()
-    tumor_mapper.SetInputConnection(tumor_surface_extractor.GetOutputPort())
-    tumor_mapper.ScalarVisibilityOff()
+def visualize_3d_vtk(wolumen, tumor_masks, etykiety=None):
+    import vtk
+    from konwersja_vtk import numpy_do_vtk, maski_do_vtk, ramka_maski, powieksz_ramke, przytnij_do_vtk
+    from siatka import siatka_ciala, izopowierzchnia_plastrami, BAJTY_SIATKI
+    from plastry import miesci_sie
+
+    budzet = int(args.budzet_pamieci * 2 ** 20)
+
+    # Spacing dla każdego wymiaru (0: X, 1: Y, 2: Z) z pamięci wolumenów
+    voxel_spacing = wolumen.spacing
+
+    if etykiety is not None:
+        # Wszystkie etykiety jednym filtrem (w ramce etykiet), kolor powierzchni według etykiety
+        liczba_etykiet = int(etykiety.max())
+        tumor_surface_extractor = vtk.vtkDiscreteMarchingCubes()
+        ramka = ramka_maski(etykiety)
+        if ramka is not None:
+            etykiety_vtk = przytnij_do_vtk(etykiety, powieksz_ramke(ramka, etykiety.shape), voxel_spacing, wolumen.origin)
+        else:
+            etykiety_vtk = numpy_do_vtk(etykiety, voxel_spacing, wolumen.origin)
+        tumor_surface_extractor.SetInputData(etykiety_vtk)
+        tumor_surface_extractor.GenerateValues(liczba_etykiet, 1, liczba_etykiet)
+        with pomiary.etap("discrete_marching_cubes", woksele=etykiety_vtk.GetNumberOfPoints()):
+            tumor_surface_extractor.Update()
+
+        tumor_mapper = vtk.vtkPolyDataMapper()
+        tumor_mapper.SetInputConnection(tumor_surface_extractor.GetOutputPort())
+        tumor_mapper.SetScalarRange(1, max(liczba_etykiet, 2))
+    elif not miesci_sie((len(tumor_masks),) + tumor_masks[0].shape, BAJTY_SIATKI, budzet):
+        # Maski większe niż budżet - powierzchnia plastrami, bez wolumenu 0/1 całej serii
+        tumor_surface = izopowierzchnia_plastrami(tumor_masks, 0.5, voxel_spacing, wolumen.origin, budzet, maska=True)
+
+        tumor_mapper = vtk.vtkPolyDataMapper()
+        tumor_mapper.SetInputData(tumor_surface)
+        tumor_mapper.ScalarVisibilityOff()
+    else:
+        # Maski jako jeden obraz 0/1 (jedno przejście NumPy zamiast wywołań per woksel),
+        # przycięty do ramki maski - marching cubes nie przechodzi całego wolumenu
+        tumor_image = maski_do_vtk(tumor_masks, voxel_spacing, wolumen.origin, przytnij=True)
+
+        # Ekstrakcja powierzchni guza
+        tumor_surface_extractor = vtk.vtkMarchingCubes()
+        tumor_surface_extractor.SetInputData(tumor_image)
+        tumor_surface_extractor.SetValue(0, 0.5)  # Prog dla binarnej maski (0/1)
+        with pomiary.etap("marching_cubes", woksele=tumor_image.GetNumberOfPoints()):
+            tumor_surface_extractor.Update()
+
+        tumor_mapper = vtk.vtkPolyDataMapper()
+        tumor_mapper.SetInputConnection(tumor_surface_extractor.GetOutputPort())
+        tumor_mapper.ScalarVisibilityOff()
 
     tumor_actor = vtk.vtkActor()
     tumor_actor.SetMapper(tumor_mapper)
     tumor_actor.GetProperty().SetColor(1.0, 0.0, 0.0)  # Czerwony
     tumor_actor.GetProperty().SetOpacity(1.0)
 
-    # Ekstrakcja powierzchni ciała pacjenta
-    body_surface_extractor = vtk.vtkMarchingCubes()
-    body_surface_extractor.SetInputData(dicom_reader)
-    body_surface_extractor.SetValue(0, 500)  # Próg dla powierzchni ciała (do regulacji)
-    body_surface_extractor.Update()
+    # Powierzchnia ciała pacjenta - liczona raz na serię i próg, potem wczytywana z dysku
+    body_surface = siatka_ciala(wolumen, iso=500, decymacja=args.decymacja_ciala,  # Próg do regulacji
+                                wygladzanie=args.wygladzanie_ciala, budzet=budzet)
 
     body_mapper = vtk.vtkPolyDataMapper()
-    body_mapper.SetInputConnection(body_surface_extractor.GetOutputPort())
+    body_mapper.SetInputData(body_surface)
     body_mapper.ScalarVisibilityOff()
 
     body_actor = vtk.vtkActor()
@@ -277,49 +245,91 @@ def visualize_3d_vtk(selected_files, tumor_masks, voxel_spacing):
 
     # Uruchamianie renderowania
     renderer.ResetCamera()
-    render_window.Render()
+    with pomiary.etap("pierwszy_render"):
+        render_window.Render()
     render_interactor.Start()
 
+@pomiary.mierzony("show_image")
 def show_image(index):
-    reader = itk.ImageFileReader[ImageType2D].New()
-    reader.SetFileName(selected_files[index])
-    reader.Update()
+    image_data = pamiec.wycinek(index, kierunek)
 
-    image_data = itk.GetArrayFromImage(reader.GetOutput())
-
-    ax.clear()
-    ax.imshow(image_data, cmap="gray")
-    ax.axis("off")
-    ax.set_title(f"Image {index + 1}/{len(selected_files)}")
-    fig.canvas.draw()
+    tytul = f"Image {index + 1}/{len(selected_files)}"
+    if wolumen.wczytywanie is not None:
+        tytul += f" (wczytano {wolumen.wczytane()}/{len(wolumen)})"
+    widok.pokaz(image_data, tytul)
 
 def on_click(event):
     if event.xdata is not None and event.ydata is not None:
         x, y = int(event.xdata), int(event.ydata)
         print(f"Wybrano punkt: ({x}, {y})")
-        
-        # Wywołanie dynamicznego rozrostu regionu
-        dynamic_region_growing(seed=(x, y), image_files=selected_files)
-        
-        # Zapisanie masek
-        save_masks()
 
-        # Pobranie voxel spacing
-        #voxel_spacing = get_voxel_spacing(selected_files[0])
+        if args.etykiety:
+            # Kolejny punkt dokładany do poprzednich zamiast zastępowania masek
+            add_seed((x, y, current_index), wolumen)
+            start_labels()
+            return
 
-        # Wywołanie wizualizacji 3D z poprawnymi argumentami
-        #visualize_3d_vtk(selected_files, masks, voxel_spacing)
+        # Rozrost i zapis masek w tle - nowe kliknięcie anuluje poprzednie zadanie
+        zadania.zlec("Rozrost dynamiczny", segment_in_background, (x, y), gotowe=on_masks_ready)
 
 def on_key(event):
-    global current_index
+    global current_index, kierunek
     if event.key == 'right':
+        kierunek = 1
         current_index = (current_index + 1) % len(selected_files)
     elif event.key == 'left':
+        kierunek = -1
         current_index = (current_index - 1) % len(selected_files)
+    elif event.key == 'backspace' and args.etykiety and punkty:
+        print(f"Usunięto etykietę {len(punkty)}")
+        punkty.pop()
+        start_labels()
+    show_image(current_index)
+
+# matplotlib, ITK i VTK ładowane dopiero tam, gdzie są potrzebne - --help i lista pacjentów
+# nie czekają na ich import
+def main(argv=None):
+    global args, selected_files, wolumen, pamiec, widok, zadania
+    args = parser.parse_args(argv)
+    wybor = opcje.wybierz_serie(args)
+    if wybor is None:
+        return 1
+    selected_series_uid, selected_files = wybor
+
+    import matplotlib.pyplot as plt
+    from wolumen import WolumenSerii
+
+    # Seria dekodowana raz, kolejne odczyty z pliku mapowanego w pamięci. Wycinki dekodowane
+    # w tle w kolejności wyświetlania - okno otwiera się od razu, operacje 3D czekają tylko
+    # na potrzebne wycinki
+    start_wczytywania = time.perf_counter()
+    wolumen = WolumenSerii(selected_series_uid, selected_files)
+    wolumen.wczytuj_w_tle()
+
+    # Procesy rozrostu wycinków ładują ITK w tle, gdy seria jest jeszcze przeglądana
+    if args.tryb == "procesy" and not args.etykiety:
+        from segmentacja import rozgrzej_procesy
+        rozgrzej_procesy(args.watki)
+
+    # Wycinki do wyświetlania w pamięci LRU, sąsiednie dekodowane w tle
+    pamiec = PamiecWycinkow(wolumen.wycinek, len(wolumen))
+
+    fig, ax = plt.subplots()
+    widok = WidokWycinka(ax)
+    # Segmentacja w tle, postęp w wierszu stanu widoku
+    zadania = ZadaniaWTle(fig.canvas, widok.ustaw_status)
     show_image(current_index)
+    print(f"Pierwszy obraz po {(time.perf_counter() - start_wczytywania) * 1000:.0f} ms")
+    fig.canvas.mpl_connect('key_press_event', on_key)
+    fig.canvas.mpl_connect('button_press_event', on_click)
+    fig.canvas.mpl_connect('close_event', lambda event: print(pamiec.statystyki() + "\n" + widok.statystyki()
+                                                              + "\n" + zadania.statystyki()))
+    plt.show()
+    zadania.zamknij()
+    pamiec.zamknij()
+    wolumen.zatrzymaj_wczytywanie()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
 
-fig, ax = plt.subplots()
-show_image(current_index)
-fig.canvas.mpl_connect('key_press_event', on_key)
-fig.canvas.mpl_connect('button_press_event', on_click)
-plt.show()
@@ -0,0 +1,5 @@
+import segmentacja
+
+# Importowany tylko przez serwer procesów rozrostu (forkserver): ITK ładowane raz w serwerze,
+# procesy robocze puli powstają z niego już rozgrzane
+segmentacja.rozgrzej_itk()
@@ -0,0 +1,347 @@
+import time
+import numpy as np
+import pomiary
+from plastry import BUDZET_PAMIECI, miesci_sie, plastry, maska_na_dysku
+
+# Stan woksela w sesji: poza regionem, w regionie, w starym regionie (tylko podczas zawężania)
+POZA = 0
+REGION = 1
+STARY = 2
+
+# np.unique przez sortowanie - szybsze od wersji z haszowaniem dla tablic indeksów
+def unikalne(indeksy):
+    indeksy = np.sort(indeksy)
+    if indeksy.size < 2:
+        return indeksy
+    return indeksy[np.concatenate(([True], indeksy[1:] != indeksy[:-1]))]
+
+# Odległość (w indeksach płaskich) między sąsiednimi wokselami wzdłuż każdej osi
+def kroki_osi(shape):
+    return [int(np.prod(shape[osi + 1:])) for osi in range(len(shape))]
+
+# Sąsiedzi ścianami wokseli o indeksach płaskich (bez wychodzenia poza wolumen);
+# etykiety - wartości towarzyszące wokselom, zwracane dla każdego sąsiada
+def sasiedzi_wokseli(indeksy, kroki, shape, etykiety=None):
+    sasiedzi = []
+    zrodla = []
+    for krok, rozmiar in zip(kroki, shape):
+        wspolrzedna = (indeksy // krok) % rozmiar
+        for wybrane, przesuniecie in ((wspolrzedna > 0, -krok), (wspolrzedna < rozmiar - 1, krok)):
+            sasiedzi.append(indeksy[wybrane] + przesuniecie)
+            if etykiety is not None:
+                zrodla.append(etykiety[wybrane])
+    if etykiety is None:
+        return np.concatenate(sasiedzi)
+    return np.concatenate(sasiedzi), np.concatenate(zrodla)
+
+# Przyrostowy rozrost regionu (2D lub 3D, sąsiedztwo ścianami jak w ConnectedThresholdImageFilter)
+# dla jednego punktu startowego. Sesja pamięta region i jego granicę (sprawdzone sąsiednie woksele
+# poza regionem): poszerzenie zakresu rośnie tylko od granicy, zawężenie rośnie od nowa tylko
+# wewnątrz starego regionu - koszt zależy od zmienionych wokseli, nie od całego wolumenu
+class SesjaRozrostu:
+    # seed w kolejności ITK: (x, y) lub (x, y, z); postep(liczba_wokseli) - wywoływany
+    # po każdym kroku rozrostu (może przerwać sesję wyjątkiem)
+    def __init__(self, volume, seed, postep=None):
+        self.volume = np.ascontiguousarray(volume)
+        self.shape = self.volume.shape
+        self.wartosci = self.volume.ravel()
+        self.seed = int(np.ravel_multi_index(tuple(reversed(seed)), self.shape))
+        self.kroki = kroki_osi(self.shape)
+
+        self.stan = np.zeros(self.volume.size, dtype=np.uint8)
+        self.indeksy = []
+        self.granica = np.empty(0, dtype=np.intp)
+        self.lower = None
+        self.upper = None
+
+        self.postep = postep
+        self.ostatnio_zmienione = 0
+        self.ostatni_czas = 0.0
+
+    # Maska bool (jak wolumen) bez kopii - poza operacjami stan ma tylko wartości 0 / 1
+    def maska(self):
+        return self.stan.reshape(self.shape).view(np.bool_)
+
+    # Ramka regionu (z0, z1, y0, y1, x0, x1) z indeksów regionu, bez przeglądania wolumenu
+    def ramka(self):
+        if not self.indeksy:
+            return None
+        indeksy = np.concatenate(self.indeksy)
+        ramka = ()
+        for krok, rozmiar in zip(self.kroki, self.shape):
+            wspolrzedna = (indeksy // krok) % rozmiar
+            ramka += (int(wspolrzedna.min()), int(wspolrzedna.max()) + 1)
+        return ramka
+
+    def liczba_wokseli(self):
+        return sum(indeksy.size for indeksy in self.indeksy)
+
+    # Rozrost wszerz od frontu (woksele już oznaczone jako REGION); tylko_stary - woksele
+    # spoza starego regionu są odrzucane. Wynik: odrzuceni sąsiedzi (nowa część granicy, z powtórzeniami)
+    def _rozrost(self, front, lower, upper, tylko_stary=False):
+        odrzucone = []
+        while front.size:
+            sasiedzi = sasiedzi_wokseli(front, self.kroki, self.shape)
+            stan = self.stan[sasiedzi]
+            w_zakresie = stan != REGION
+            sasiedzi, stan = sasiedzi[w_zakresie], stan[w_zakresie]
+            wartosci = self.wartosci[sasiedzi]
+            w_zakresie = (wartosci >= lower) & (wartosci <= upper)
+            if tylko_stary:
+                w_zakresie &= stan == STARY
+            odrzucone.append(sasiedzi[~w_zakresie])
+            front = unikalne(sasiedzi[w_zakresie])
+            self.stan[front] = REGION
+            self.indeksy.append(front)
+            if self.postep is not None:
+                self.postep(self.liczba_wokseli())
+        return odrzucone
+
+    def _od_nowa(self, lower, upper):
+        for indeksy in self.indeksy:
+            self.stan[indeksy] = POZA
+        self.indeksy = []
+        self.granica = np.empty(0, dtype=np.intp)
+        if lower <= self.wartosci[self.seed] <= upper:
+            front = np.array([self.seed], dtype=np.intp)
+            self.stan[front] = REGION
+            self.indeksy.append(front)
+            self.granica = unikalne(np.concatenate(self._rozrost(front, lower, upper)))
+
+    # Zawężenie: nowy region to spójna część starego regionu w węższym zakresie
+    def _zawez(self, lower, upper):
+        stary = np.concatenate(self.indeksy)
+        self.stan[stary] = STARY
+        self.indeksy = []
+        odrzucone = []
+        if lower <= self.wartosci[self.seed] <= upper:
+            front = np.array([self.seed], dtype=np.intp)
+            self.stan[front] = REGION
+            self.indeksy.append(front)
+            odrzucone = self._rozrost(front, lower, upper, tylko_stary=True)
+        # Woksele starego regionu, które nie zostały w nowym
+        usuniete = stary[self.stan[stary] == STARY]
+        self.stan[usuniete] = POZA
+        self.granica = unikalne(np.concatenate(odrzucone)) if odrzucone else np.empty(0, dtype=np.intp)
+        return usuniete.size
+
+    # Poszerzenie: rozrost tylko od wokseli granicy, które weszły do zakresu
+    def _poszerz(self, lower, upper):
+        wartosci = self.wartosci[self.granica]
+        w_zakresie = (wartosci >= lower) & (wartosci <= upper)
+        front = self.granica[w_zakresie]
+        self.stan[front] = REGION
+        self.indeksy.append(front)
+        odrzucone = self._rozrost(front, lower, upper)
+        self.granica = unikalne(np.concatenate([self.granica[~w_zakresie]] + odrzucone))
+
+    # Nowy zakres progów; wynik: maska bool (bez kopii)
+    @pomiary.mierzony("sesja_ustaw_progi")
+    def ustaw_progi(self, lower, upper):
+        start = time.perf_counter()
+        lower, upper = int(lower), int(upper)
+        przed = self.liczba_wokseli()
+        usuniete = 0
+
+        if self.lower is None or not self.indeksy or lower > upper:
+            # Rozrost od nowa usuwa cały stary region
+            usuniete = przed
+            self._od_nowa(lower, upper)
+        else:
+            # Zmiana dowolna = zawężenie do części wspólnej zakresów + poszerzenie do nowego
+            lower_wspolny, upper_wspolny = max(lower, self.lower), min(upper, self.upper)
+            if lower_wspolny > upper_wspolny:
+                usuniete = przed
+                self._od_nowa(lower, upper)
+            else:
+                if (lower_wspolny, upper_wspolny) != (self.lower, self.upper):
+                    usuniete = self._zawez(lower_wspolny, upper_wspolny)
+                if (lower, upper) != (lower_wspolny, upper_wspolny):
+                    # Punkt startowy wypadł z części wspólnej - nie ma od czego rosnąć
+                    if self.indeksy:
+                        self._poszerz(lower, upper)
+                    else:
+                        self._od_nowa(lower, upper)
+
+        self.lower, self.upper = lower, upper
+        self.ostatnio_zmienione = usuniete + self.liczba_wokseli() - (przed - usuniete)
+        self.ostatni_czas = time.perf_counter() - start
+        return self.maska()
+
+# Pamięć sesji na woksel wolumenu: stan uint8 i indeksy regionu (intp) w najgorszym przypadku
+BAJTY_SESJI = 9
+# Pamięć rozrostu plastrami na woksel plastra: wartości, maska i front z sąsiadami (intp)
+BAJTY_PLASTRA = 16
+
+# Rozrost regionu 3D dla serii większych niż budżet pamięci - ten sam wynik co SesjaRozrostu
+# (i ConnectedThresholdImageFilter), ale maska leży w pliku mapowanym w pamięci, a rozrost
+# przechodzi plastrami wycinków: front dochodzący do granicy plastra zostawia punkty startowe
+# dla sąsiedniego plastra, który jest przetwarzany, gdy przyjdzie jego kolej (także ponownie).
+# Zmiana progów liczy region od nowa (bez granicy sesji przyrostowej).
+# wolumen - WolumenSerii albo tablica (Z, Y, X); seed w kolejności ITK (x, y, z)
+class RozrostPlastrami:
+    def __init__(self, wolumen, seed, budzet=BUDZET_PAMIECI, postep=None, katalog=None):
+        self.wolumen = wolumen
+        self.shape = tuple(wolumen.shape)
+        self.plaszczyzna = self.shape[1] * self.shape[2]
+        self.seed = int(np.ravel_multi_index(tuple(reversed(seed)), self.shape))
+        self.plastry = [(z0, z1) for z0, z1, _, _ in plastry(self.shape, BAJTY_PLASTRA, budzet)]
+        self.stan = maska_na_dysku(self.shape, katalog)
+
+        self.liczba = 0
+        self._ramka = None
+        self.lower = None
+        self.upper = None
+
+        self.postep = postep
+        self.ostatnio_zmienione = 0
+        self.ostatni_czas = 0.0
+
+    def maska(self):
+        return self.stan
+
+    def ramka(self):
+        return None if self._ramka is None else tuple(self._ramka)
+
+    def liczba_wokseli(self):
+        return self.liczba
+
+    def _czytaj(self, z0, z1):
+        podwolumen = getattr(self.wolumen, "podwolumen", None)
+        return np.asarray(podwolumen(z0, z1) if podwolumen else self.wolumen[z0:z1])
+
+    def _plaster(self, z):
+        return next(nr for nr, (z0, z1) in enumerate(self.plastry) if z0 <= z < z1)
+
+    # Woksele frontu (indeksy w plastrze od z0) w liczniku i ramce regionu
+    def _dolicz(self, front, z0):
+        self.liczba += front.size
+        ramka = []
+        for krok, rozmiar, przesuniecie in ((self.plaszczyzna, self.shape[0], z0), (self.shape[2], self.shape[1], 0),
+                                           (1, self.shape[2], 0)):
+            wspolrzedna = (front // krok) % rozmiar
+            ramka += [int(wspolrzedna.min()) + przesuniecie, int(wspolrzedna.max()) + przesuniecie + 1]
+        if self._ramka is None:
+            self._ramka = ramka
+        else:
+            for i in range(0, 6, 2):
+                self._ramka[i] = min(self._ramka[i], ramka[i])
+                self._ramka[i + 1] = max(self._ramka[i + 1], ramka[i + 1])
+        if self.postep is not None:
+            self.postep(self.liczba)
+
+    # Rozrost w jednym plastrze od punktów wejscie (indeksy płaskie całego wolumenu);
+    # wynik: {numer sąsiedniego plastra: indeksy płaskie wokseli za granicą plastra}
+    def _rozrost_plastra(self, nr, wejscie, lower, upper):
+        z0, z1 = self.plastry[nr]
+        shape = (z1 - z0,) + self.shape[1:]
+        kroki = kroki_osi(shape)
+        wartosci = self._czytaj(z0, z1).reshape(-1)
+        stan = self.stan[z0:z1].reshape(-1)
+
+        front = unikalne(wejscie - z0 * self.plaszczyzna)
+        wartosci_frontu = wartosci[front]
+        front = front[(wartosci_frontu >= lower) & (wartosci_frontu <= upper) & ~stan[front]]
+        stan[front] = True
+        wyjscie = {}
+        while front.size:
+            self._dolicz(front, z0)
+            # Sąsiedzi w wycinkach sąsiednich plastrów - sprawdzani przez tamte plastry
+            z = front // self.plaszczyzna
+            if z0 > 0:
+                wyjscie.setdefault(nr - 1, []).append(front[z == 0] + (z0 - 1) * self.plaszczyzna)
+            if z1 < self.shape[0]:
+                wyjscie.setdefault(nr + 1, []).append(front[z == z1 - z0 - 1] + (z0 + 1) * self.plaszczyzna)
+
+            sasiedzi = sasiedzi_wokseli(front, kroki, shape)
+            sasiedzi = sasiedzi[~stan[sasiedzi]]
+            wartosci_sasiadow = wartosci[sasiedzi]
+            front = unikalne(sasiedzi[(wartosci_sasiadow >= lower) & (wartosci_sasiadow <= upper)])
+            stan[front] = True
+        return {sasiad: np.concatenate(indeksy) for sasiad, indeksy in wyjscie.items()}
+
+    def _od_nowa(self, lower, upper):
+        # Czyszczenie tylko w ramce starego regionu
+        if self._ramka is not None:
+            z0, z1, y0, y1, x0, x1 = self._ramka
+            self.stan[z0:z1, y0:y1, x0:x1] = False
+        self.liczba = 0
+        self._ramka = None
+
+        oczekujace = {self._plaster(self.seed // self.plaszczyzna): [np.array([self.seed], dtype=np.intp)]}
+        while oczekujace:
+            nr = min(oczekujace)
+            wejscie = np.concatenate(oczekujace.pop(nr))
+            for sasiad, indeksy in self._rozrost_plastra(nr, wejscie, lower, upper).items():
+                if indeksy.size:
+                    oczekujace.setdefault(sasiad, []).append(indeksy)
+        self.stan.flush()
+
+    # Nowy zakres progów; wynik: maska bool (mapowana z pliku)
+    @pomiary.mierzony("rozrost_plastrami")
+    def ustaw_progi(self, lower, upper):
+        start = time.perf_counter()
+        lower, upper = int(lower), int(upper)
+        przed = self.liczba
+        self._od_nowa(lower, upper)
+        self.lower, self.upper = lower, upper
+        # Pełne przeliczenie - zmienione są woksele starego i nowego regionu
+        self.ostatnio_zmienione = przed + self.liczba
+        self.ostatni_czas = time.perf_counter() - start
+        return self.maska()
+
+# Sesja rozrostu 3D dobrana do budżetu pamięci: cała seria w pamięci albo plastrami
+def nowa_sesja(wolumen, seed, budzet=BUDZET_PAMIECI, postep=None, katalog=None):
+    if miesci_sie(wolumen.shape, BAJTY_SESJI, budzet):
+        volume = wolumen.wolumen() if hasattr(wolumen, "wolumen") else wolumen
+        return SesjaRozrostu(volume, seed, postep=postep)
+    return RozrostPlastrami(wolumen, seed, budzet, postep=postep, katalog=katalog)
+
+# Rozrost wielu punktów startowych naraz - jedno przejście wszerz po wolumenie zamiast
+# osobnego rozrostu dla każdego punktu. punkty: lista (seed, lower, upper), seed w kolejności
+# ITK; etykieta punktu = jego numer na liście + 1. Woksel osiągalny z kilku punktów dostaje
+# etykietę tego, który dotarł pierwszy (przy remisie - jednego z nich). Wynik: wolumen etykiet uint8 (0 - tło).
+# postep(liczba_wokseli) - wywoływany po każdym kroku rozrostu
+@pomiary.mierzony("rozrost_etykiet")
+def rozrost_etykiet(volume, punkty, postep=None):
+    if len(punkty) > 255:
+        raise ValueError("Najwyżej 255 etykiet w wolumenie uint8")
+    volume = np.ascontiguousarray(volume)
+    shape = volume.shape
+    kroki = kroki_osi(shape)
+    wartosci = volume.ravel()
+    etykiety = np.zeros(volume.size, dtype=np.uint8)
+
+    # Progi indeksowane etykietą (etykieta 0 nie występuje we froncie)
+    lower = np.array([0] + [int(punkt[1]) for punkt in punkty], dtype=np.int64)
+    upper = np.array([0] + [int(punkt[2]) for punkt in punkty], dtype=np.int64)
+
+    front = []
+    front_etykiety = []
+    for etykieta, (seed, lower_punktu, upper_punktu) in enumerate(punkty, start=1):
+        indeks = int(np.ravel_multi_index(tuple(reversed(seed)), shape))
+        if lower_punktu <= wartosci[indeks] <= upper_punktu and etykiety[indeks] == 0:
+            etykiety[indeks] = etykieta
+            front.append(indeks)
+            front_etykiety.append(etykieta)
+    front = np.array(front, dtype=np.intp)
+    front_etykiety = np.array(front_etykiety, dtype=np.uint8)
+    liczba = front.size
+
+    while front.size:
+        sasiedzi, zrodla = sasiedzi_wokseli(front, kroki, shape, front_etykiety)
+        wolne = etykiety[sasiedzi] == 0
+        sasiedzi, zrodla = sasiedzi[wolne], zrodla[wolne]
+        wartosci_sasiadow = wartosci[sasiedzi]
+        w_zakresie = (wartosci_sasiadow >= lower[zrodla]) & (wartosci_sasiadow <= upper[zrodla])
+        sasiedzi, zrodla = sasiedzi[w_zakresie], zrodla[w_zakresie]
+
+        # Woksel osiągnięty z kilku etykiet naraz dostaje jedną z nich (ostatni zapis)
+        etykiety[sasiedzi] = zrodla
+        front = unikalne(sasiedzi)
+        front_etykiety = etykiety[front]
+        liczba += front.size
+        if postep is not None:
+            postep(liczba)
+
+    return etykiety.reshape(shape)
@@ -0,0 +1,286 @@
+import os
+import mmap
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import leniwe
+import pomiary
+from maski import MaskiWycinkow, spakuj
+
+# Zakres globalny intensywności punktu startowego dla rozrostu dynamicznego
+GLOBAL_LOWER_THRESHOLD = 1000
+GLOBAL_UPPER_THRESHOLD = 2000
+
+# Interaktywny rozrost regionu 3D: wolumen i filtr pozostają w pamięci między kliknięciami,
+# każde kliknięcie to tylko ConnectedThresholdImageFilter na gotowym obrazie
+class Segmentacja3D:
+    def __init__(self, volume, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0), intensity_threshold=500,
+                 histogram=None, udzial=None):
+        self.volume = np.ascontiguousarray(volume, dtype=np.int16)
+        self.intensity_threshold = intensity_threshold
+        # Histogram serii i udział wokseli po obu stronach punktu startowego - okno adaptacyjne
+        self.histogram = histogram
+        self.udzial = udzial
+        self.czas_odczytu = 0.0
+
+        # Obraz ITK jako widok na tablicę (bez kopii)
+        itk = leniwe.itk()
+        ImageType = leniwe.typ_obrazu(3)
+        self.image = itk.GetImageViewFromArray(self.volume)
+        self.image.SetSpacing(spacing)
+        self.image.SetOrigin(origin)
+
+        self.region_grow = itk.ConnectedThresholdImageFilter[ImageType, ImageType].New()
+        self.region_grow.SetInput(self.image)
+        self.region_grow.SetReplaceValue(1)
+        self.ostatnie_czasy = {}
+
+    @classmethod
+    def z_wolumenu(cls, wolumen, **kwargs):
+        start = time.perf_counter()
+        volume = wolumen.wolumen()
+        czas_odczytu = time.perf_counter() - start
+
+        silnik = cls(volume, wolumen.spacing, wolumen.origin, **kwargs)
+        silnik.czas_odczytu = czas_odczytu
+        return silnik
+
+    # Zakres progów wokół intensywności w punkcie startowym; z histogramem okno adaptacyjne
+    # ograniczone do +/- intensity_threshold
+    def progi(self, seed):
+        intensity = int(self.volume[seed[2], seed[1], seed[0]])
+        if self.histogram is not None and self.udzial is not None:
+            lower, upper = self.histogram.proponuj_okno(intensity, self.udzial, self.intensity_threshold)
+            return intensity, max(-1024, lower), min(3071, upper)
+        lower_threshold = max(-1024, intensity - self.intensity_threshold)
+        upper_threshold = min(3071, intensity + self.intensity_threshold)
+        return intensity, lower_threshold, upper_threshold
+
+    # seed w kolejności ITK (x, y, z); wynik: maska bool (Z, Y, X)
+    def segmentuj(self, seed, lower_threshold=None, upper_threshold=None):
+        czasy = {"odczyt": self.czas_odczytu}
+        self.czas_odczytu = 0.0
+
+        if lower_threshold is None or upper_threshold is None:
+            _, lower, upper = self.progi(seed)
+            lower_threshold = lower if lower_threshold is None else lower_threshold
+            upper_threshold = upper if upper_threshold is None else upper_threshold
+
+        start = time.perf_counter()
+        self.region_grow.ClearSeeds()
+        self.region_grow.SetSeed(seed)
+        self.region_grow.SetLower(int(lower_threshold))
+        self.region_grow.SetUpper(int(upper_threshold))
+        # Filtr nie zeruje ponownie użytego wyjścia - bez tego węższy zakres zostawia stary region
+        self.region_grow.GetOutput().ReleaseData()
+        with pomiary.etap("itk_update_3d", woksele=self.volume.size):
+            self.region_grow.Update()
+        czasy["filtr"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with pomiary.etap("itk_do_numpy_3d", bajty=self.volume.size):
+            mask_3d = leniwe.itk().GetArrayViewFromImage(self.region_grow.GetOutput()) > 0
+        czasy["konwersja"] = time.perf_counter() - start
+
+        czasy["razem"] = czasy["odczyt"] + czasy["filtr"] + czasy["konwersja"]
+        self.ostatnie_czasy = czasy
+        return mask_3d
+
+    def opis_czasow(self):
+        return ", ".join(f"{nazwa}: {czas * 1000:.0f} ms" for nazwa, czas in self.ostatnie_czasy.items())
+
+# Rozrost regionu w jednym wycinku; wynik: (maska bool, komunikat lub None), pominięty
+# wycinek - (None, komunikat).
+# histogram i udzial - okno adaptacyjne z histogramu serii zamiast stałego +/- dynamic_threshold
+def segmentuj_wycinek(image_array, seed, dynamic_threshold=300, histogram=None, udzial=None):
+    # Intensywność w punkcie początkowym (seed)
+    intensity = int(image_array[seed[1], seed[0]])
+
+    # Sprawdzamy, czy intensywność mieści się w zakresie globalnym
+    if intensity < GLOBAL_LOWER_THRESHOLD or intensity > GLOBAL_UPPER_THRESHOLD:
+        komunikat = (f"Intensywność {intensity} poza globalnym zakresem "
+                     f"{GLOBAL_LOWER_THRESHOLD}-{GLOBAL_UPPER_THRESHOLD}. Rozrost pominięty.")
+        return None, komunikat
+
+    # Zakres dynamiczny
+    if histogram is not None and udzial is not None:
+        dynamic_lower_threshold, dynamic_upper_threshold = histogram.proponuj_okno(intensity, udzial, dynamic_threshold)
+        dynamic_lower_threshold = max(0, dynamic_lower_threshold)
+    else:
+        dynamic_lower_threshold = max(0, intensity - dynamic_threshold)
+        dynamic_upper_threshold = intensity + dynamic_threshold
+
+    # Rozrost regionu w zakresie dynamicznym (filtr ITK na widoku tablicy)
+    itk = leniwe.itk()
+    ImageType2D = leniwe.typ_obrazu(2)
+    region_grow = itk.ConnectedThresholdImageFilter[ImageType2D, ImageType2D].New()
+    region_grow.SetInput(itk.GetImageViewFromArray(np.ascontiguousarray(image_array)))
+    region_grow.SetSeed(seed)
+    region_grow.SetLower(int(dynamic_lower_threshold))
+    region_grow.SetUpper(int(dynamic_upper_threshold))
+    with pomiary.etap("itk_update_2d", woksele=image_array.size):
+        region_grow.Update()
+
+    # Maska bool z widoku na wyjście filtra - bez kopii int16; filtr (i jego bufor)
+    # nie przeżywa tej funkcji, maska tak
+    with pomiary.etap("itk_maska_2d", bajty=image_array.size):
+        return itk.GetArrayViewFromImage(region_grow.GetOutput()) > 0, None
+
+# Wolumen z pliku mapowanego w pamięci: (plik, offset, dtype, shape) - procesy robocze
+# czytają wycinki same z pliku zamiast dostawać ich kopie; None dla tablic w pamięci
+def _zrodlo_na_dysku(wolumen):
+    dane = getattr(wolumen, "dane", wolumen)
+    # Tylko tablica całej mapy (nie widok), bo offset widoku nie odpowiada jego danym
+    if not isinstance(dane, np.memmap) or not isinstance(dane.base, mmap.mmap) or not dane.flags.c_contiguous:
+        return None
+    return dane.filename, dane.offset, dane.dtype.str, dane.shape
+
+# Mapa otwierana dla każdej paczki (tanie mmap) - pula żyje dłużej niż wolumen, a plik
+# pamięci wolumenu może zostać w tym czasie zbudowany od nowa
+def _mapa(zrodlo):
+    plik, offset, dtype, shape = zrodlo
+    return np.memmap(plik, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+# Procesy rozrostu startują z wątku zadań w tle, gdy działają wątek wczytujący, wyprzedzanie
+# i interfejs - fork skopiowałby ich zajęte blokady (zakleszczenie procesu potomnego), więc
+# forkserver (Unix) albo spawn. Procesy same otwierają plik wolumenu, fork nie jest potrzebny.
+# Serwer forkserver importuje rozgrzewka_itk - ITK ładowane raz, nie w każdym procesie
+def _kontekst_procesow():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    kontekst = multiprocessing.get_context("forkserver")
+    kontekst.set_forkserver_preload(["rozgrzewka_itk"])
+    return kontekst
+
+# ITK ładowane w procesie roboczym od razu po starcie, a nie przy pierwszej paczce
+def rozgrzej_itk():
+    itk = leniwe.itk()
+    ImageType2D = leniwe.typ_obrazu(2)
+    itk.ConnectedThresholdImageFilter[ImageType2D, ImageType2D].New()
+
+# Pula procesów rozrostu tworzona raz na program: nowy proces ładuje ITK (sekundy), więc
+# kolejne rozrosty korzystają z procesów już rozgrzanych
+_pula = None
+_blokada_puli = threading.Lock()
+
+def pula_procesow(workers=None):
+    global _pula
+    workers = workers or os.cpu_count() or 1
+    with _blokada_puli:
+        if _pula is None or _pula[0] != workers:
+            if _pula is not None:
+                _pula[1].shutdown(wait=False, cancel_futures=True)
+            _pula = (workers, ProcessPoolExecutor(max_workers=workers, mp_context=_kontekst_procesow(),
+                                                  initializer=rozgrzej_itk))
+        return _pula[1]
+
+# Proces puli zginął (np. brak pamięci) - pula jest zepsuta, następny rozrost tworzy nową
+def porzuc_pule():
+    global _pula
+    with _blokada_puli:
+        if _pula is not None:
+            _pula[1].shutdown(wait=False, cancel_futures=True)
+        _pula = None
+
+# Procesy puli uruchamiane i rozgrzewane w tle (np. po otwarciu przeglądarki), zanim
+# przyjdzie pierwszy rozrost; wynik - zadania kończące się po rozgrzaniu procesów
+def rozgrzej_procesy(workers=None):
+    pula = pula_procesow(workers)
+    return [pula.submit(int) for _ in range(workers or os.cpu_count() or 1)]
+
+# Wycinki paczki w procesie roboczym; maski wracają spakowane (mniej do przesłania).
+# wycinki - lista tablic albo (zrodlo, z0, z1) do odczytu z pliku wolumenu
+def _segmentuj_wycinki(wycinki, seed, dynamic_threshold, histogram=None, udzial=None):
+    if isinstance(wycinki, tuple):
+        zrodlo, z0, z1 = wycinki
+        wycinki = _mapa(zrodlo)[z0:z1]
+    wyniki = []
+    for image_array in wycinki:
+        maska, komunikat = segmentuj_wycinek(image_array, seed, dynamic_threshold, histogram, udzial)
+        wyniki.append((None if maska is None else spakuj(maska), komunikat))
+    return wyniki
+
+# Rozrost dynamiczny we wszystkich wycinkach; wycinki są niezależne, więc mogą być
+# przetwarzane równolegle: tryb "procesy", "watki" albo None (kolejno). Filtr ITK nie zwalnia
+# GIL, więc tylko "procesy" mogą liczyć równolegle. Pomiar (walec 200 x 512 x 512 w pliku, 4 procesy,
+# maszyna z 1 rdzeniem): kolejno 0.19 s, wątki 0.27 s, procesy z kopiami wycinków 0.75 s,
+# procesy rozgrzanej puli czytające plik 0.24 s - na jednym rdzeniu procesy nie przyspieszają;
+# zysk rośnie z liczbą rdzeni. Pierwsze uruchomienie puli ładuje ITK (rozgrzej_procesy).
+# Wynik: (MaskiWycinkow, komunikaty pominiętych wycinków) - każda maska pakowana zaraz po
+# rozroście, więc pełnej maski serii nie ma w pamięci. postep(zrobione, wszystkie) - wywoływany
+# przed każdym wycinkiem (paczką w trybie "procesy"); wyjątek z postep przerywa pozostałe wycinki
+@pomiary.mierzony("rozrost_dynamiczny")
+def rozrost_dynamiczny(wolumen, seed, dynamic_threshold=300, tryb="procesy", workers=None, histogram=None, udzial=None,
+                       postep=None):
+    wycinek = getattr(wolumen, "wycinek", None) or wolumen.__getitem__
+    # Przetworzone wycinki WolumenSerii nie zostają w pamięci procesu
+    zwolnij = getattr(wolumen, "zwolnij", None) or (lambda z0, z1: None)
+    liczba = len(wolumen)
+    workers = workers or os.cpu_count() or 1
+    maski = MaskiWycinkow(wolumen.shape)
+    komunikaty = []
+
+    def krok(z):
+        if postep is not None:
+            postep(z, liczba)
+        wynik = segmentuj_wycinek(wycinek(z), seed, dynamic_threshold, histogram, udzial)
+        zwolnij(z, z + 1)
+        return wynik
+
+    def zapisz(z, wynik):
+        maska, komunikat = wynik
+        maski[z] = maska
+        if komunikat:
+            komunikaty.append(komunikat)
+
+    if tryb is None or workers <= 1:
+        for z in range(liczba):
+            zapisz(z, krok(z))
+        return maski, komunikaty
+
+    if tryb == "procesy":
+        # Wolumen na dysku: procesy czytają paczki wycinków z tego samego pliku (wycinek(z)
+        # tylko czeka na ich zdekodowanie); tablica w pamięci - paczki to kopie wycinków.
+        # Wyniki wracają w kolejności paczek
+        zrodlo = _zrodlo_na_dysku(wolumen)
+        paczka = max(1, liczba // (workers * 4))
+        executor = pula_procesow(workers)
+        zadania = []
+        z = 0
+        try:
+            for start in range(0, liczba, paczka):
+                stop = min(start + paczka, liczba)
+                wycinki = [wycinek(i) for i in range(start, stop)]
+                if zrodlo is not None:
+                    wycinki = (zrodlo, start, stop)
+                else:
+                    wycinki = [np.asarray(w) for w in wycinki]
+                zadania.append(executor.submit(_segmentuj_wycinki, wycinki, seed, dynamic_threshold, histogram, udzial))
+            for zadanie in zadania:
+                if postep is not None:
+                    postep(z, liczba)
+                for wpis, komunikat in zadanie.result():
+                    maski.wpisy[z] = wpis
+                    if komunikat:
+                        komunikaty.append(komunikat)
+                    z += 1
+        except BrokenProcessPool:
+            porzuc_pule()
+            raise
+        finally:
+            # Przerwany rozrost (postep) - paczki, które jeszcze nie ruszyły, nie zajmują puli
+            for zadanie in zadania:
+                zadanie.cancel()
+            zwolnij(0, liczba)
+        return maski, komunikaty
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for z, wynik in enumerate(executor.map(krok, range(liczba))):
+            zapisz(z, wynik)
+        return maski, komunikaty
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
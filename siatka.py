@@ -0,0 +1,276 @@
+import os
+import time
+import numpy as np
+import vtk
+from konwersja_vtk import numpy_do_vtk, ramka_maski, origin_ramki
+from plastry import BUDZET_PAMIECI, miesci_sie, plastry
+import pomiary
+
+# Powyżej tej liczby wokseli maski siatka jest budowana z maski zmniejszonej (podgląd)
+MAKS_WOKSELI = 20_000_000
+# Pamięć powierzchni plastrami na woksel plastra: odczyt, maska 0/1 i bufory Flying Edges
+BAJTY_SIATKI = 4
+
+# Zmniejszenie maski o całkowity krok w każdej osi (woksel wynikowy = "any" z bloku)
+def zmniejsz_maske(mask, krok):
+    shape = tuple(-(-n // krok) * krok for n in mask.shape)
+    if shape != mask.shape:
+        padded = np.zeros(shape, dtype=np.bool_)
+        padded[:mask.shape[0], :mask.shape[1], :mask.shape[2]] = mask
+        mask = padded
+    z, y, x = (n // krok for n in shape)
+    return mask.reshape(z, krok, y, krok, x, krok).any(axis=(1, 3, 5))
+
+# Ramka maski dla siatki ze zmniejszeniem o krok: powiększona o krok z każdej strony (pusty
+# blok wokół maski domyka powierzchnię) i wyrównana do bloków krok x krok x krok liczonych
+# od początku wolumenu. Może wychodzić poza wolumen - tam maska jest pusta
+def ramka_krok(ramka, krok=1):
+    wynik = []
+    for poczatek, koniec in zip(ramka[::2], ramka[1::2]):
+        wynik += [(poczatek - krok) // krok * krok, -(-(koniec + krok) // krok) * krok]
+    return tuple(wynik)
+
+# Ramka ograniczona do wolumenu i szerokości zer (przed, po) w każdej osi
+def _w_wolumenie(ramka, shape):
+    przyciete = []
+    for poczatek, koniec, n in zip(ramka[::2], ramka[1::2], shape):
+        przyciete += [min(max(poczatek, 0), n), max(min(koniec, n), 0)]
+    zera = [(p - r, k - p_k) for r, k, p, p_k in zip(ramka[::2], ramka[1::2], przyciete[::2], przyciete[1::2])]
+    return przyciete, zera
+
+# Fragment tablicy w ramce; część ramki poza tablicą wypełniona zerami
+def wytnij(tablica, ramka):
+    (z0, z1, y0, y1, x0, x1), zera = _w_wolumenie(ramka, tablica.shape)
+    czesc = tablica[z0:z1, y0:y1, x0:x1]
+    return np.pad(czesc, zera) if any(any(para) for para in zera) else czesc
+
+# Plaster w ramce (z0, z1, y0, y1, x0, x1); zrodlo - WolumenSerii (czeka na wycinki), tablica
+# (Z, Y, X) albo lista wycinków 2D. Część ramki poza wolumenem wypełniona zerami
+def _plaster(zrodlo, shape, ramka):
+    (za, zb, y0, y1, x0, x1), zera = _w_wolumenie(ramka, shape)
+    if za >= zb:
+        return np.zeros([k - p for p, k in zip(ramka[::2], ramka[1::2])], dtype=np.bool_)
+    if hasattr(zrodlo, "podwolumen"):
+        czesc = zrodlo.podwolumen(za, zb)[:, y0:y1, x0:x1]
+    elif isinstance(zrodlo, np.ndarray):
+        czesc = zrodlo[za:zb, y0:y1, x0:x1]
+    else:
+        czesc = np.stack([np.asarray(wycinek)[y0:y1, x0:x1] for wycinek in zrodlo[za:zb]])
+    return np.pad(czesc, zera) if any(any(para) for para in zera) else czesc
+
+# Izopowierzchnia liczona plastrami wzdłuż Z: w pamięci jest jeden plaster z zakładką
+# (komórki między ostatnim wycinkiem plastra a pierwszym następnego) i siatka wynikowa.
+# Punkty wspólnych płaszczyzn plastrów są łączone, normalne liczone dla całej siatki.
+# maska=True - zrodlo jako maska (wartości > 0, izopowierzchnia 0.5), ramka maski powiększona
+# o krok i każdy plaster przycięty do swojej ramki (też z pustym blokiem wokół) - siatka jest
+# zamknięta; krok - zmniejszenie maski jak w siatka_z_maski; ramka - zakres całości
+def izopowierzchnia_plastrami(zrodlo, iso, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0), budzet=BUDZET_PAMIECI, maska=False,
+                              krok=1, ramka=None):
+    shape = tuple(getattr(zrodlo, "shape", None) or (len(zrodlo),) + np.shape(zrodlo[0]))
+    ramka = ramka or (0, shape[0], 0, shape[1], 0, shape[2])
+    if maska:
+        ramka = ramka_krok(ramka, krok)
+    z0, z1, y0, y1, x0, x1 = ramka
+    spacing_siatki = tuple(s * krok for s in spacing)
+
+    append = vtk.vtkAppendPolyData()
+    for a, b, _, h1 in plastry((z1 - z0, y1 - y0, x1 - x0), BAJTY_SIATKI, budzet, halo=krok, wielokrotnosc=krok):
+        # Zakładka tylko w górę - komórki poniżej z0 + a należą do poprzedniego plastra
+        # (po zmniejszeniu: jeden wspólny wycinek bloków, bo a i h1 - a są wielokrotnościami krok)
+        ramka_plastra = (z0 + a, z0 + h1, y0, y1, x0, x1)
+        with pomiary.etap("odczyt_plastra") as pomiar:
+            plaster = _plaster(zrodlo, shape, ramka_plastra)
+            pomiar.dodaj(bajty=plaster.nbytes)
+        if maska:
+            plaster = plaster > 0
+            przyciecie = ramka_maski(plaster)
+            if przyciecie is None:
+                continue
+            # Bez przycinania w Z - plastry muszą się stykać; w Y/X pusty blok wokół maski,
+            # bloki zmniejszenia w tej samej siatce we wszystkich plastrach (y0, x0 wyrównane)
+            _, _, py0, py1, px0, px1 = ramka_krok(przyciecie, krok)
+            plaster = wytnij(plaster, (0, plaster.shape[0], py0, py1, px0, px1))
+            ramka_plastra = (z0 + a, z0 + h1, y0 + py0, y0 + py1, x0 + px0, x0 + px1)
+            if krok > 1:
+                plaster = zmniejsz_maske(plaster, krok)
+        # Ostatni wycinek serii bez zakładki nie ma już komórek
+        if min(plaster.shape) < 2:
+            continue
+        origin_plastra = origin_ramki(ramka_plastra, spacing, origin)
+        if krok > 1:
+            origin_plastra = tuple(o + (krok - 1) / 2.0 * s for o, s in zip(origin_plastra, spacing))
+
+        with pomiary.etap("flying_edges_plastra", woksele=plaster.size) as pomiar:
+            surface_extractor = vtk.vtkFlyingEdges3D()
+            surface_extractor.SetInputData(numpy_do_vtk(plaster, spacing_siatki, origin_plastra))
+            surface_extractor.SetValue(0, 0.5 if maska else iso)
+            surface_extractor.ComputeNormalsOff()
+            surface_extractor.Update()
+            czesc = vtk.vtkPolyData()
+            czesc.ShallowCopy(surface_extractor.GetOutput())
+            pomiar.dodaj(trojkaty=czesc.GetNumberOfPolys())
+        if czesc.GetNumberOfPolys():
+            append.AddInputData(czesc)
+
+    if append.GetNumberOfInputConnections(0) == 0:
+        return vtk.vtkPolyData()
+    # Punkty wspólnej płaszczyzny sąsiednich plastrów mają identyczne współrzędne
+    clean = vtk.vtkCleanPolyData()
+    clean.SetInputConnection(append.GetOutputPort())
+    normals = vtk.vtkPolyDataNormals()
+    normals.SetInputConnection(clean.GetOutputPort())
+    normals.SplittingOff()
+    with pomiary.etap("laczenie_plastrow"):
+        normals.Update()
+    return normals.GetOutput()
+
+# Powierzchnia (izopowierzchnia 0.5) maski bool (Z, Y, X) w układzie pacjenta. Powierzchnia
+# jest liczona tylko w ramce maski (z marginesem); ramka - gotowa ramka (np. z sesji rozrostu).
+# budzet - ramka większa niż budżet pamięci jest przetwarzana plastrami
+def siatka_z_maski(mask, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0), decymacja=0.0, maks_wokseli=MAKS_WOKSELI,
+                   ramka=None, budzet=None):
+    ramka = ramka or ramka_maski(mask)
+    if ramka is None:
+        return vtk.vtkPolyData()
+    z0, z1, y0, y1, x0, x1 = ramka
+
+    krok = 1
+    liczba_wokseli = int(np.count_nonzero(mask[z0:z1, y0:y1, x0:x1]))
+    if liczba_wokseli > maks_wokseli:
+        krok = int(np.ceil((liczba_wokseli / maks_wokseli) ** (1.0 / 3.0)))
+        print(f"Maska ma {liczba_wokseli} wokseli - podgląd ze zmniejszeniem {krok}x")
+
+    # Ramka z pustym blokiem wokół maski, wyrównana do bloków zmniejszenia - siatka zamknięta
+    ramka_siatki = ramka_krok(ramka, krok)
+    shape = tuple(k - p for p, k in zip(ramka_siatki[::2], ramka_siatki[1::2]))
+    if budzet is not None and not miesci_sie(shape, BAJTY_SIATKI, budzet):
+        surface = izopowierzchnia_plastrami(mask, 0.5, spacing, origin, budzet, maska=True, krok=krok, ramka=ramka)
+    else:
+        mask = wytnij(mask, ramka_siatki)
+        origin = origin_ramki(ramka_siatki, spacing, origin)
+        if krok > 1:
+            mask = zmniejsz_maske(mask, krok)
+            # Środek bloku krok x krok x krok jako nowe położenie woksela
+            origin = tuple(o + (krok - 1) / 2.0 * s for o, s in zip(origin, spacing))
+            spacing = tuple(s * krok for s in spacing)
+        image = numpy_do_vtk(np.asarray(mask, dtype=np.bool_), spacing, origin)
+
+        with pomiary.etap("flying_edges_maski", woksele=mask.size) as pomiar:
+            surface_extractor = vtk.vtkFlyingEdges3D()
+            surface_extractor.SetInputData(image)
+            surface_extractor.SetValue(0, 0.5)
+            surface_extractor.ComputeNormalsOn()
+            surface_extractor.Update()
+            surface = surface_extractor.GetOutput()
+            pomiar.dodaj(trojkaty=surface.GetNumberOfPolys())
+
+    if decymacja > 0 and surface.GetNumberOfPolys() > 0:
+        decimate = vtk.vtkQuadricDecimation()
+        decimate.SetInputData(surface)
+        decimate.SetTargetReduction(decymacja)
+        with pomiary.etap("decymacja_maski", trojkaty=surface.GetNumberOfPolys()):
+            decimate.Update()
+
+        normals = vtk.vtkPolyDataNormals()
+        normals.SetInputConnection(decimate.GetOutputPort())
+        normals.Update()
+        surface = normals.GetOutput()
+
+    return surface
+
+# Powierzchnia ciała (izopowierzchnia iso całego wolumenu): liczona raz dla (serii, iso,
+# decymacji, wygładzania) i zapisywana jako .vtp obok pamięci wolumenu; kolejne wizualizacje
+# tylko wczytują gotową, zmniejszoną siatkę. decymacja - część usuwanych trójkątów (grupowanie
+# wierzchołków w komórkach, koszt liniowy), wygladzanie - liczba iteracji filtra windowed sinc.
+# budzet - seria większa niż budżet pamięci jest przetwarzana plastrami
+@pomiary.mierzony("siatka_ciala")
+def siatka_ciala(wolumen, iso=500, decymacja=0.9, wygladzanie=15, budzet=None):
+    sciezka = f"{wolumen.baza}.cialo_iso{iso:g}_d{decymacja:g}_w{wygladzanie}.vtp"
+    start = time.perf_counter()
+
+    if os.path.exists(sciezka):
+        reader = vtk.vtkXMLPolyDataReader()
+        reader.SetFileName(sciezka)
+        reader.Update()
+        surface = reader.GetOutput()
+        print(f"Siatka ciała z pamięci: {surface.GetNumberOfPolys()} trójkątów, "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return surface
+
+    if budzet is not None and not miesci_sie(wolumen.shape, BAJTY_SIATKI, budzet):
+        surface = izopowierzchnia_plastrami(wolumen, iso, wolumen.spacing, wolumen.origin, budzet)
+    else:
+        surface_extractor = vtk.vtkFlyingEdges3D()
+        surface_extractor.SetInputData(numpy_do_vtk(wolumen.wolumen(), wolumen.spacing, wolumen.origin))
+        surface_extractor.SetValue(0, iso)
+        surface_extractor.ComputeNormalsOff()
+        with pomiary.etap("flying_edges_ciala", woksele=wolumen.dane.size):
+            surface_extractor.Update()
+        surface = surface_extractor.GetOutput()
+    liczba_przed = surface.GetNumberOfPolys()
+
+    if decymacja > 0 and liczba_przed > 0:
+        # Bok komórki ~ sqrt(1 / (1 - decymacja)) wokseli daje ~ (1 - decymacja) trójkątów
+        bok = (1.0 / max(1.0 - decymacja, 1e-3)) ** 0.5
+        bounds = surface.GetBounds()
+        clustering = vtk.vtkQuadricClustering()
+        clustering.SetInputData(surface)
+        clustering.AutoAdjustNumberOfDivisionsOff()
+        clustering.SetDivisionOrigin(bounds[0], bounds[2], bounds[4])
+        clustering.SetDivisionSpacing(*(bok * s for s in wolumen.spacing))
+        clustering.Update()
+        surface = clustering.GetOutput()
+
+    if wygladzanie > 0 and surface.GetNumberOfPolys() > 0:
+        smoother = vtk.vtkWindowedSincPolyDataFilter()
+        smoother.SetInputData(surface)
+        smoother.SetNumberOfIterations(wygladzanie)
+        smoother.SetPassBand(0.1)
+        smoother.NormalizeCoordinatesOn()
+        smoother.BoundarySmoothingOff()
+        smoother.FeatureEdgeSmoothingOff()
+        smoother.Update()
+        surface = smoother.GetOutput()
+
+    normals = vtk.vtkPolyDataNormals()
+    normals.SetInputData(surface)
+    normals.SplittingOff()
+    normals.Update()
+    surface = normals.GetOutput()
+
+    # Zapis do pliku tymczasowego i zamiana - przerwany zapis nie zostawi uszkodzonej siatki
+    writer = vtk.vtkXMLPolyDataWriter()
+    writer.SetFileName(sciezka + ".tmp")
+    writer.SetInputData(surface)
+    writer.Write()
+    os.replace(sciezka + ".tmp", sciezka)
+
+    print(f"Siatka ciała: {liczba_przed} -> {surface.GetNumberOfPolys()} trójkątów, "
+          f"{time.perf_counter() - start:.2f} s (zapisana w {sciezka})")
+    return surface
+
+# Okno VTK z jedną siatką
+def pokaz_siatke(surface, tytul="Segmentacja 3D", kolor=(1.0, 0.0, 0.0)):
+    mapper = vtk.vtkPolyDataMapper()
+    mapper.SetInputData(surface)
+    mapper.ScalarVisibilityOff()
+
+    actor = vtk.vtkActor()
+    actor.SetMapper(mapper)
+    actor.GetProperty().SetColor(kolor)
+
+    renderer = vtk.vtkRenderer()
+    renderer.AddActor(actor)
+    renderer.SetBackground(0.1, 0.1, 0.1)  # Ciemnoszare tło
+
+    render_window = vtk.vtkRenderWindow()
+    render_window.AddRenderer(renderer)
+    render_window.SetSize(800, 800)
+    render_window.SetWindowName(tytul)
+
+    render_interactor = vtk.vtkRenderWindowInteractor()
+    render_interactor.SetRenderWindow(render_window)
+
+    renderer.ResetCamera()
+    render_window.Render()
+    render_interactor.Start()
@@ -0,0 +1,56 @@
+import os
+import argparse
+import pydicom
+import odkrywanie
+import opcje
+from benchmark import zapisz_fantom_dicom
+from wolumen import geometria
+
+# Dwa rozmiary obrazu pod jednym UID (np. lokalizator w serii) to dwie serie, jak w GDCM
+def test_rozne_rozmiary_pod_jednym_uid_to_osobne_serie(tmp_path):
+    pliki_64, _, _ = zapisz_fantom_dicom(str(tmp_path / "a"), 3, 64, pacjent="Test^Seria")
+    pliki_32, _, _ = zapisz_fantom_dicom(str(tmp_path / "b"), 2, 32, pacjent="Test^Seria")
+    uid = pydicom.dcmread(pliki_64[0]).SeriesInstanceUID
+    for sciezka in pliki_32:
+        ds = pydicom.dcmread(sciezka)
+        ds.SeriesInstanceUID = uid
+        ds.save_as(sciezka)
+
+    patients, series_descriptions = {}, {}
+    odkrywanie.skanuj(str(tmp_path), patients, series_descriptions, katalog_path=False, procesy=1)
+
+    serie = patients["Test^Seria"]
+    assert len(serie) == 2
+    assert sorted(len(pliki) for pliki in serie.values()) == [2, 3]
+    assert {odkrywanie.uid_serii(klucz) for klucz in serie} == {uid}
+    for pliki in serie.values():
+        assert len({pydicom.dcmread(p).Rows for p in pliki}) == 1
+
+# Katalog zapisany przez starszą wersję (user_version 0) jest budowany od nowa
+def test_katalog_starszej_wersji_budowany_od_nowa(tmp_path):
+    zapisz_fantom_dicom(str(tmp_path / "a"), 2, 32, pacjent="Test^Katalog")
+    sciezka = str(tmp_path / "katalog.sqlite")
+    katalog = odkrywanie.KatalogSerii(sciezka)
+    katalog.polaczenie.execute("PRAGMA user_version = 0")
+    katalog.zamknij()
+
+    patients, series_descriptions = {}, {}
+    odkrywanie.skanuj(str(tmp_path), patients, series_descriptions, katalog_path=sciezka, procesy=1)
+    assert all("|" in klucz for klucz in patients["Test^Katalog"])
+
+# Pliki IM1, IM10, IM11, IM2... - wybrana seria w kolejności wycinków, nie nazw plików;
+# odstęp i origin z dwóch pierwszych wycinków
+def test_wybrana_seria_w_kolejnosci_wycinkow(tmp_path, monkeypatch):
+    pliki, _, _ = zapisz_fantom_dicom(str(tmp_path / "a"), 11, 16, pacjent="Test^Kolejnosc", grubosc=2.5)
+    for z, sciezka in enumerate(pliki):
+        os.rename(sciezka, str(tmp_path / "a" / f"IM{z + 1}.dcm"))
+    monkeypatch.setattr("builtins.input", lambda tekst="": "1")
+    args = argparse.Namespace(dicom_directory=str(tmp_path), katalog=None, procesy=1, slad=None)
+
+    _, wybrane = opcje.wybierz_serie(args)
+
+    assert [os.path.basename(p) for p in wybrane] == [f"IM{z + 1}.dcm" for z in range(11)]
+    shape, spacing, origin = geometria(wybrane)
+    assert shape == (11, 16, 16)
+    assert spacing[2] == 2.5
+    assert origin[2] == 0.0
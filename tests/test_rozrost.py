@@ -0,0 +1,129 @@
+from collections import deque
+import numpy as np
+from rozrost import SesjaRozrostu, RozrostPlastrami, rozrost_etykiet, BAJTY_PLASTRA
+
+# Wzorzec: rozrost wszerz od zera (sąsiedztwo ścianami, jak ConnectedThresholdImageFilter);
+# seed w kolejności ITK
+def rozrost_wzorcowy(volume, seed, lower, upper):
+    w_zakresie = (volume >= lower) & (volume <= upper)
+    maska = np.zeros(volume.shape, dtype=np.bool_)
+    start = tuple(reversed(seed))
+    if not w_zakresie[start]:
+        return maska
+    maska[start] = True
+    kolejka = deque([start])
+    while kolejka:
+        punkt = kolejka.popleft()
+        for osi in range(volume.ndim):
+            for przesuniecie in (-1, 1):
+                sasiad = list(punkt)
+                sasiad[osi] += przesuniecie
+                sasiad = tuple(sasiad)
+                if 0 <= sasiad[osi] < volume.shape[osi] and w_zakresie[sasiad] and not maska[sasiad]:
+                    maska[sasiad] = True
+                    kolejka.append(sasiad)
+    return maska
+
+def ramka_maski(maska):
+    if not maska.any():
+        return None
+    ramka = ()
+    for osi in range(maska.ndim):
+        wspolrzedne = np.flatnonzero(maska.any(axis=tuple(i for i in range(maska.ndim) if i != osi)))
+        ramka += (int(wspolrzedne[0]), int(wspolrzedne[-1]) + 1)
+    return ramka
+
+# Szum blisko progu perkolacji - regiony o poszarpanych brzegach, wielokrotnie przechodzące
+# przez granice plastrów
+def wolumen_losowy(shape, ziarno):
+    return np.random.default_rng(ziarno).integers(0, 100, shape).astype(np.int16)
+
+# Poszerzanie, zawężanie po poszerzeniu, przesunięcie zakresu, zakres rozłączny, punkt
+# startowy poza zakresem i drobne kroki (woksele granicy czekają na zakres przez kilka zmian)
+PROGI = [(40, 60), (30, 70), (30, 85), (45, 85), (45, 65), (50, 90), (35, 95), (0, 10), (20, 80),
+         (60, 70), (10, 90), (56, 56), (20, 75), (52, 58), (51, 60), (50, 61), (48, 63), (47, 64),
+         (45, 66), (44, 68), (42, 70), (40, 72)]
+
+def test_sesja_rozrostu_jak_rozrost_od_nowa():
+    for shape, seed in (((10, 18, 20), (7, 9, 5)), ((40, 45), (20, 13))):
+        volume = wolumen_losowy(shape, 3)
+        volume[tuple(reversed(seed))] = 56
+        sesja = SesjaRozrostu(volume, seed)
+        poprzednia = np.zeros(shape, dtype=np.bool_)
+        poprzednie_progi = None
+        for lower, upper in PROGI:
+            maska = sesja.ustaw_progi(lower, upper).copy()
+            wzorzec = rozrost_wzorcowy(volume, seed, lower, upper)
+            assert np.array_equal(maska, wzorzec), (shape, lower, upper)
+            assert sesja.liczba_wokseli() == wzorzec.sum()
+            if volume.ndim == 3:
+                assert sesja.ramka() == ramka_maski(wzorzec)
+            # Samo poszerzenie albo samo zawężenie zmienia dokładnie różnicę masek; przesunięcie
+            # zakresu liczy też woksele usunięte przy zawężeniu i dodane z powrotem
+            zmienione = np.count_nonzero(maska ^ poprzednia)
+            if poprzednie_progi is None or (lower <= poprzednie_progi[0]) == (upper >= poprzednie_progi[1]):
+                assert sesja.ostatnio_zmienione == zmienione, (shape, lower, upper)
+            else:
+                assert sesja.ostatnio_zmienione >= zmienione
+            poprzednia, poprzednie_progi = maska, (lower, upper)
+
+def test_rozrost_plastrami_jak_rozrost_od_nowa(tmp_path):
+    shape = (12, 16, 16)
+    volume = wolumen_losowy(shape, 5)
+    # Plastry po 3 wycinki: granice między wycinkami 2|3, 5|6 i 8|9
+    budzet = 3 * shape[1] * shape[2] * BAJTY_PLASTRA
+    for seed in ((8, 8, 3), (8, 8, 5), (0, 15, 11)):
+        volume[tuple(reversed(seed))] = 56
+        rozrost = RozrostPlastrami(volume, seed, budzet=budzet, katalog=str(tmp_path))
+        assert len(rozrost.plastry) == 4
+        for lower, upper in PROGI:
+            maska = np.array(rozrost.ustaw_progi(lower, upper))
+            wzorzec = rozrost_wzorcowy(volume, seed, lower, upper)
+            assert np.array_equal(maska, wzorzec), (seed, lower, upper)
+            assert rozrost.liczba_wokseli() == wzorzec.sum()
+            assert rozrost.ramka() == ramka_maski(wzorzec)
+
+# Rozłączne regiony (ściana poza zakresami obu punktów) - etykiety dokładnie jak osobne rozrosty
+def test_rozrost_etykiet_rozlaczne_regiony():
+    volume = wolumen_losowy((10, 16, 24), 7)
+    volume[:, :, 12] = 500
+    punkty = [((4, 8, 5), 30, 80), ((18, 3, 2), 20, 60), ((20, 10, 7), 300, 400)]
+    for seed, _, _ in punkty[:2]:
+        volume[tuple(reversed(seed))] = 50
+    etykiety = rozrost_etykiet(volume, punkty)
+    assert etykiety.dtype == np.uint8
+    oczekiwane = np.zeros(volume.shape, dtype=np.uint8)
+    for etykieta, (seed, lower, upper) in enumerate(punkty, start=1):
+        oczekiwane[rozrost_wzorcowy(volume, seed, lower, upper)] = etykieta
+    # Trzeci punkt poza swoim zakresem - brak etykiety 3
+    assert not (oczekiwane == 3).any()
+    assert np.array_equal(etykiety, oczekiwane)
+
+# Regiony nachodzące na siebie przy wspólnym zakresie: suma etykiet jak suma osobnych rozrostów,
+# każdy woksel z etykietą leży w regionie swojego punktu, punkty startowe mają własne etykiety
+def test_rozrost_etykiet_wspolne_woksele():
+    volume = wolumen_losowy((10, 16, 24), 9)
+    for progi in ((30, 80), (40, 95)):
+        punkty = [((2, 2, 2),) + progi, ((20, 12, 7),) + progi, ((12, 8, 5),) + progi]
+        for seed, _, _ in punkty:
+            volume[tuple(reversed(seed))] = 50
+        etykiety = rozrost_etykiet(volume, punkty)
+        wzorce = [rozrost_wzorcowy(volume, seed, lower, upper) for seed, lower, upper in punkty]
+        assert np.array_equal(etykiety > 0, np.logical_or.reduce(wzorce))
+        for etykieta, (wzorzec, (seed, _, _)) in enumerate(zip(wzorce, punkty), start=1):
+            assert wzorzec[etykiety == etykieta].all()
+            assert etykiety[tuple(reversed(seed))] == etykieta
+
+# Różne zakresy punktów: woksel zajęty przez jedną etykietę zatrzymuje pozostałe, więc każda
+# etykieta jest tylko częścią regionu swojego punktu
+def test_rozrost_etykiet_rozne_zakresy():
+    volume = wolumen_losowy((10, 16, 24), 9)
+    punkty = [((2, 2, 2), 30, 80), ((20, 12, 7), 20, 70), ((12, 8, 5), 40, 95)]
+    for seed, _, _ in punkty:
+        volume[tuple(reversed(seed))] = 50
+    etykiety = rozrost_etykiet(volume, punkty)
+    wzorce = [rozrost_wzorcowy(volume, seed, lower, upper) for seed, lower, upper in punkty]
+    for etykieta, (wzorzec, (seed, _, _)) in enumerate(zip(wzorce, punkty), start=1):
+        assert wzorzec[etykiety == etykieta].all()
+        assert etykiety[tuple(reversed(seed))] == etykieta
+    assert not (etykiety > 0)[~np.logical_or.reduce(wzorce)].any()
@@ -0,0 +1,47 @@
+import numpy as np
+import vtk
+from maski import MaskiWycinkow
+from siatka import siatka_z_maski, izopowierzchnia_plastrami
+
+def krawedzie_brzegowe(surface):
+    krawedzie = vtk.vtkFeatureEdges()
+    krawedzie.SetInputData(surface)
+    krawedzie.BoundaryEdgesOn()
+    krawedzie.FeatureEdgesOff()
+    krawedzie.NonManifoldEdgesOff()
+    krawedzie.ManifoldEdgesOff()
+    krawedzie.Update()
+    return krawedzie.GetOutput().GetNumberOfCells()
+
+# Walec o nieparzystych wymiarach, dotykający brzegu wolumenu w Z i X
+def maska_walca():
+    mask = np.zeros((37, 41, 43), dtype=np.bool_)
+    yy, xx = np.ogrid[:41, :43]
+    mask[:, (yy - 20) ** 2 + (xx - 25) ** 2 < 13 ** 2] = True
+    mask[:, 15:25, 30:] = True
+    return mask
+
+# Podgląd ze zmniejszeniem (krok 3) - pusty blok wokół maski domyka powierzchnię
+def test_podglad_maski_jest_zamkniety():
+    mask = maska_walca()
+    surface = siatka_z_maski(mask, maks_wokseli=int(mask.sum()) // 20)
+    assert surface.GetNumberOfPolys() > 0
+    assert krawedzie_brzegowe(surface) == 0
+
+def test_siatka_plastrami_jest_zamknieta():
+    mask = maska_walca()
+    for maks_wokseli in (mask.size, int(mask.sum()) // 20):
+        surface = siatka_z_maski(mask, maks_wokseli=maks_wokseli, budzet=4 * 45 * 48 * 4)
+        assert surface.GetNumberOfPolys() > 0
+        assert krawedzie_brzegowe(surface) == 0
+
+# Maski spakowane (rozrost wycinek po wycinku) plastrami, bez ramki - cały wolumen
+def test_izopowierzchnia_plastrami_maski_wycinkow_jest_zamknieta():
+    mask = maska_walca()
+    maski = MaskiWycinkow(mask.shape)
+    for z in range(len(mask)):
+        maski[z] = mask[z]
+    for krok in (1, 2):
+        surface = izopowierzchnia_plastrami(maski, 0.5, budzet=5 * 41 * 43 * 4, maska=True, krok=krok)
+        assert surface.GetNumberOfPolys() > 0
+        assert krawedzie_brzegowe(surface) == 0
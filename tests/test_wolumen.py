@@ -0,0 +1,26 @@
+import os
+import numpy as np
+import pydicom
+from benchmark import zapisz_fantom_dicom
+from wolumen import WolumenSerii
+
+# Pamięć wolumenu jest używana ponownie dla tych samych plików, a budowana od nowa, gdy plik
+# został nadpisany pod tą samą nazwą
+def test_pamiec_wolumenu_po_nadpisaniu_pliku(tmp_path):
+    pliki, volume, _ = zapisz_fantom_dicom(str(tmp_path / "dane"), 3, 16, pacjent="Test^Wolumen")
+    katalog = str(tmp_path / "pamiec")
+    assert np.array_equal(WolumenSerii("seria", pliki, katalog).wolumen(), volume)
+
+    ponownie = WolumenSerii("seria", pliki, katalog)
+    assert ponownie.stan.all()
+
+    ds = pydicom.dcmread(pliki[1])
+    ds.PixelData = np.full((16, 16), 2000, dtype=np.int16).tobytes()
+    ds.save_as(pliki[1])
+    stat = os.stat(pliki[1])
+    os.utime(pliki[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    po_zmianie = WolumenSerii("seria", pliki, katalog)
+    assert not po_zmianie.stan.any()
+    assert (po_zmianie.wolumen()[1] == 2000 - 1024).all()
+    assert np.array_equal(po_zmianie.wolumen()[0], volume[0])
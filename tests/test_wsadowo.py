@@ -0,0 +1,19 @@
+import wsadowo
+from benchmark import zapisz_fantom_dicom
+
+def zadanie(i, seed):
+    return {"id": i, "series_uid": "fantom", "seed": seed, "lower": None, "upper": None}
+
+# Punkt spoza wolumenu (także ujemny, który numpy zawinąłby na drugi koniec) to błąd zadania
+def test_punkt_poza_wolumenem_to_blad(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    pliki, _, srodki = zapisz_fantom_dicom(str(tmp_path / "dane"), 4, 32, pacjent="Test^Wsadowo")
+    z, y, x = srodki[0]
+    zadania = [zadanie(0, (x, y, z)), zadanie(1, (-1, 5, 2)), zadanie(2, (5, 32, 2)), zadanie(3, (5, 5, 4))]
+
+    wyniki = wsadowo.segmentuj_serie("fantom", pliki, zadania, str(tmp_path))
+
+    assert wyniki[0]["status"] == "ok" and wyniki[0]["voxels"] > 0
+    for wynik in wyniki[1:]:
+        assert wynik["status"] == "error"
+        assert "poza wolumenem" in wynik["error"]
@@ -0,0 +1,60 @@
+import gzip
+import numpy as np
+from maski import MaskiWycinkow
+from zapis_masek import zapisz_maski, wczytaj_maski_npz
+
+# Z*Y*X = 455 i X = 13 niepodzielne przez 8; puste wycinki, ramki od x0 % 8 != 0 (bajt ramki
+# dzielony na dwa bajty wiersza albo obcięty na końcu wiersza) i pojedynczy woksel
+def maska_testowa():
+    rng = np.random.default_rng(7)
+    mask = np.zeros((5, 7, 13), dtype=np.bool_)
+    mask[1, 2:6, 3:] = rng.random((4, 10)) < 0.6
+    mask[1, 2, 3] = mask[1, 5, 12] = True
+    mask[3] = True
+    mask[4, 0:2, 5:11] = True
+    mask[4, 6, 12] = True
+    return mask
+
+def maski_wycinkow(mask):
+    maski = MaskiWycinkow(mask.shape)
+    for z in range(len(mask)):
+        maski[z] = mask[z]
+    return maski
+
+# Odczyt NRRD zapisanego przez zapisz_nrrd_uint8: nagłówek do pustej linii, potem gzip
+def wczytaj_nrrd(sciezka):
+    with open(sciezka, "rb") as f:
+        dane = f.read()
+    naglowek, _, skompresowane = dane.partition(b"\n\n")
+    pola = dict(linia.split(": ", 1) for linia in naglowek.decode("ascii").splitlines()[1:])
+    cols, rows, liczba = (int(n) for n in pola["sizes"].split())
+    return np.frombuffer(gzip.decompress(skompresowane), dtype=np.uint8).reshape(liczba, rows, cols), pola
+
+def test_maski_wycinkow_npz(tmp_path):
+    mask = maska_testowa()
+    sciezka = zapisz_maski(str(tmp_path), maski_wycinkow(mask), (0.5, 0.5, 2.5), (1.0, 2.0, 3.0))
+    wczytana, spacing, origin = wczytaj_maski_npz(sciezka)
+    assert wczytana.shape == mask.shape
+    assert np.array_equal(wczytana, mask)
+    assert spacing == (0.5, 0.5, 2.5) and origin == (1.0, 2.0, 3.0)
+
+def test_maski_wycinkow_nrrd(tmp_path):
+    mask = maska_testowa()
+    sciezka = zapisz_maski(str(tmp_path), maski_wycinkow(mask), (0.5, 0.5, 2.5), (1.0, 2.0, 3.0), format="nrrd")
+    wczytana, pola = wczytaj_nrrd(sciezka)
+    assert pola["type"] == "uint8" and pola["encoding"] == "gzip"
+    assert wczytana.shape == mask.shape
+    assert np.array_equal(wczytana, mask.astype(np.uint8))
+
+# Ścieżka MaskiWycinkow daje te same bity co lista pełnych masek 2D
+def test_maski_wycinkow_jak_lista_masek(tmp_path):
+    rng = np.random.default_rng(11)
+    for shape in ((3, 5, 9), (4, 6, 17), (2, 3, 1)):
+        mask = rng.random(shape) < 0.3
+        mask[0] = False
+        zapisz_maski(str(tmp_path / "wycinki"), maski_wycinkow(mask), (1.0, 1.0, 1.0), (0.0, 0.0, 0.0))
+        zapisz_maski(str(tmp_path / "lista"), list(mask), (1.0, 1.0, 1.0), (0.0, 0.0, 0.0))
+        z_wycinkow, _, _ = wczytaj_maski_npz(str(tmp_path / "wycinki" / "maski.npz"))
+        z_listy, _, _ = wczytaj_maski_npz(str(tmp_path / "lista" / "maski.npz"))
+        assert np.array_equal(z_wycinkow, mask)
+        assert np.array_equal(z_listy, mask)
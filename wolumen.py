@@ -0,0 +1,269 @@
+import os
+import glob
+import json
+import mmap
+import time
+import threading
+from collections import deque
+import numpy as np
+import pydicom
+from histogram import HistogramSerii
+import leniwe
+import pomiary
+
+def domyslny_katalog_pamieci():
+    return os.path.join(os.path.expanduser("~"), ".cache", "pomwjo", "wolumeny")
+
+# Rozmiar i mtime (ns) każdego pliku, jak w katalogu serii; None dla brakującego pliku
+def stan_plikow(file_names):
+    stan = []
+    for file_name in file_names:
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            stan.append(None)
+            continue
+        stan.append([stat.st_size, stat.st_mtime_ns])
+    return stan
+
+def nazwa_pliku(series_id):
+    return "".join(c if c.isalnum() or c in ".-_" else "_" for c in series_id)
+
+# Geometria serii z nagłówków pierwszych dwóch plików (w kolejności wycinków): spacing (x, y, z)
+# i origin; odstęp wycinków mierzony wzdłuż normalnej płaszczyzny obrazu
+def geometria(file_names):
+    tagi = ["Rows", "Columns", "PixelSpacing", "ImagePositionPatient", "ImageOrientationPatient", "SliceThickness"]
+    pierwszy = pydicom.dcmread(file_names[0], stop_before_pixels=True, specific_tags=tagi)
+    spacing_xy = [float(v) for v in pierwszy.get("PixelSpacing", [1.0, 1.0])]
+    origin = [float(v) for v in pierwszy.get("ImagePositionPatient", [0.0, 0.0, 0.0])]
+
+    spacing_z = float(pierwszy.get("SliceThickness") or 1.0)
+    if len(file_names) > 1:
+        drugi = pydicom.dcmread(file_names[1], stop_before_pixels=True, specific_tags=tagi)
+        if "ImagePositionPatient" in drugi and "ImagePositionPatient" in pierwszy:
+            roznica = np.subtract([float(v) for v in drugi.ImagePositionPatient], origin)
+            orientacja = [float(v) for v in pierwszy.get("ImageOrientationPatient") or [1, 0, 0, 0, 1, 0]]
+            odleglosc = abs(float(np.dot(roznica, np.cross(orientacja[:3], orientacja[3:]))))
+            if odleglosc > 0:
+                spacing_z = odleglosc
+
+    shape = (len(file_names), int(pierwszy.Rows), int(pierwszy.Columns))
+    return shape, (spacing_xy[1], spacing_xy[0], spacing_z), tuple(origin)
+
+# Dekodowanie jednego pliku do tablicy int16 (rescale slope/intercept stosuje GDCM przy
+# dekodowaniu, bez pośredniej tablicy float). out - tablica docelowa (np. wycinek pamięci
+# wolumenu): bufor czytnika kopiowany raz, prosto do niej; bez out - kopia bufora, bo widok
+# traci dane razem z obrazem czytnika po wyjściu z funkcji
+def dekoduj_wycinek(file_name, out=None):
+    itk = leniwe.itk()
+    with pomiary.etap("dekodowanie_wycinka") as pomiar:
+        reader = itk.ImageFileReader[leniwe.typ_obrazu(2)].New()
+        reader.SetFileName(file_name)
+        reader.Update()
+        if out is None:
+            out = itk.GetArrayFromImage(reader.GetOutput())
+        else:
+            out[...] = itk.GetArrayViewFromImage(reader.GetOutput())
+        pomiar.dodaj(bajty=out.nbytes)
+    return out
+
+# Seria zdekodowana raz do ciągłej tablicy (Z, Y, X) w pliku mapowanym w pamięci,
+# kluczem jest UID serii; kolejne uruchomienia nie czytają już plików DICOM
+class WolumenSerii:
+    def __init__(self, series_id, file_names, katalog=None):
+        self.series_id = series_id
+        self.file_names = list(file_names)
+        self.stan_plikow = stan_plikow(self.file_names)
+        katalog = katalog or domyslny_katalog_pamieci()
+        os.makedirs(katalog, exist_ok=True)
+
+        baza = os.path.join(katalog, nazwa_pliku(series_id))
+        self.baza = baza
+        self.sciezka_danych = baza + ".npy"
+        self.sciezka_stanu = baza + ".stan.npy"
+        self.sciezka_opisu = baza + ".json"
+        self.sciezka_histogramu = baza + ".hist.npy"
+        self._histogram = None
+
+        # Wczytywanie w tle (wczytuj_w_tle): wątek dekoduje wycinki w kolejności wyświetlania,
+        # pilne - wycinki, na które ktoś czeka (dekodowane przed pozostałymi)
+        self.warunek = threading.Condition()
+        self.pilne = deque()
+        self.wczytywanie = None
+        self.zatrzymane = False
+        self.czas_wczytywania = None
+
+        opis = self.wczytaj_opis()
+        if opis is not None:
+            self.shape = tuple(opis["shape"])
+            self.spacing = tuple(opis["spacing"])
+            self.origin = tuple(opis["origin"])
+            self.dane = np.load(self.sciezka_danych, mmap_mode="r+")
+            self.stan = np.load(self.sciezka_stanu, mmap_mode="r+")
+            return
+
+        # Histogram i siatki ciała starej zawartości pamięci są nieaktualne
+        for sciezka in [self.sciezka_histogramu] + glob.glob(glob.escape(baza) + ".cialo_*.vtp"):
+            if os.path.exists(sciezka):
+                os.remove(sciezka)
+        self.shape, self.spacing, self.origin = geometria(self.file_names)
+        self.dane = np.lib.format.open_memmap(self.sciezka_danych, mode="w+", dtype=np.int16, shape=self.shape)
+        self.stan = np.lib.format.open_memmap(self.sciezka_stanu, mode="w+", dtype=np.bool_, shape=(self.shape[0],))
+        with open(self.sciezka_opisu, "w") as f:
+            json.dump({
+                "series_id": series_id,
+                "file_names": self.file_names,
+                "pliki": self.stan_plikow,
+                "shape": self.shape,
+                "spacing": self.spacing,
+                "origin": self.origin,
+            }, f)
+
+    def wczytaj_opis(self):
+        try:
+            with open(self.sciezka_opisu) as f:
+                opis = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Inny zestaw plików pod tym samym UID albo pliki nadpisane pod tymi samymi nazwami
+        # (inny rozmiar lub mtime) - pamięć jest budowana od nowa
+        if opis.get("file_names") != self.file_names or opis.get("pliki") != self.stan_plikow:
+            return None
+        if not (os.path.exists(self.sciezka_danych) and os.path.exists(self.sciezka_stanu)):
+            return None
+        return opis
+
+    def __len__(self):
+        return self.shape[0]
+
+    def wczytane(self):
+        return int(np.count_nonzero(self.stan))
+
+    # Bez blokady - wątki mogą dekodować różne wycinki równolegle; ten sam wycinek
+    # zdekodowany dwa razy daje identyczne dane
+    def dekoduj(self, z):
+        if self.stan[z]:
+            return
+        dekoduj_wycinek(self.file_names[z], out=self.dane[z])
+        self.stan[z] = True
+
+    # Wątek wypełniający pamięć wolumenu od wycinka start (dalej w kolejności wyświetlania,
+    # z zawinięciem); odczyty czekają tylko na potrzebne wycinki, które dostają pierwszeństwo
+    def wczytuj_w_tle(self, start=0):
+        if self.wczytywanie is not None or self.stan.all():
+            return
+        self.zatrzymane = False
+        kolejnosc = [(start + k) % len(self) for k in range(len(self))]
+        self.wczytywanie = threading.Thread(target=self._wczytuj, args=(kolejnosc,), name="wczytywanie", daemon=True)
+        self.wczytywanie.start()
+
+    def zatrzymaj_wczytywanie(self):
+        with self.warunek:
+            watek = self.wczytywanie
+            self.zatrzymane = True
+            self.warunek.notify_all()
+        if watek is not None:
+            watek.join()
+
+    def _nastepny(self, kolejnosc):
+        while self.pilne:
+            z = self.pilne.popleft()
+            if not self.stan[z]:
+                return z
+        while kolejnosc:
+            z = kolejnosc.popleft()
+            if not self.stan[z]:
+                return z
+        return None
+
+    def _wczytuj(self, kolejnosc):
+        start = time.perf_counter()
+        kolejnosc = deque(kolejnosc)
+        try:
+            while True:
+                with self.warunek:
+                    z = None if self.zatrzymane else self._nastepny(kolejnosc)
+                    if z is None:
+                        break
+                self.dekoduj(z)
+                with self.warunek:
+                    self.warunek.notify_all()
+            if not self.zatrzymane:
+                self.czas_wczytywania = time.perf_counter() - start
+                print(f"Seria wczytana w tle: {len(self)} wycinków, {self.czas_wczytywania:.2f} s")
+        finally:
+            # Po błędzie lub zatrzymaniu czekający dekodują brakujące wycinki sami
+            with self.warunek:
+                self.wczytywanie = None
+                self.warunek.notify_all()
+
+    # Czeka, aż wątek wczytujący zdekoduje wycinki z0..z1-1 (przesunięte na początek kolejki);
+    # bez wątku (lub po jego końcu) brakujące wycinki są dekodowane w wątku wywołującym
+    def _czekaj(self, z0, z1):
+        if self.wczytywanie is not None:
+            with self.warunek:
+                brakujace = [z for z in range(z0, z1) if not self.stan[z]]
+                if brakujace and self.wczytywanie is not None:
+                    self.pilne.extendleft(reversed(brakujace))
+                    self.warunek.notify_all()
+                    self.warunek.wait_for(lambda: self.wczytywanie is None or self.stan[z0:z1].all())
+        for z in range(z0, z1):
+            if not self.stan[z]:
+                self.dekoduj(z)
+
+    def wycinek(self, z):
+        if not self.stan[z]:
+            self._czekaj(z, z + 1)
+        return self.dane[z]
+
+    def podwolumen(self, z0, z1):
+        self._czekaj(z0, z1)
+        return self.dane[z0:z1]
+
+    # Wycinki w kolejności wyświetlania, każdy zaraz po zdekodowaniu (z wczytuj_w_tle
+    # kolejne wycinki są już dekodowane, gdy odbiorca przetwarza poprzedni)
+    def strumien(self, z0=0, z1=None):
+        for z in range(z0, len(self) if z1 is None else z1):
+            yield self.wycinek(z)
+
+    def wolumen(self):
+        return self.podwolumen(0, self.shape[0])
+
+    # Strony wycinków z0..z1-1 usunięte z pamięci procesu - dane zostają w pliku i pamięci
+    # podręcznej systemu, kolejny odczyt mapuje je ponownie. Przejście po całej serii
+    # (np. rozrost dynamiczny) nie zostawia wtedy przeczytanych wycinków w RSS
+    def zwolnij(self, z0, z1):
+        mapa = getattr(self.dane, "_mmap", None)
+        if mapa is None or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        bajty = self.dane[0].nbytes
+        # Tablica zaczyna się w mapie za nagłówkiem .npy (mapa od granicy ALLOCATIONGRANULARITY);
+        # zwalniane tylko strony leżące w całości w zakresie wycinków
+        poczatek = self.dane.offset % mmap.ALLOCATIONGRANULARITY + z0 * bajty
+        koniec = poczatek + (z1 - z0) * bajty
+        poczatek = -(-poczatek // mmap.PAGESIZE) * mmap.PAGESIZE
+        koniec = koniec // mmap.PAGESIZE * mmap.PAGESIZE
+        if koniec > poczatek:
+            mapa.madvise(mmap.MADV_DONTNEED, poczatek, koniec - poczatek)
+
+    # Obraz ITK współdzielący pamięć z tablicą (bez kopii)
+    def obraz_itk(self):
+        image = leniwe.itk().GetImageViewFromArray(self.wolumen())
+        image.SetSpacing(self.spacing)
+        image.SetOrigin(self.origin)
+        return image
+
+    # Histogram intensywności całej serii: liczony raz, wycinek po wycinku (bez kopii
+    # wolumenu), zapisywany obok pamięci wolumenu i wczytywany przy kolejnych uruchomieniach
+    def histogram(self):
+        if self._histogram is not None:
+            return self._histogram
+        try:
+            self._histogram = HistogramSerii.wczytaj(self.sciezka_histogramu)
+        except (OSError, ValueError):
+            histogram = HistogramSerii(np.int16)
+            for wycinek in self.strumien():
+                histogram.dodaj(wycinek)
+            histogram.zakoncz().zapisz(self.sciezka_histogramu)
+            self._histogram = histogram
+        return self._histogram
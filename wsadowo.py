@@ -0,0 +1,141 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import odkrywanie
+
+# Wsadowa segmentacja 3D bez okien i input(): katalog DICOM + plik z punktami startowymi
+# (CSV: series_uid,x,y,z[,lower,upper]); wynik: maski NPZ i raport JSON
+
+def wczytaj_punkty(sciezka):
+    zadania = []
+    with open(sciezka, newline="") as f:
+        for i, wiersz in enumerate(csv.DictReader(f)):
+            lower = wiersz.get("lower") or None
+            upper = wiersz.get("upper") or None
+            zadania.append({
+                "id": i,
+                "series_uid": wiersz["series_uid"].strip(),
+                "seed": (int(wiersz["x"]), int(wiersz["y"]), int(wiersz["z"])),
+                "lower": int(lower) if lower is not None else None,
+                "upper": int(upper) if upper is not None else None,
+            })
+    return zadania
+
+# Wszystkie zadania jednej serii w jednym procesie - seria jest czytana raz
+def segmentuj_serie(series_uid, file_names, zadania, output_dir):
+    # ITK jest potrzebne tylko w procesach roboczych
+    from wolumen import WolumenSerii, nazwa_pliku
+    from segmentacja import Segmentacja3D
+    from zapis_masek import zapisz_maski_npz
+
+    wolumen = WolumenSerii(series_uid, file_names)
+    silnik = Segmentacja3D.z_wolumenu(wolumen)
+    objetosc_woksela = float(np.prod(wolumen.spacing))
+
+    wyniki = []
+    for zadanie in zadania:
+        wynik = dict(zadanie)
+        try:
+            # Ujemna współrzędna wskazałaby przez indeksowanie numpy woksel z drugiego końca wolumenu
+            x, y, z = zadanie["seed"]
+            if not (0 <= x < wolumen.shape[2] and 0 <= y < wolumen.shape[1] and 0 <= z < wolumen.shape[0]):
+                raise ValueError(f"Punkt startowy {zadanie['seed']} poza wolumenem "
+                                 f"(x < {wolumen.shape[2]}, y < {wolumen.shape[1]}, z < {wolumen.shape[0]})")
+            intensity, lower, upper = silnik.progi(zadanie["seed"])
+            lower = zadanie["lower"] if zadanie["lower"] is not None else lower
+            upper = zadanie["upper"] if zadanie["upper"] is not None else upper
+            mask_3d = silnik.segmentuj(zadanie["seed"], lower, upper)
+            czasy = dict(silnik.ostatnie_czasy)
+
+            start = time.perf_counter()
+            output_path = os.path.join(output_dir, f"{zadanie['id']:05d}_{nazwa_pliku(series_uid)}.npz")
+            zapisz_maski_npz(output_path, mask_3d, wolumen.spacing, wolumen.origin)
+            czasy["zapis"] = time.perf_counter() - start
+
+            liczba_wokseli = int(np.count_nonzero(mask_3d))
+            wynik.update({
+                "status": "ok",
+                "intensity": intensity,
+                "lower": lower,
+                "upper": upper,
+                "voxels": liczba_wokseli,
+                "volume_ml": liczba_wokseli * objetosc_woksela / 1000.0,
+                "mask": output_path,
+                "timings": czasy,
+            })
+        except Exception as e:
+            wynik.update({"status": "error", "error": str(e)})
+        wyniki.append(wynik)
+    return wyniki
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch 3D segmentation of many series and seeds.")
+    parser.add_argument("dicom_directory", help="Directory with DICOM series (its catalog is reused).")
+    parser.add_argument("seeds", help="CSV with columns series_uid,x,y,z and optional lower,upper. "
+                                      "z is the slice index in instance/position order, as in the viewers.")
+    parser.add_argument("--wyniki", default="wyniki_wsadowe", help="Output directory for masks and raport.json.")
+    parser.add_argument("--katalog", default=None, help="Path of the series catalog (SQLite).")
+    parser.add_argument("--procesy", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    patients = {}
+    series_descriptions = {}
+    odkrywanie.skanuj(args.dicom_directory, patients, series_descriptions, katalog_path=args.katalog)
+    # Pliki w kolejności wycinków z odkrywania (numer instancji, pozycja), jak w przeglądarkach
+    serie = {series_uid: list(dict.fromkeys(files)) for p in patients.values() for series_uid, files in p.items()}
+    czas_odkrywania = time.perf_counter() - start
+
+    zadania = wczytaj_punkty(args.seeds)
+    os.makedirs(args.wyniki, exist_ok=True)
+
+    # Sam UID serii wskazuje serię, jeśli pod tym UID jest tylko jedna (bez różnych rozmiarów obrazu)
+    wedlug_uid = {}
+    for klucz in serie:
+        wedlug_uid.setdefault(odkrywanie.uid_serii(klucz), []).append(klucz)
+
+    wyniki = []
+    wedlug_serii = {}
+    for zadanie in zadania:
+        klucze = [zadanie["series_uid"]] if zadanie["series_uid"] in serie else wedlug_uid.get(zadanie["series_uid"], [])
+        if len(klucze) != 1:
+            blad = "Nie znaleziono serii" if not klucze else f"Niejednoznaczny UID serii ({len(klucze)} serie)"
+            wyniki.append(dict(zadanie, status="error", error=blad))
+            continue
+        wedlug_serii.setdefault(klucze[0], []).append(zadanie)
+
+    with ProcessPoolExecutor(max_workers=max(1, args.procesy)) as executor:
+        futures = {
+            executor.submit(segmentuj_serie, series_uid, serie[series_uid], zadania_serii, args.wyniki): zadania_serii
+            for series_uid, zadania_serii in wedlug_serii.items()
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                wyniki.extend(future.result())
+            except Exception as e:
+                # Błąd całej serii (np. odczyt DICOM) - wszystkie jej zadania oznaczone jako błędne
+                wyniki.extend(dict(zadanie, status="error", error=str(e)) for zadanie in futures[future])
+            print(f"\rSerie: {i}/{len(futures)}", end="" if i < len(futures) else "\n", flush=True)
+
+    wyniki.sort(key=lambda w: w["id"])
+    raport = {
+        "dicom_directory": os.path.abspath(args.dicom_directory),
+        "discovery_s": czas_odkrywania,
+        "total_s": time.perf_counter() - start,
+        "jobs": wyniki,
+    }
+    raport_path = os.path.join(args.wyniki, "raport.json")
+    with open(raport_path, "w") as f:
+        json.dump(raport, f, indent=2)
+
+    bledy = sum(1 for w in wyniki if w["status"] != "ok")
+    print(f"Zadania: {len(wyniki)}, błędy: {bledy}, raport: {raport_path}")
+    return 1 if bledy else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
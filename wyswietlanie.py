@@ -0,0 +1,79 @@
+import time
+from collections import deque
+import numpy as np
+
+# Widok wycinka: jeden obiekt obrazu aktualizowany przez set_data, odświeżany przez blit
+# samego obszaru osi (bez ax.clear() / imshow na każdą klatkę)
+class WidokWycinka:
+    def __init__(self, ax, cmap="gray"):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.cmap = cmap
+        self.obraz = None
+        self.tlo = None
+        self.czasy_klatek = deque(maxlen=120)
+
+        ax.axis("off")
+        # Tytuł wewnątrz osi, żeby mieścił się w odświeżanym obszarze
+        self.tytul = ax.text(0.5, 0.99, "", transform=ax.transAxes, ha="center", va="top",
+                             color="white", animated=True)
+        # Wiersz stanu (np. postęp segmentacji w tle) odświeżany tym samym blitem
+        self.status = ax.text(0.5, 0.01, "", transform=ax.transAxes, ha="center", va="bottom",
+                              color="yellow", animated=True)
+        self.canvas.mpl_connect("draw_event", self._po_rysowaniu)
+
+    # clim=None - skala dopasowana do każdego wycinka (jak imshow)
+    def pokaz(self, image_data, tytul="", clim=None):
+        start = time.perf_counter()
+        image_data = np.asarray(image_data)
+        self.tytul.set_text(tytul)
+
+        if self.obraz is None or self.obraz.get_array().shape != image_data.shape:
+            if self.obraz is not None:
+                self.obraz.remove()
+            self.obraz = self.ax.imshow(image_data, cmap=self.cmap, animated=True)
+            if clim is not None:
+                self.obraz.set_clim(*clim)
+            # Pełne rysowanie tylko raz - draw_event zapamięta tło
+            self.canvas.draw()
+        else:
+            self.obraz.set_data(image_data)
+            self.obraz.set_clim(*(clim or (image_data.min(), image_data.max())))
+            self._blit()
+
+        self.czasy_klatek.append(time.perf_counter() - start)
+
+    def ustaw_status(self, tekst):
+        self.status.set_text(tekst)
+        self._blit()
+
+    def _po_rysowaniu(self, event):
+        self.tlo = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._rysuj_animowane()
+
+    def _rysuj_animowane(self):
+        if self.obraz is not None:
+            self.ax.draw_artist(self.obraz)
+        self.ax.draw_artist(self.tytul)
+        self.ax.draw_artist(self.status)
+
+    def _blit(self):
+        if self.tlo is None or not getattr(self.canvas, "supports_blit", False):
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.tlo)
+        self._rysuj_animowane()
+        self.canvas.blit(self.ax.bbox)
+
+    @property
+    def fps(self):
+        if not self.czasy_klatek:
+            return 0.0
+        return len(self.czasy_klatek) / sum(self.czasy_klatek)
+
+    def statystyki(self):
+        if not self.czasy_klatek:
+            return "Klatki: brak"
+        sredni = 1000.0 * sum(self.czasy_klatek) / len(self.czasy_klatek)
+        najdluzszy = 1000.0 * max(self.czasy_klatek)
+        return f"Klatki: {len(self.czasy_klatek)}, średnio {sredni:.1f} ms ({self.fps:.0f} fps), najdłużej {najdluzszy:.1f} ms"
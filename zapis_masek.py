@@ -0,0 +1,101 @@
+import os
+import gzip
+import numpy as np
+import pomiary
+
+# Bity ramek MaskiWycinkow wpisane w pełne wiersze bez rozpakowywania: ramka od x0 zaczyna
+# się w bajcie x0 // 8 na bicie x0 % 8, więc każdy jej bajt dzieli się na dwa sąsiednie bajty
+# wiersza (bity poza ramką są zerami, więc wystarcza OR)
+def _bity_wycinkow(maski):
+    shape = tuple(maski.shape)
+    bity = np.zeros((shape[0], shape[1], -(-shape[2] // 8)), dtype=np.uint8)
+    for z, wpis in enumerate(maski.wpisy):
+        if wpis is None:
+            continue
+        y0, y1, x0, x1, bity_ramki, _ = wpis
+        bajt, przesuniecie = divmod(x0, 8)
+        szerokosc = bity_ramki.shape[-1]
+        if przesuniecie == 0:
+            bity[z, y0:y1, bajt:bajt + szerokosc] = bity_ramki
+            continue
+        przesuniete = bity_ramki.astype(np.uint16) << (8 - przesuniecie)
+        bity[z, y0:y1, bajt:bajt + szerokosc] |= (przesuniete >> 8).astype(np.uint8)
+        # Młodsza część ostatniego bajtu może wypaść za wiersz - to same zera
+        reszta = min(szerokosc, bity.shape[-1] - bajt - 1)
+        bity[z, y0:y1, bajt + 1:bajt + 1 + reszta] |= (przesuniete[:, :reszta] & 0xFF).astype(np.uint8)
+    return shape, bity
+
+# Maski wycinków (lista tablic 2D albo MaskiWycinkow) jako jeden plik NPZ: bity spakowane
+# wzdłuż osi X, całość skompresowana; spacing i origin zapisane razem z maską
+def zapisz_maski_npz(sciezka, maski, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    if hasattr(maski, "wpisy"):
+        shape, bity = _bity_wycinkow(maski)
+    else:
+        shape = (len(maski),) + tuple(maski[0].shape)
+        bity = np.empty((shape[0], shape[1], -(-shape[2] // 8)), dtype=np.uint8)
+        for z, maska in enumerate(maski):
+            bity[z] = np.packbits(maska > 0, axis=-1)
+    np.savez_compressed(sciezka, bity=bity, shape=shape, spacing=spacing, origin=origin)
+
+# NRRD (uint8, gzip) - wycinki są dopisywane do jednego strumienia gzip po kolei
+def zapisz_nrrd_uint8(sciezka, wycinki, shape, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    liczba, rows, cols = shape
+    naglowek = (
+        "NRRD0004\n"
+        "type: uint8\n"
+        "dimension: 3\n"
+        "space: left-posterior-superior\n"
+        f"sizes: {cols} {rows} {liczba}\n"
+        f"space directions: ({spacing[0]},0,0) (0,{spacing[1]},0) (0,0,{spacing[2]})\n"
+        "kinds: domain domain domain\n"
+        "endian: little\n"
+        "encoding: gzip\n"
+        f"space origin: ({origin[0]},{origin[1]},{origin[2]})\n"
+        "\n"
+    )
+    with open(sciezka, "wb") as f:
+        f.write(naglowek.encode("ascii"))
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6) as strumien:
+            for wycinek in wycinki:
+                strumien.write(np.ascontiguousarray(wycinek, dtype=np.uint8).tobytes())
+
+def zapisz_maski_nrrd(sciezka, maski, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    shape = (len(maski),) + tuple(maski[0].shape)
+    zapisz_nrrd_uint8(sciezka, (maska > 0 for maska in maski), shape, spacing, origin)
+
+# Wolumen etykiet uint8 (Z, Y, X) jako jeden plik zamiast osobnej maski na etykietę
+def zapisz_etykiety_npz(sciezka, etykiety, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    np.savez_compressed(sciezka, etykiety=etykiety, spacing=spacing, origin=origin)
+
+# Odczyt maski zapisanej przez zapisz_maski_npz: (maska bool (Z, Y, X), spacing, origin)
+def wczytaj_maski_npz(sciezka):
+    with np.load(sciezka) as dane:
+        shape = tuple(int(n) for n in dane["shape"])
+        maska = np.unpackbits(dane["bity"], axis=-1, count=shape[2]).astype(np.bool_)
+        return maska, tuple(dane["spacing"]), tuple(dane["origin"])
+
+def zapisz_maski(output_dir, maski, spacing, origin, format="npz"):
+    os.makedirs(output_dir, exist_ok=True)
+    # Rozmiar z kształtu - MaskiWycinkow nie są rozpakowywane tylko po to
+    woksele = int(np.prod(maski.shape)) if hasattr(maski, "shape") else sum(maska.size for maska in maski)
+    with pomiary.etap("zapis_masek", format=format, woksele=woksele) as pomiar:
+        if format == "nrrd":
+            sciezka = os.path.join(output_dir, "maski.nrrd")
+            zapisz_maski_nrrd(sciezka, maski, spacing, origin)
+        else:
+            sciezka = os.path.join(output_dir, "maski.npz")
+            zapisz_maski_npz(sciezka, maski, spacing, origin)
+        pomiar.dodaj(bajty=os.path.getsize(sciezka))
+    return sciezka
+
+def zapisz_etykiety(output_dir, etykiety, spacing, origin, format="npz"):
+    os.makedirs(output_dir, exist_ok=True)
+    with pomiary.etap("zapis_etykiet", format=format, woksele=etykiety.size) as pomiar:
+        if format == "nrrd":
+            sciezka = os.path.join(output_dir, "etykiety.nrrd")
+            zapisz_nrrd_uint8(sciezka, etykiety, etykiety.shape, spacing, origin)
+        else:
+            sciezka = os.path.join(output_dir, "etykiety.npz")
+            zapisz_etykiety_npz(sciezka, etykiety, spacing, origin)
+        pomiar.dodaj(bajty=os.path.getsize(sciezka))
+    return sciezka